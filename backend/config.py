@@ -6,18 +6,151 @@ load_dotenv()
 
 # Mapbox configuration
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN", "pk.eyJ1IjoibWFwYm94IiwiYSI6ImNpejY4M29iazA2Z2gycXA4N2pmbDZmangifQ.-g_vE53SD2WrJ6tFX7QHmA")
-MAPBOX_API_URL = "https://api.mapbox.com"
+MAPBOX_API_URL = os.getenv("MAPBOX_API_URL", "https://api.mapbox.com")
+
+# Outbound HTTP: pooled connections, concurrent requests, timeouts (seconds),
+# retries of transient failures and the base backoff between them (seconds).
+# A Retry-After longer than HTTP_MAX_RETRY_AFTER seconds fails fast instead.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))
+HTTP_MAX_RETRY_AFTER = float(os.getenv("HTTP_MAX_RETRY_AFTER", str(3 * HTTP_READ_TIMEOUT)))
+
+# Geocoding cache: in-memory entries, entry lifetime (seconds), on-disk store
+# path (empty keeps the cache in memory only) and decimal places reverse
+# lookup coordinates are rounded to (4 is about 11 m)
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", str(7 * 24 * 3600)))
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "cache/geocode_cache.db")
+GEOCODE_COORD_PRECISION = int(os.getenv("GEOCODE_COORD_PRECISION", "4"))
+
+# Batch geocoding: most inputs per request, and distinct lookups in flight at once
+GEOCODE_BATCH_MAX_ITEMS = int(os.getenv("GEOCODE_BATCH_MAX_ITEMS", "10000"))
+GEOCODE_BATCH_CONCURRENCY = int(os.getenv("GEOCODE_BATCH_CONCURRENCY", "8"))
+
+# Request coalescing: callers allowed to wait on one in-flight call, and
+# keys whose counters are kept
+SINGLE_FLIGHT_MAX_WAITERS = int(os.getenv("SINGLE_FLIGHT_MAX_WAITERS", "1000"))
+SINGLE_FLIGHT_TRACKED_KEYS = int(os.getenv("SINGLE_FLIGHT_TRACKED_KEYS", "1000"))
 
 # Default map center (Mumbai, India)
 DEFAULT_LAT = 19.0760
 DEFAULT_LON = 72.8777
 DEFAULT_ZOOM = 12
 
-# Database configuration (for future use)
+# Timezone used to interpret naive timestamps (Mumbai local time)
+TIMEZONE = os.getenv("TIMEZONE", "Asia/Kolkata")
+
+# Spatial index grid cell size in degrees (~1.1 km of latitude)
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "0.01"))
+
+# Heatmap tiles: bins per tile side, and per-tile cache size/lifetime (seconds)
+HEATMAP_TILE_BINS = int(os.getenv("HEATMAP_TILE_BINS", "64"))
+if not 1 <= HEATMAP_TILE_BINS <= 256:
+    # Cells are sent as uint16 row-major indices, so bins * bins must fit
+    raise ValueError(f"HEATMAP_TILE_BINS must be between 1 and 256, got {HEATMAP_TILE_BINS}")
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "4096"))
+TILE_CACHE_TTL = float(os.getenv("TILE_CACHE_TTL", "60"))
+
+# Upper bound on the number of buckets in one time series response
+MAX_TIME_SERIES_BUCKETS = int(os.getenv("MAX_TIME_SERIES_BUCKETS", "5000"))
+
+# Bulk ingestion: rows validated and appended per batch, row errors reported
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "10000"))
+INGEST_MAX_ERRORS = int(os.getenv("INGEST_MAX_ERRORS", "1000"))
+
+# Streaming export: incidents read and encoded per chunk
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Database configuration: sqlite:///path/to/incidents.db for durable storage,
+# empty to keep incidents in memory only
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "4"))
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", "50000"))
+# Seconds between pulls of rows written by other workers (0 disables)
+STORAGE_SYNC_INTERVAL = float(os.getenv("STORAGE_SYNC_INTERVAL", "5"))
+# Mock incidents generated when storage starts empty (0 disables)
+SEED_MOCK_INCIDENTS = int(os.getenv("SEED_MOCK_INCIDENTS", "500"))
+
+# Risk surface: grid cell size in degrees (~550 m), days counted as recent
+# incidents, and seconds between checks for new incidents
+RISK_CELL_DEG = float(os.getenv("RISK_CELL_DEG", "0.005"))
+RISK_RECENT_DAYS = int(os.getenv("RISK_RECENT_DAYS", "30"))
+RISK_REFRESH_INTERVAL = float(os.getenv("RISK_REFRESH_INTERVAL", "5"))
+
+# High risk area clustering: grid cell size in degrees, minimum incidents
+# in a dense cell, z-score over the mean occupied-cell count a cell must reach, most
+# incidents clustered per run (larger inputs are sampled), areas reported,
+# days of incidents considered (0 for all) and seconds between runs
+HOTSPOT_CELL_DEG = float(os.getenv("HOTSPOT_CELL_DEG", "0.005"))
+HOTSPOT_MIN_INCIDENTS = int(os.getenv("HOTSPOT_MIN_INCIDENTS", "3"))
+HOTSPOT_MIN_Z_SCORE = float(os.getenv("HOTSPOT_MIN_Z_SCORE", "3"))
+HOTSPOT_MAX_ROWS = int(os.getenv("HOTSPOT_MAX_ROWS", "2000000"))
+HOTSPOT_MAX_AREAS = int(os.getenv("HOTSPOT_MAX_AREAS", "20"))
+HOTSPOT_WINDOW_DAYS = int(os.getenv("HOTSPOT_WINDOW_DAYS", "90"))
+HOTSPOT_REFRESH_INTERVAL = float(os.getenv("HOTSPOT_REFRESH_INTERVAL", "60"))
+
+# Model configuration: directory of trained artifacts (crime_model_<version>.npz;
+# without one a baseline is fitted from the incident store), rate smoothing
+# (pseudo-observations towards the citywide profile, share of the neighbor
+# cell mean) and training incidents at which confidence reaches 0.5
+MODEL_PATH = os.getenv("MODEL_PATH", "trained_models/")
+MODEL_PRIOR_STRENGTH = float(os.getenv("MODEL_PRIOR_STRENGTH", "0.5"))
+MODEL_SPATIAL_SMOOTHING = float(os.getenv("MODEL_SPATIAL_SMOOTHING", "0.3"))
+MODEL_CONFIDENCE_PRIOR = float(os.getenv("MODEL_CONFIDENCE_PRIOR", "20"))
+
+# Training (train.py): model grid cell size in degrees, recency weight
+# half-life in days, worker processes (0 for one per CPU) and cell
+# partitions spilled to disk and counted in parallel
+MODEL_CELL_DEG = float(os.getenv("MODEL_CELL_DEG", "0.005"))
+TRAINING_HALF_LIFE_DAYS = float(os.getenv("TRAINING_HALF_LIFE_DAYS", "180"))
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "0"))
+TRAINING_SHARDS = int(os.getenv("TRAINING_SHARDS", "64"))
+
+# Hotspot forecasts: hours ahead covered, cells ranked per horizon and type,
+# hotspots returned by default, seconds between checks for a new hour or
+# model to recompute for
+HOTSPOT_FORECAST_HORIZON = int(os.getenv("HOTSPOT_FORECAST_HORIZON", "72"))
+HOTSPOT_FORECAST_TOP_K = int(os.getenv("HOTSPOT_FORECAST_TOP_K", "50"))
+HOTSPOT_FORECAST_RESULTS = int(os.getenv("HOTSPOT_FORECAST_RESULTS", "20"))
+HOTSPOT_FORECAST_INTERVAL = float(os.getenv("HOTSPOT_FORECAST_INTERVAL", "60"))
+
+# Backtesting behind /api/predictions/accuracy: rolling origins (one per
+# horizon, ending at the start of today), hours predicted per fold, days of
+# history each fold trains on, hotspot cells scored (k), worker processes
+# (0 for one per CPU) and seconds between checks for a new model or day
+BACKTEST_FOLDS = int(os.getenv("BACKTEST_FOLDS", "8"))
+BACKTEST_HORIZON_HOURS = int(os.getenv("BACKTEST_HORIZON_HOURS", "24"))
+BACKTEST_WINDOW_DAYS = float(os.getenv("BACKTEST_WINDOW_DAYS", "90"))
+BACKTEST_TOP_K = int(os.getenv("BACKTEST_TOP_K", "20"))
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0"))
+BACKTEST_INTERVAL = float(os.getenv("BACKTEST_INTERVAL", "600"))
+
+# Seconds between checks of MODEL_PATH for a new artifact (0 disables);
+# token required by the admin model reload endpoint, which is disabled
+# while it is unset
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Predictions: search radius (km) and results per request; inference
+# micro-batches close at this many requests or after this wait (ms); cap on
+# requests per batch prediction call
+PREDICTION_RADIUS_KM = float(os.getenv("PREDICTION_RADIUS_KM", "2"))
+PREDICTION_TOP_K = int(os.getenv("PREDICTION_TOP_K", "10"))
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+PREDICTION_BATCH_MAX_ITEMS = int(os.getenv("PREDICTION_BATCH_MAX_ITEMS", "1000"))
 
-# Model configuration (for future use)
-MODEL_PATH = os.getenv("MODEL_PATH", "models/")
+# Prediction cache: entry and size bounds, TTL (seconds), location grid
+# (degrees, ~110 m) and time alignment step (seconds) used in cache keys
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "64"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_CELL_DEG = float(os.getenv("PREDICTION_CACHE_CELL_DEG", "0.001"))
+PREDICTION_CACHE_TIME_STEP = float(os.getenv("PREDICTION_CACHE_TIME_STEP", "300"))
 
 # API configuration
 API_PREFIX = "/api"
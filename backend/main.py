@@ -1,23 +1,115 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 from dotenv import load_dotenv
 
 from routers import crime_data, predictions, geocoding
+from services import crime_service, prediction_service
+from utils.http_client import init_http_client, close_http_client
+from utils.geocode_cache import close_geocode_cache, get_geocode_cache
+from utils import mapbox_utils
+from config import (
+    STORAGE_SYNC_INTERVAL, RISK_REFRESH_INTERVAL, HOTSPOT_REFRESH_INTERVAL, MODEL_WATCH_INTERVAL,
+    HOTSPOT_FORECAST_INTERVAL, BACKTEST_INTERVAL
+)
 
 # Load environment variables
 load_dotenv()
 
+async def sync_storage_periodically():
+    """Pick up incidents written to storage by other workers"""
+    while True:
+        await asyncio.sleep(STORAGE_SYNC_INTERVAL)
+        try:
+            await asyncio.to_thread(crime_service.sync_from_storage)
+        except Exception as e:
+            print(f"Storage sync failed: {e}")
+
+async def refresh_risk_surface_periodically():
+    """Fold newly arrived incidents into the risk surface"""
+    while True:
+        try:
+            await asyncio.to_thread(prediction_service.refresh_risk_surface)
+        except Exception as e:
+            print(f"Risk surface refresh failed: {e}")
+        await asyncio.sleep(RISK_REFRESH_INTERVAL)
+
+async def refresh_high_risk_areas_periodically():
+    """Re-cluster high risk areas when incidents change"""
+    while True:
+        try:
+            await asyncio.to_thread(crime_service.refresh_high_risk_areas)
+        except Exception as e:
+            print(f"High risk area clustering failed: {e}")
+        await asyncio.sleep(HOTSPOT_REFRESH_INTERVAL)
+
+async def refresh_hotspot_forecast_periodically():
+    """Recompute hotspot forecasts each hour and after a model reload"""
+    while True:
+        try:
+            await asyncio.to_thread(prediction_service.refresh_hotspot_forecast)
+        except Exception as e:
+            print(f"Hotspot forecast failed: {e}")
+        await asyncio.sleep(HOTSPOT_FORECAST_INTERVAL)
+
+async def refresh_backtest_periodically():
+    """Backtest each new model, and again each day as the data window moves"""
+    while True:
+        try:
+            await asyncio.to_thread(prediction_service.refresh_backtest)
+        except Exception as e:
+            print(f"Backtest failed: {e}")
+        await asyncio.sleep(BACKTEST_INTERVAL)
+
+async def watch_model_periodically():
+    """Load, smoke-test and swap in new model artifacts written to MODEL_PATH"""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            model = await asyncio.to_thread(prediction_service.reload_model_if_changed)
+            if model is not None:
+                print(f"Reloaded model {model.version}")
+        except Exception as e:
+            print(f"Model reload failed, keeping the current model: {e}")
+
 # Startup and shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Load models, establish connections, etc.
     print("Starting up the application...")
+    init_http_client()
+    await asyncio.to_thread(crime_service.init_storage)
+    model = await asyncio.to_thread(prediction_service.load_model)
+    print(f"Loaded model {model.version}")
+    prediction_service.start_inference_queue()
+    sync_task = None
+    if crime_service.get_repository() is not None and STORAGE_SYNC_INTERVAL > 0:
+        sync_task = asyncio.create_task(sync_storage_periodically())
+    risk_task = asyncio.create_task(refresh_risk_surface_periodically())
+    hotspot_task = asyncio.create_task(refresh_high_risk_areas_periodically())
+    forecast_task = asyncio.create_task(refresh_hotspot_forecast_periodically())
+    backtest_task = asyncio.create_task(refresh_backtest_periodically())
+    model_task = None
+    if MODEL_WATCH_INTERVAL > 0:
+        model_task = asyncio.create_task(watch_model_periodically())
     yield
     # Shutdown: Clean up resources
     print("Shutting down the application...")
+    if sync_task is not None:
+        sync_task.cancel()
+    risk_task.cancel()
+    hotspot_task.cancel()
+    forecast_task.cancel()
+    backtest_task.cancel()
+    if model_task is not None:
+        model_task.cancel()
+    await prediction_service.stop_inference_queue()
+    crime_service.close_storage()
+    await close_http_client()
+    close_geocode_cache()
 
 # Create FastAPI app
 app = FastAPI(
@@ -49,6 +141,34 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Counters of the in-process caches, request coalescing and background jobs"""
+    hotspots = crime_service.get_hotspot_snapshot()
+    forecast = prediction_service.get_hotspot_forecast_snapshot()
+    return {
+        "geocode_cache": get_geocode_cache().stats(),
+        "model": prediction_service.model_info(),
+        "inference": prediction_service.inference_stats(),
+        "prediction_cache": prediction_service.prediction_cache_stats(),
+        "hotspot_forecast": {
+            "model_version": forecast.model_version,
+            "origin": forecast.origin.isoformat(),
+            "generated_at": forecast.generated_at.isoformat(),
+            "elapsed_seconds": forecast.elapsed_seconds
+        } if forecast is not None else None,
+        "high_risk_areas": {
+            "generated_at": hotspots.generated_at.isoformat(),
+            "incidents_considered": hotspots.incidents_considered,
+            "sampled": hotspots.sampled,
+            "elapsed_seconds": hotspots.elapsed_seconds
+        } if hotspots is not None else None,
+        "single_flight": {
+            "upstream": mapbox_utils.upstream_flights.stats(),
+            "queries": crime_service.query_flights.stats()
+        }
+    }
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
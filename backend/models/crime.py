@@ -29,6 +29,12 @@ class TimeRange(BaseModel):
     start_time: datetime
     end_time: datetime
 
+class AreaFilter(BaseModel):
+    """Spatial filter: a bounding box, a radius around a center, or both"""
+    bbox: Optional[List[float]] = None  # [min_lon, min_lat, max_lon, max_lat]
+    center: Optional[Location] = None
+    radius_km: Optional[float] = Field(None, gt=0.0)
+
 class CrimeQuery(BaseModel):
     time_range: Optional[TimeRange] = None
     crime_types: Optional[List[str]] = None
@@ -58,3 +64,21 @@ class PredictionResponse(BaseModel):
     predictions: List[PredictionResult]
     generated_at: datetime = Field(default_factory=datetime.now)
     model_version: str = "0.1.0"
+
+class PredictionBatchRequest(BaseModel):
+    requests: List[PredictionRequest] = Field(..., min_length=1)
+
+class PredictionBatchResponse(BaseModel):
+    """One response per request, in request order"""
+    results: List[PredictionResponse]
+    model_version: str
+
+class GeocodeBatchItem(BaseModel):
+    """One batch geocoding input: an address, or a point to reverse geocode"""
+    query: Optional[str] = None
+    longitude: Optional[float] = Field(None, ge=-180.0, le=180.0)
+    latitude: Optional[float] = Field(None, ge=-90.0, le=90.0)
+
+class GeocodeBatchRequest(BaseModel):
+    items: List[GeocodeBatchItem] = Field(..., min_length=1)
+    country: Optional[str] = None
@@ -1,76 +1,277 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Response, Request, Path
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
 import random
 
-from models.crime import CrimeIncident, CrimeHeatmapData, CrimeQuery, CrimeStatistics, CrimeHeatmapPoint, Location
-from services import crime_service
+from models.crime import CrimeIncident, CrimeHeatmapData, CrimeQuery, CrimeStatistics, CrimeHeatmapPoint, Location, AreaFilter
+from services import crime_service, export_service, ingest_service
+from config import TILE_CACHE_TTL
+from utils.single_flight import TooManyWaiters
+from utils.admin import require_admin_token
+from utils.response_formats import JSON, columnar_response, json_response, response_media_type
 
 router = APIRouter()
 
+def area_filter(
+    bbox: Optional[str] = Query(None, description="Bounding box as min_lon,min_lat,max_lon,max_lat"),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0)
+) -> Optional[AreaFilter]:
+    """
+    Parse the shared spatial filter query parameters
+    """
+    box = None
+    if bbox:
+        try:
+            box = [float(v) for v in bbox.split(",")]
+        except ValueError:
+            box = []
+        if len(box) != 4 or box[0] > box[2] or box[1] > box[3]:
+            raise HTTPException(status_code=400, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    
+    radius_params = (lat, lon, radius_km)
+    if any(v is not None for v in radius_params) and any(v is None for v in radius_params):
+        raise HTTPException(status_code=400, detail="lat, lon and radius_km must be given together")
+    
+    if box is None and radius_km is None:
+        return None
+    return AreaFilter(
+        bbox=box,
+        center=Location(latitude=lat, longitude=lon) if radius_km is not None else None,
+        radius_km=radius_km
+    )
+
+def _area_key(area: Optional[AreaFilter]) -> Optional[str]:
+    """Hashable form of a spatial filter for request coalescing"""
+    return area.model_dump_json() if area is not None else None
+
 @router.get("/incidents", response_model=List[CrimeIncident])
 async def get_crime_incidents(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     crime_type: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    area: Optional[AreaFilter] = Depends(area_filter),
+    media_type: str = Depends(response_media_type)
 ):
     """
-    Get crime incidents based on filters
+    Get crime incidents based on filters, newest first.
+    When more results exist the next page's cursor is returned in the X-Next-Cursor header.
+    Columnar responses are chosen with the Accept header (see README).
     """
     try:
-        # Use the crime service to get incidents
-        incidents = crime_service.get_crime_incidents(
+        # Use the crime service to get incidents, straight in the response shape
+        filters = dict(
             start_date=start_date,
             end_date=end_date,
             crime_type=crime_type,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor,
+            area=area
         )
-        return incidents
+        if media_type == JSON:
+            incidents, next_cursor = crime_service.get_crime_incident_records(**filters)
+        else:
+            incidents, next_cursor = crime_service.get_crime_incident_columns(**filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"Vary": "Accept"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if media_type == JSON:
+        return json_response(incidents, headers)
+    return columnar_response(media_type, incidents, {"next_cursor": next_cursor}, headers)
+
+@router.get("/incidents/export")
+async def export_crime_incidents(
+    request: Request,
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    crime_type: Optional[str] = Query(None),
+    area: Optional[AreaFilter] = Depends(area_filter),
+    format: Optional[str] = Query(None, regex="^(ndjson|csv)$", description="Export format, defaults to the Accept header")
+):
+    """
+    Stream every incident matching the filters, oldest first, as NDJSON or
+    CSV rows in the /incidents/bulk format. Memory use does not depend on
+    the number of rows.
+    """
+    if format is None:
+        format = "csv" if "text/csv" in request.headers.get("accept", "") else "ndjson"
+    chunks = export_service.export_incidents(
+        format,
+        start_date=start_date,
+        end_date=end_date,
+        crime_type=crime_type,
+        area=area
+    )
+    
+    async def body():
+        # The next chunk is only read once the previous one has been sent,
+        # so a slow client holds back the export instead of buffering it
+        try:
+            while not await request.is_disconnected():
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            try:
+                chunks.close()
+            except ValueError:
+                # Cancelled while a chunk is being read in its thread; the
+                # generator stops there as nothing asks for the next one
+                pass
+    
+    return StreamingResponse(
+        body(),
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="incidents.{format}"'}
+    )
+
+@router.post("/incidents/bulk")
+async def bulk_ingest_incidents(
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(ndjson|csv)$", description="Body format, defaults to the Content-Type")
+):
+    """
+    Ingest crime incidents from a streamed NDJSON or CSV body.
+    Rows need crime_type, latitude, longitude, timestamp and severity; id and description are optional.
+    Returns counts and per-row errors.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    try:
+        return await ingest_service.ingest_incidents(request.stream(), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/incidents/{incident_id}")
+async def delete_crime_incident(incident_id: str, _: None = Depends(require_admin_token)):
+    """
+    Remove a crime incident. Requires the X-Admin-Token header to match
+    ADMIN_TOKEN.
+    """
+    try:
+        # Storage writes block, keep them off the event loop
+        removed = await asyncio.to_thread(crime_service.remove_incident, incident_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid incident id")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return {"deleted": incident_id}
 
 @router.get("/heatmap", response_model=CrimeHeatmapData)
 async def get_heatmap_data(
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    crime_type: Optional[str] = Query(None),
+    include_predictions: bool = Query(False),
+    area: Optional[AreaFilter] = Depends(area_filter),
+    media_type: str = Depends(response_media_type)
+):
+    """
+    Get heatmap data for visualization.
+    Columnar responses are chosen with the Accept header (see README).
+    """
+    try:
+        # Use the crime service to get heatmap data; identical concurrent
+        # queries share one computation off the event loop
+        key = ("heatmap", start_date, end_date, crime_type, include_predictions, _area_key(area))
+        table, metadata = await crime_service.query_flights.do(key, lambda: asyncio.to_thread(
+            crime_service.get_heatmap_columns,
+            start_date=start_date,
+            end_date=end_date,
+            crime_type=crime_type,
+            include_predictions=include_predictions,
+            area=area
+        ))
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        return json_response(crime_service.heatmap_records(table, metadata), headers)
+    return columnar_response(media_type, table, metadata, headers)
+
+@router.get("/heatmap/tiles/{z}/{x}/{y}")
+async def get_heatmap_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     crime_type: Optional[str] = Query(None),
     include_predictions: bool = Query(False)
 ):
     """
-    Get heatmap data for visualization
+    Get a pre-aggregated heatmap tile (Web Mercator z/x/y) with per-cell
+    incident counts and severity sums as packed arrays
     """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=400, detail="Tile coordinates out of range for zoom level")
     try:
-        # Use the crime service to get heatmap data
-        heatmap_data = crime_service.get_heatmap_data(
+        key = ("tile", z, x, y, start_date, end_date, crime_type, include_predictions)
+        tile = await crime_service.query_flights.do(key, lambda: asyncio.to_thread(
+            crime_service.get_heatmap_tile,
+            z, x, y,
             start_date=start_date,
             end_date=end_date,
             crime_type=crime_type,
             include_predictions=include_predictions
-        )
-        return heatmap_data
+        ))
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    etag = f'"{tile["etag"]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={int(TILE_CACHE_TTL)}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(tile, headers=headers)
 
 @router.get("/statistics", response_model=CrimeStatistics)
 async def get_crime_statistics(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    crime_type: Optional[str] = Query(None)
+    crime_type: Optional[str] = Query(None),
+    area: Optional[AreaFilter] = Depends(area_filter)
 ):
     """
     Get crime statistics and aggregated data
     """
     try:
-        # Use the crime service to get statistics
-        statistics = crime_service.get_crime_statistics(
+        # Use the crime service to get statistics; identical concurrent
+        # queries share one computation off the event loop
+        key = ("statistics", start_date, end_date, crime_type, _area_key(area))
+        statistics = await crime_service.query_flights.do(key, lambda: asyncio.to_thread(
+            crime_service.get_crime_statistics,
             start_date=start_date,
             end_date=end_date,
-            crime_type=crime_type
-        )
+            crime_type=crime_type,
+            area=area
+        ))
         return statistics
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -89,20 +290,26 @@ async def get_time_series_data(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     crime_type: Optional[str] = Query(None),
-    interval: str = Query("day", regex="^(hour|day|week|month)$")
+    interval: str = Query("day", regex="^(hour|day|week|month|[0-9]+[mhd])$"),
+    timezone: Optional[str] = Query(None, description="IANA timezone for bucket boundaries, e.g. Asia/Kolkata")
 ):
     """
-    Get time series data for charts
+    Get time series data for charts.
+    `interval` is hour/day/week/month or a custom width such as 15m, 6h or 2d.
     """
     try:
-        # Use the crime service to get time series data
-        time_series = crime_service.get_time_series_data(
+        # Bucketing long windows is CPU bound, keep it off the event loop
+        time_series = await asyncio.to_thread(
+            crime_service.get_time_series_data,
             start_date=start_date,
             end_date=end_date,
             crime_type=crime_type,
-            interval=interval
+            interval=interval,
+            timezone=timezone
         )
         return time_series
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
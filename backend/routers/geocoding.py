@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Optional
-import requests
+import httpx
+import json
 
-from config import MAPBOX_TOKEN, MAPBOX_API_URL
+from config import GEOCODE_BATCH_MAX_ITEMS
+from models.crime import GeocodeBatchRequest
+from utils.single_flight import TooManyWaiters
+from utils.geocode_cache import get_geocode_cache
+from utils import mapbox_utils
 
 router = APIRouter()
 
@@ -13,23 +19,14 @@ async def forward_geocoding(
     country: Optional[str] = Query(None)
 ):
     """
-    Convert address to coordinates using Mapbox Geocoding API
+    Convert address to coordinates using Mapbox Geocoding API.
+    Responses are cached by normalized query.
     """
     try:
-        url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{query}.json"
-        params = {
-            "access_token": MAPBOX_TOKEN,
-            "limit": limit
-        }
-        
-        if country:
-            params["country"] = country
-            
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        return response.json()
-    except requests.RequestException as e:
+        return await mapbox_utils.forward_geocoding(query, limit=limit, country=country)
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Geocoding error: {str(e)}")
 
 @router.get("/reverse")
@@ -39,24 +36,33 @@ async def reverse_geocoding(
     types: Optional[str] = Query(None)
 ):
     """
-    Convert coordinates to address using Mapbox Geocoding API
+    Convert coordinates to address using Mapbox Geocoding API.
+    Coordinates are rounded to GEOCODE_COORD_PRECISION and responses cached.
     """
     try:
-        url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{longitude},{latitude}.json"
-        params = {
-            "access_token": MAPBOX_TOKEN
-        }
-        
-        if types:
-            params["types"] = types
-            
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        return response.json()
-    except requests.RequestException as e:
+        return await mapbox_utils.reverse_geocoding(longitude, latitude, types=types)
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Reverse geocoding error: {str(e)}")
 
+@router.post("/batch")
+async def batch_geocoding(request: GeocodeBatchRequest):
+    """
+    Geocode many addresses and/or coordinate pairs in one call.
+    Duplicate inputs are looked up once. Streams one NDJSON line per input,
+    in input order, with either a "result" or an "error".
+    """
+    if len(request.items) > GEOCODE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {GEOCODE_BATCH_MAX_ITEMS} items per batch")
+    
+    async def lines():
+        items = [item.model_dump() for item in request.items]
+        async for outcome in mapbox_utils.geocode_batch(items, country=request.country):
+            yield json.dumps(outcome) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/directions")
 async def get_directions(
     start_longitude: float = Query(...),
@@ -66,20 +72,23 @@ async def get_directions(
     profile: str = Query("walking", regex="^(driving|walking|cycling)$")
 ):
     """
-    Get directions between two points using Mapbox Directions API
+    Get directions between two points using Mapbox Directions API.
+    Identical requests in flight at the same time share one upstream call.
     """
     try:
-        url = f"{MAPBOX_API_URL}/directions/v5/mapbox/{profile}/{start_longitude},{start_latitude};{end_longitude},{end_latitude}"
-        params = {
-            "access_token": MAPBOX_TOKEN,
-            "geometries": "geojson",
-            "steps": "true",
-            "overview": "full"
-        }
-            
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        return response.json()
-    except requests.RequestException as e:
+        return await mapbox_utils.get_directions(
+            (start_longitude, start_latitude),
+            (end_longitude, end_latitude),
+            profile=profile
+        )
+    except TooManyWaiters as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Directions error: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get geocoding cache hit/miss/eviction counters
+    """
+    return get_geocode_cache().stats()
@@ -1,51 +1,99 @@
-from fastapi import APIRouter, Query, HTTPException, Body
+from fastapi import APIRouter, Query, HTTPException, Body, Depends
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
 
-from models.crime import PredictionRequest, PredictionResponse, Location
+from config import (
+    PREDICTION_BATCH_MAX_ITEMS, HOTSPOT_FORECAST_HORIZON, HOTSPOT_FORECAST_TOP_K, HOTSPOT_FORECAST_RESULTS
+)
+from models.crime import PredictionRequest, PredictionResponse, PredictionBatchRequest, PredictionBatchResponse, Location
 from services import prediction_service
+from utils.admin import require_admin_token
+from utils.response_formats import JSON, columnar_response, json_response, model_response, response_media_type
 
 router = APIRouter()
 
 @router.post("/generate", response_model=PredictionResponse)
-async def generate_predictions(request: PredictionRequest = Body(...)):
+async def generate_predictions(
+    request: PredictionRequest = Body(...),
+    media_type: str = Depends(response_media_type)
+):
     """
     Generate crime predictions based on location and time range
     """
     try:
-        predictions = prediction_service.generate_predictions(
-            location=request.location,
-            time_range=request.time_range,
-            crime_types=request.crime_types
+        # Concurrent requests are scored together in micro-batches
+        response = await prediction_service.predict(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        return model_response(response, headers)
+    return columnar_response(media_type, *prediction_service.predictions_to_columns([response]), headers)
+
+@router.post("/generate/batch", response_model=PredictionBatchResponse)
+async def generate_predictions_batch(
+    batch: PredictionBatchRequest = Body(...),
+    media_type: str = Depends(response_media_type)
+):
+    """
+    Generate predictions for many locations and time ranges in one call.
+    Results are in the same order as the requests; columnar responses
+    flatten them into rows tagged with the request index.
+    """
+    if len(batch.requests) > PREDICTION_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {PREDICTION_BATCH_MAX_ITEMS} requests per batch"
         )
-        return predictions
+    try:
+        # Already a batch, so it is scored directly rather than queued
+        results = await asyncio.to_thread(prediction_service.generate_predictions_batch, batch.requests)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        return model_response(PredictionBatchResponse(results=results, model_version=results[0].model_version), headers)
+    return columnar_response(media_type, *prediction_service.predictions_to_columns(results), headers)
 
 @router.get("/hotspots", response_model=List[dict])
 async def get_prediction_hotspots(
-    hours_ahead: int = Query(24, ge=1, le=72),
-    crime_type: Optional[str] = Query(None)
+    hours_ahead: int = Query(24, ge=1, le=HOTSPOT_FORECAST_HORIZON),
+    crime_type: Optional[str] = Query(None),
+    limit: int = Query(HOTSPOT_FORECAST_RESULTS, ge=1, le=HOTSPOT_FORECAST_TOP_K),
+    media_type: str = Depends(response_media_type)
 ):
     """
-    Get predicted crime hotspots for the next X hours
+    Get predicted crime hotspots for the next X hours, sliced from forecasts
+    precomputed in the background. X-Forecast-Generated-At tells when.
     """
     try:
-        hotspots = prediction_service.get_prediction_hotspots(
-            hours_ahead=hours_ahead,
-            crime_type=crime_type
+        # Computing the first forecast is heavy, and the body and its
+        # timestamp header must come from the same one
+        forecast = await asyncio.to_thread(prediction_service.get_hotspot_forecast)
+        slice_hotspots = (
+            prediction_service.get_prediction_hotspots if media_type == JSON
+            else prediction_service.get_prediction_hotspot_columns
         )
-        return hotspots
+        hotspots = slice_hotspots(hours_ahead=hours_ahead, crime_type=crime_type, limit=limit, forecast=forecast)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    headers = {"Vary": "Accept", "X-Forecast-Generated-At": forecast.generated_at.isoformat()}
+    if media_type == JSON:
+        return json_response(hotspots, headers)
+    return columnar_response(media_type, hotspots, headers=headers)
 
 @router.get("/accuracy", response_model=dict)
 async def get_prediction_accuracy():
     """
-    Get model prediction accuracy metrics
+    Get model prediction accuracy metrics from a rolling-origin backtest
     """
     try:
-        accuracy = prediction_service.get_prediction_accuracy()
+        accuracy = await asyncio.to_thread(prediction_service.get_prediction_accuracy)
         return accuracy
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -54,17 +102,47 @@ async def get_prediction_accuracy():
 async def get_area_risk_assessment(
     latitude: float = Query(...),
     longitude: float = Query(...),
-    radius: float = Query(1.0, description="Radius in kilometers")
+    radius: float = Query(1.0, gt=0, le=50, description="Radius in kilometers")
 ):
     """
     Get risk assessment for a specific area
     """
     try:
         location = Location(latitude=latitude, longitude=longitude)
-        risk_assessment = prediction_service.get_area_risk_assessment(
+        # May rebuild the risk surface, so it runs off the event loop
+        risk_assessment = await asyncio.to_thread(
+            prediction_service.get_area_risk_assessment,
             location=location,
             radius=radius
         )
         return risk_assessment
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/model", response_model=dict)
+async def get_model_info():
+    """
+    Get the version and origin of the serving model
+    """
+    return prediction_service.model_info()
+
+@router.post("/model/reload", response_model=dict)
+async def reload_model(
+    version: Optional[str] = Query(None, description="Artifact version to load, defaults to the newest"),
+    _: None = Depends(require_admin_token)
+):
+    """
+    Load a model artifact from MODEL_PATH, smoke-test it and swap it in.
+    Requests already running finish on the previous model. A requested
+    version stays pinned against automatic reloads until a reload without
+    one. Requires the X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    try:
+        await asyncio.to_thread(prediction_service.reload_model, version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Model rejected: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return prediction_service.model_info()
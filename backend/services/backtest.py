@@ -0,0 +1,185 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from services.crime_model import fit_rate_model, hour_weights
+from services.model_training import effective_weeks
+from utils.data_utils import US_PER_DAY, US_PER_HOUR, HOURS_PER_WEEK, epoch_us_to_datetime, hour_of_week
+
+US_PER_WEEK = 7 * US_PER_DAY
+
+@dataclass(frozen=True)
+class BacktestResult:
+    """Metrics of one backtest run, for the model and data window in `key`"""
+    key: Tuple
+    model_version: str
+    metrics: Dict
+    folds: Tuple[Dict, ...]
+    computed_at: datetime
+    elapsed_seconds: float
+
+# Incident columns and grid cell keys held by each worker process, set
+# once per worker by _init_worker so folds only receive their origin
+_data: Optional[Dict[str, np.ndarray]] = None
+
+def _init_worker(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    timestamp: np.ndarray,
+    type_code: np.ndarray,
+    cell_deg: float
+) -> None:
+    global _data
+    lon_cells = int(math.ceil(360.0 / cell_deg))
+    _data = {
+        "timestamp": timestamp,
+        "type_code": type_code.astype(np.int64),
+        "hour_of_week": hour_of_week(timestamp).astype(np.int64),
+        "cell": (
+            np.floor((latitude + 90.0) / cell_deg).astype(np.int64) * lon_cells
+            + np.floor((longitude + 180.0) / cell_deg).astype(np.int64)
+        ),
+    }
+
+def _run_fold(
+    origin_us: int,
+    horizon_hours: int,
+    window_us: int,
+    top_k: int,
+    type_names: List[str],
+    params: Dict
+) -> Dict:
+    """
+    Fit the model family on the window before `origin_us`, rank its cells by
+    expected incidents over the next `horizon_hours`, and compare with the
+    incidents that actually followed
+    """
+    timestamp = _data["timestamp"]
+    type_count = len(type_names)
+    train = np.flatnonzero((timestamp >= origin_us - window_us) & (timestamp < origin_us))
+    end_us = origin_us + horizon_hours * US_PER_HOUR
+    actual_cells = _data["cell"][(timestamp >= origin_us) & (timestamp < end_us)]
+
+    cell_keys, cells = np.unique(_data["cell"][train], return_inverse=True)
+    weights = None
+    weeks = max((origin_us - int(timestamp[train].min())) / US_PER_WEEK, 1.0) if len(train) else 1.0
+    half_life_days = params.get("half_life_days")
+    if half_life_days and len(train):
+        half_life_us = half_life_days * US_PER_DAY
+        weights = np.exp2(-(origin_us - timestamp[train]) / half_life_us)
+        weeks = effective_weeks(origin_us - int(timestamp[train].min()), half_life_us)
+    flat = (cells * type_count + _data["type_code"][train]) * HOURS_PER_WEEK + _data["hour_of_week"][train]
+    counts = np.bincount(flat, weights=weights, minlength=len(cell_keys) * type_count * HOURS_PER_WEEK)
+    model = fit_rate_model(
+        version="backtest",
+        cell_deg=params["cell_deg"],
+        cell_keys=cell_keys,
+        counts=counts.reshape(len(cell_keys), type_count, HOURS_PER_WEEK),
+        weeks=weeks,
+        type_names=type_names,
+        prior_strength=params["prior_strength"],
+        spatial_smoothing=params["spatial_smoothing"]
+    )
+
+    expected = model.rates.sum(axis=1, dtype=np.float64) @ hour_weights(origin_us, end_us)
+    k = min(top_k, len(expected))
+    predicted = model.cell_keys[np.argsort(-expected, kind="stable")[:k]]
+    actual_keys, actual_counts = np.unique(actual_cells, return_counts=True)
+    hit = np.isin(actual_keys, predicted)
+
+    # Every cell the model knows or that saw an incident is one prediction
+    universe_keys = np.union1d(model.cell_keys, actual_keys)
+    universe = len(universe_keys)
+    probability = np.zeros(universe)
+    observed = np.zeros(universe)
+    probability[np.searchsorted(universe_keys, model.cell_keys)] = -np.expm1(-expected)
+    observed[np.searchsorted(universe_keys, actual_keys)] = 1.0
+
+    true_positives = int(hit.sum())
+    return {
+        "origin": epoch_us_to_datetime(origin_us).isoformat(),
+        "training_incidents": int(len(train)),
+        "incidents": int(len(actual_cells)),
+        "predicted_cells": k,
+        "actual_cells": int(len(actual_keys)),
+        "true_positives": true_positives,
+        "true_negatives": universe - k - len(actual_keys) + true_positives,
+        "cells": universe,
+        "hits": int(actual_counts[hit].sum()),
+        "squared_error": float(((probability - observed) ** 2).sum())
+    }
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
+
+def summarize_folds(folds: List[Dict], top_k: int) -> Dict:
+    """Micro-average fold counts into precision, recall, F1, hit rate@k and accuracy"""
+    true_positives = sum(fold["true_positives"] for fold in folds)
+    precision = _ratio(true_positives, sum(fold["predicted_cells"] for fold in folds))
+    recall = _ratio(true_positives, sum(fold["actual_cells"] for fold in folds))
+    cells = sum(fold["cells"] for fold in folds)
+    return {
+        "overall_accuracy": _ratio(true_positives + sum(fold["true_negatives"] for fold in folds), cells),
+        "precision": precision,
+        "recall": recall,
+        "f1_score": _ratio(2 * precision * recall, precision + recall),
+        "hit_rate_at_k": _ratio(sum(fold["hits"] for fold in folds), sum(fold["incidents"] for fold in folds)),
+        "k": top_k,
+        "brier_score": _ratio(sum(fold["squared_error"] for fold in folds), cells)
+    }
+
+def run_backtest(
+    key: Tuple,
+    model_version: str,
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    timestamp: np.ndarray,
+    type_code: np.ndarray,
+    type_names: List[str],
+    params: Dict,
+    origins: List[int],
+    horizon_hours: int,
+    window_days: float,
+    top_k: int,
+    workers: int
+) -> BacktestResult:
+    """
+    Rolling-origin backtest: one fold per origin, each refitting the model
+    family (`params`: cell_deg, prior_strength, spatial_smoothing,
+    half_life_days) on the `window_days` before its origin. Folds run in a
+    pool of freshly spawned worker processes (forking a threaded server is
+    unsafe), each given the incident columns once.
+    """
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(workers or os.cpu_count() or 1, len(origins))),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(latitude, longitude, timestamp, type_code, params["cell_deg"])
+    ) as pool:
+        count = len(origins)
+        folds = list(pool.map(
+            _run_fold,
+            origins,
+            [horizon_hours] * count,
+            [int(window_days * US_PER_DAY)] * count,
+            [top_k] * count,
+            [type_names] * count,
+            [params] * count
+        ))
+    return BacktestResult(
+        key=key,
+        model_version=model_version,
+        metrics=summarize_folds(folds, top_k),
+        folds=tuple(folds),
+        computed_at=datetime.now(),
+        elapsed_seconds=round(time.perf_counter() - started, 3)
+    )
@@ -0,0 +1,264 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import glob
+import json
+import math
+import os
+
+import numpy as np
+
+from config import MODEL_PRIOR_STRENGTH, MODEL_SPATIAL_SMOOTHING, MODEL_CONFIDENCE_PRIOR
+from utils.data_utils import (
+    US_PER_HOUR, HOURS_PER_WEEK, EARTH_RADIUS_KM, equirectangular_distance, hour_of_week, points_within_radius
+)
+
+ARTIFACT_PREFIX = "crime_model_"
+ARTIFACT_SUFFIX = ".npz"
+KM_PER_DEGREE = math.radians(1.0) * EARTH_RADIUS_KM
+
+@dataclass(frozen=True)
+class CrimeRateModel:
+    """
+    Poisson rate model over a uniform grid: `rates[cell, type, hour_of_week]`
+    is the expected number of incidents in that cell during one occurrence
+    of that local hour of the week. Only cells with training data are kept.
+    Instances are immutable, so a request scores against one model
+    throughout even if another one is swapped in meanwhile.
+    """
+    version: str
+    cell_deg: float
+    cell_keys: np.ndarray   # int64, sorted
+    cell_lat: np.ndarray    # float64 cell center latitudes
+    cell_lon: np.ndarray    # float64 cell center longitudes
+    rates: np.ndarray       # float32 (cells, types, 168)
+    support: np.ndarray     # float64 training incidents per cell
+    type_names: List[str]
+    trained_at: datetime
+    metadata: Dict
+
+    @property
+    def lon_cells(self) -> int:
+        return int(math.ceil(360.0 / self.cell_deg))
+
+    def cells_near(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Get the model cells whose center lies within the radius"""
+        return points_within_radius(latitude, longitude, radius_km, self.cell_lat, self.cell_lon, fast=True)
+
+    def cells_near_many(self, latitudes: np.ndarray, longitudes: np.ndarray, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `cells_near` for many points at once. Returns `(owners, cells)`:
+        the cells near point i are `cells[owners == i]`, grouped by owner in
+        ascending order. Candidates are the grid cells in each point's
+        bounding box, looked up together by key.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        if len(latitudes) == 0 or len(self.cell_keys) == 0 or np.abs(latitudes).max() > 80.0:
+            cell_lists = [self.cells_near(lat, lon, radius_km) for lat, lon in zip(latitudes.tolist(), longitudes.tolist())]
+            owners = np.repeat(np.arange(len(cell_lists)), [len(cells) for cells in cell_lists])
+            cells = np.concatenate(cell_lists) if cell_lists else np.empty(0, dtype=np.int64)
+            return owners, cells.astype(np.int64)
+
+        cell_km = self.cell_deg * KM_PER_DEGREE
+        lat_reach = int(math.ceil(radius_km / cell_km)) + 1
+        min_cos = math.cos(math.radians(min(89.0, float(np.abs(latitudes).max()) + lat_reach * self.cell_deg)))
+        lon_reach = int(math.ceil(radius_km / (cell_km * min_cos))) + 1
+        d_lat, d_lon = np.meshgrid(np.arange(-lat_reach, lat_reach + 1), np.arange(-lon_reach, lon_reach + 1), indexing="ij")
+
+        lat_cell = np.floor((latitudes + 90.0) / self.cell_deg).astype(np.int64)
+        lon_cell = np.floor((longitudes + 180.0) / self.cell_deg).astype(np.int64)
+        keys = (
+            (lat_cell[:, None] + d_lat.ravel()) * self.lon_cells
+            + (lon_cell[:, None] + d_lon.ravel()) % self.lon_cells
+        )
+        positions = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        owners, columns = np.nonzero(self.cell_keys[positions] == keys)
+        cells = positions[owners, columns]
+        distances = equirectangular_distance(latitudes[owners], longitudes[owners], self.cell_lat[cells], self.cell_lon[cells])
+        keep = distances <= radius_km
+        owners, cells = owners[keep], cells[keep]
+        order = np.lexsort((cells, owners))
+        return owners[order], cells[order]
+
+    def cells_at(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """Get the model cell index of each point, -1 where the model has no cell"""
+        keys = (
+            np.floor((np.asarray(latitude) + 90.0) / self.cell_deg).astype(np.int64) * self.lon_cells
+            + np.floor((np.asarray(longitude) + 180.0) / self.cell_deg).astype(np.int64)
+        )
+        if len(self.cell_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        return np.where(self.cell_keys[positions] == keys, positions, -1)
+
+    def confidence(self, cells: np.ndarray) -> np.ndarray:
+        """Confidence in a cell's rates, growing with its training support"""
+        support = self.support[cells]
+        return support / (support + MODEL_CONFIDENCE_PRIOR)
+
+    def expected_counts(self, cells: np.ndarray, hour_weights: np.ndarray) -> np.ndarray:
+        """
+        Expected incidents per (cell, type) for rows of `cells` (P,) and
+        per-row hour-of-week occurrence counts `hour_weights` (P, 168)
+        """
+        return np.einsum("pth,ph->pt", self.rates[cells], hour_weights.astype(np.float32), optimize=True)
+
+def hour_weights(start_us: int, end_us: int) -> np.ndarray:
+    """
+    Count how many times each local hour of the week occurs in
+    [start_us, end_us), at whole-hour resolution
+    """
+    return hour_weights_batch(np.array([start_us]), np.array([end_us]))[0]
+
+def hour_weights_batch(start_us: np.ndarray, end_us: np.ndarray) -> np.ndarray:
+    """`hour_weights` for many time ranges at once, returning (ranges, 168)"""
+    start_us = np.asarray(start_us, dtype=np.int64)
+    end_us = np.asarray(end_us, dtype=np.int64)
+    first_hour = start_us // US_PER_HOUR
+    hours = np.maximum(0, -(-end_us // US_PER_HOUR) - first_hour)
+    full_weeks, remainder = np.divmod(hours, HOURS_PER_WEEK)
+    weights = np.repeat(full_weeks.astype(np.float64)[:, None], HOURS_PER_WEEK, axis=1)
+
+    # The partial week left over after the full weeks, one row per range
+    offsets = np.arange(HOURS_PER_WEEK)
+    in_tail = offsets < remainder[:, None]
+    owners, steps = np.nonzero(in_tail)
+    if len(owners):
+        tail = (first_hour[owners] + full_weeks[owners] * HOURS_PER_WEEK + steps) * US_PER_HOUR
+        flat = owners * HOURS_PER_WEEK + hour_of_week(tail)
+        weights += np.bincount(flat, minlength=weights.size).reshape(weights.shape)
+    return weights
+
+def _neighbor_mean(keys: np.ndarray, values: np.ndarray, lon_cells: int) -> np.ndarray:
+    """Mean of `values` over each cell's 8 neighbors, counting missing cells as zero"""
+    total = np.zeros_like(values)
+    for d_lat in (-1, 0, 1):
+        for d_lon in (-1, 0, 1):
+            if d_lat == 0 and d_lon == 0:
+                continue
+            neighbors = keys + d_lat * lon_cells + d_lon
+            positions = np.minimum(np.searchsorted(keys, neighbors), len(keys) - 1)
+            found = np.flatnonzero(keys[positions] == neighbors)
+            total[found] += values[positions[found]]
+    return total / 8.0
+
+def fit_rate_model(
+    version: str,
+    cell_deg: float,
+    cell_keys: np.ndarray,
+    counts: np.ndarray,
+    weeks: float,
+    type_names: List[str],
+    prior_strength: float = MODEL_PRIOR_STRENGTH,
+    spatial_smoothing: float = MODEL_SPATIAL_SMOOTHING,
+    metadata: Optional[Dict] = None
+) -> CrimeRateModel:
+    """
+    Fit per-cell Poisson rates from (possibly recency-weighted) incident
+    counts `counts[cell, type, hour_of_week]` observed over `weeks` weeks.
+
+    Counts are first blended with the mean of the 8 neighboring cells
+    (`spatial_smoothing`, a box kernel density estimate), then each cell's
+    type/hour profile is shrunk towards the citywide profile with
+    `prior_strength` pseudo-observations per observed incident. The
+    shrinkage keeps each cell's total rate unchanged.
+    """
+    order = np.argsort(cell_keys, kind="stable")
+    cell_keys = np.asarray(cell_keys, dtype=np.int64)[order]
+    counts = np.asarray(counts, dtype=np.float64)[order]
+    lon_cells = int(math.ceil(360.0 / cell_deg))
+
+    if len(cell_keys) and spatial_smoothing:
+        counts = (1 - spatial_smoothing) * counts + spatial_smoothing * _neighbor_mean(cell_keys, counts, lon_cells)
+
+    support = counts.sum(axis=(1, 2))
+    profile = counts.sum(axis=0)
+    if profile.sum() > 0:
+        profile = profile / profile.sum()
+    rates = (counts + prior_strength * support[:, None, None] * profile) / ((1 + prior_strength) * max(weeks, 1e-9))
+
+    return CrimeRateModel(
+        version=version,
+        cell_deg=cell_deg,
+        cell_keys=cell_keys,
+        cell_lat=(cell_keys // lon_cells + 0.5) * cell_deg - 90.0,
+        cell_lon=(cell_keys % lon_cells + 0.5) * cell_deg - 180.0,
+        rates=rates.astype(np.float32),
+        support=support,
+        type_names=list(type_names),
+        trained_at=datetime.now(),
+        metadata={
+            "weeks": weeks,
+            "prior_strength": prior_strength,
+            "spatial_smoothing": spatial_smoothing,
+            **(metadata or {})
+        }
+    )
+
+def save_model(model: CrimeRateModel, directory: str) -> str:
+    """
+    Write the model as `crime_model_<version>.npz` under `directory`.
+    The file is written under a temporary name and renamed into place, so
+    a watcher never sees a partial artifact. Returns the path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{ARTIFACT_PREFIX}{model.version}{ARTIFACT_SUFFIX}")
+    temporary = path + ".tmp"
+    meta = {
+        "version": model.version,
+        "cell_deg": model.cell_deg,
+        "type_names": model.type_names,
+        "trained_at": model.trained_at.isoformat(),
+        "metadata": model.metadata
+    }
+    with open(temporary, "wb") as f:
+        np.savez_compressed(
+            f,
+            cell_keys=model.cell_keys,
+            rates=model.rates,
+            support=model.support,
+            meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+        )
+    os.replace(temporary, path)
+    return path
+
+def load_model_file(path: str) -> CrimeRateModel:
+    """Read a model artifact written by `save_model`"""
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        cell_keys = data["cell_keys"].astype(np.int64)
+        rates = data["rates"].astype(np.float32)
+        support = data["support"].astype(np.float64)
+    cell_deg = float(meta["cell_deg"])
+    lon_cells = int(math.ceil(360.0 / cell_deg))
+    if rates.ndim != 3 or rates.shape[0] != len(cell_keys) or rates.shape[2] != HOURS_PER_WEEK:
+        raise ValueError(f"Malformed model artifact: {path}")
+    return CrimeRateModel(
+        version=meta["version"],
+        cell_deg=cell_deg,
+        cell_keys=cell_keys,
+        cell_lat=(cell_keys // lon_cells + 0.5) * cell_deg - 90.0,
+        cell_lon=(cell_keys % lon_cells + 0.5) * cell_deg - 180.0,
+        rates=rates,
+        support=support,
+        type_names=list(meta["type_names"]),
+        trained_at=datetime.fromisoformat(meta["trained_at"]),
+        metadata=meta.get("metadata", {})
+    )
+
+def find_artifact(directory: str, version: str) -> Optional[str]:
+    """Get the path of the artifact for `version` under `directory`, if any"""
+    paths = glob.glob(os.path.join(directory, f"{ARTIFACT_PREFIX}*{ARTIFACT_SUFFIX}"))
+    name = f"{ARTIFACT_PREFIX}{version}{ARTIFACT_SUFFIX}"
+    return next((path for path in paths if os.path.basename(path) == name), None)
+
+def latest_artifact(directory: str) -> Optional[str]:
+    """Get the path of the newest model artifact under `directory`, if any"""
+    paths = glob.glob(os.path.join(directory, f"{ARTIFACT_PREFIX}*{ARTIFACT_SUFFIX}"))
+    # Versions are UTC timestamps, so they sort chronologically
+    return max(paths) if paths else None
+
+def new_version() -> str:
+    """A sortable version string for a newly trained model"""
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
@@ -1,9 +1,33 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime, timedelta
+import base64
+import hashlib
+import struct
+import threading
+import uuid
 import random
 import math
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from models.crime import CrimeIncident, CrimeHeatmapData, CrimeHeatmapPoint, Location, CrimeStatistics
+import numpy as np
+
+from config import (
+    HEATMAP_TILE_BINS, TILE_CACHE_SIZE, TILE_CACHE_TTL, MAX_TIME_SERIES_BUCKETS,
+    DATABASE_URL, STORAGE_POOL_SIZE, STORAGE_CHUNK_SIZE, SEED_MOCK_INCIDENTS, HOTSPOT_WINDOW_DAYS
+)
+from models.crime import CrimeIncident, CrimeHeatmapData, Location, CrimeStatistics, AreaFilter
+from services.incident_store import IncidentStore, IncidentColumns, incidents_to_columns, random_uuid4_ids
+from services.incident_repository import SQLiteIncidentRepository, sqlite_path_from_url
+from services.rollups import SLOT_US, whole_slots
+from services.hotspots import HotspotSnapshot, find_hotspots
+from utils.data_utils import (
+    datetime_to_epoch_us, distances_from_point, parse_interval, time_bucket_edges, hour_of_week,
+    HOURS_PER_WEEK, LOCAL_TZ
+)
+from utils.mapbox_utils import calculate_bounding_box, tile_to_bounding_box, lon_lat_to_tile_pixels
+from utils.cache import LRUCache
+from utils.single_flight import SingleFlight
+from utils.response_formats import Columns, Dictionary
 
 # Mock crime data (will be replaced with database queries)
 CRIME_TYPES = [
@@ -11,6 +35,8 @@ CRIME_TYPES = [
     "Fraud", "Drug Offense", "Vehicle Theft", "Harassment"
 ]
 
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
 # Mumbai coordinates for mock data generation
 MUMBAI_CENTER = {"latitude": 19.0760, "longitude": 72.8777}
 MUMBAI_RADIUS = 0.1  # Roughly 10km
@@ -45,252 +71,661 @@ def generate_mock_incidents(count: int = 100) -> List[CrimeIncident]:
     
     return incidents
 
-# Cache mock incidents
-_mock_incidents = generate_mock_incidents(500)
+# Columnar incident store. Without DATABASE_URL it only lives in memory and
+# is seeded with mock incidents; otherwise init_storage() fills it on startup.
+_store = IncidentStore(CRIME_TYPES)
+if not DATABASE_URL:
+    _store.append_incidents(generate_mock_incidents(SEED_MOCK_INCIDENTS))
 
-def get_crime_incidents(
+# Durable storage backend, and how far the store has caught up with it
+_repository: Optional[SQLiteIncidentRepository] = None
+_sync_lock = threading.Lock()
+_synced_row_id = 0
+_synced_delete_seq = 0
+
+def get_incident_store() -> IncidentStore:
+    """Get the shared incident store"""
+    return _store
+
+def get_repository() -> Optional[SQLiteIncidentRepository]:
+    """Get the durable storage backend, or None when running in memory"""
+    return _repository
+
+def init_storage() -> None:
+    """
+    Open the storage backend configured by DATABASE_URL and load its
+    incidents into the store. Blocking; run it off the event loop.
+    """
+    global _repository, _synced_delete_seq
+    if not DATABASE_URL:
+        return
+    path = sqlite_path_from_url(DATABASE_URL)
+    if path is None:
+        raise ValueError(f"Unsupported DATABASE_URL, expected sqlite:///path: {DATABASE_URL}")
+    _repository = SQLiteIncidentRepository(path, pool_size=STORAGE_POOL_SIZE)
+    # Deletes logged before the initial load are already absent from it
+    _synced_delete_seq = _repository.max_delete_seq()
+    sync_from_storage()
+    if len(_store) == 0 and SEED_MOCK_INCIDENTS:
+        add_incident_batch(**incidents_to_columns(generate_mock_incidents(SEED_MOCK_INCIDENTS)))
+
+def close_storage() -> None:
+    """Close the storage backend's connections"""
+    if _repository is not None:
+        _repository.close()
+
+def sync_from_storage() -> int:
+    """
+    Apply rows inserted and deleted in storage since the last sync, by this
+    or any other worker. Returns the number of rows added.
+    """
+    global _synced_row_id, _synced_delete_seq
+    if _repository is None:
+        return 0
+    with _sync_lock:
+        added = 0
+        for chunk in _repository.iter_chunks(after_row_id=_synced_row_id, chunk_size=STORAGE_CHUNK_SIZE):
+            _synced_row_id = chunk.pop("last_row_id")
+            added += _store.append_batch(**chunk)
+        deleted, _synced_delete_seq = _repository.deleted_since(_synced_delete_seq)
+        if deleted:
+            _store.remove([str(uuid.UUID(bytes=row_id)) for row_id in deleted])
+        return added
+
+def add_incident_batch(**columns) -> np.ndarray:
+    """
+    Add a batch of validated incident columns (see IncidentStore.append_batch)
+    and return a mask of the rows added: rows whose id is already stored, or
+    repeats an earlier row of the batch, are skipped. With a storage backend
+    rows are written there first and the store then catches up from it.
+    """
+    if _repository is None:
+        return _store.append_new(**columns)
+    if columns.get("ids") is None:
+        columns["ids"] = random_uuid4_ids(len(columns["timestamp"]))
+    if columns.get("descriptions") is None:
+        columns["descriptions"] = [None] * len(columns["timestamp"])
+    inserted = _repository.insert_batch(**columns)
+    sync_from_storage()
+    return inserted
+
+def _area_bbox(area: AreaFilter) -> Optional[List[float]]:
+    """Bounding box covering the area, or None when bbox and radius do not overlap"""
+    bbox = area.bbox
+    if area.radius_km is not None:
+        radius_bbox = calculate_bounding_box(area.center.latitude, area.center.longitude, area.radius_km)
+        if bbox is None:
+            bbox = radius_bbox
+        else:
+            bbox = [
+                max(bbox[0], radius_bbox[0]), max(bbox[1], radius_bbox[1]),
+                min(bbox[2], radius_bbox[2]), min(bbox[3], radius_bbox[3])
+            ]
+            if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                return None
+    return bbox
+
+def _area_rows(columns: IncidentColumns, area: Optional[AreaFilter]) -> Optional[np.ndarray]:
+    """
+    Get the sorted rows inside the area, or None when there is no spatial filter.
+    The grid index narrows the search to the covered cells, the radius check is exact.
+    """
+    if area is None or (area.bbox is None and area.radius_km is None):
+        return None
+    
+    bbox = _area_bbox(area)
+    if bbox is None:
+        return np.empty(0, dtype=np.int64)
+    
+    rows = _store.rows_in_bbox(columns, bbox)
+    if area.radius_km is not None:
+        distances = distances_from_point(
+            area.center.latitude, area.center.longitude,
+            columns.latitude[rows], columns.longitude[rows]
+        )
+        rows = rows[distances <= area.radius_km]
+    return rows
+
+def area_mask(columns: IncidentColumns, rows: np.ndarray, area: AreaFilter) -> np.ndarray:
+    """Check which of the given rows lie inside the area, without the spatial index"""
+    bbox = _area_bbox(area)
+    if bbox is None:
+        return np.zeros(len(rows), dtype=bool)
+    latitude, longitude = columns.latitude[rows], columns.longitude[rows]
+    inside = (longitude >= bbox[0]) & (latitude >= bbox[1]) & (longitude <= bbox[2]) & (latitude <= bbox[3])
+    if area.radius_km is not None:
+        inside &= distances_from_point(area.center.latitude, area.center.longitude, latitude, longitude) <= area.radius_km
+    return inside
+
+def _filter_rows(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+):
+    """Get a column snapshot and the indices of the rows matching the filters"""
+    columns = _store.columns()
+    type_code = None
+    if crime_type:
+        type_code = _store.type_code_for(crime_type)
+        if type_code is None:
+            return columns, np.empty(0, dtype=np.int64)
+    rows = _store.select(
+        columns,
+        start_us=datetime_to_epoch_us(start_date) if start_date else None,
+        end_us=datetime_to_epoch_us(end_date) if end_date else None,
+        type_code=type_code,
+        candidates=_area_rows(columns, area)
+    )
+    return columns, rows
+
+def encode_cursor(timestamp_us: int, row: int) -> str:
+    """Encode a (timestamp, row) keyset position as an opaque cursor"""
+    raw = struct.pack("<qq", timestamp_us, row)
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a cursor produced by `encode_cursor`, raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return struct.unpack("<qq", raw)
+    except (ValueError, struct.error):
+        raise ValueError("Invalid cursor")
+
+def _incident_page(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     crime_type: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
-) -> List[CrimeIncident]:
-    """Get crime incidents based on filters"""
-    filtered_incidents = _mock_incidents
-    
-    # Apply filters
-    if start_date:
-        filtered_incidents = [i for i in filtered_incidents if i.timestamp >= start_date]
-    if end_date:
-        filtered_incidents = [i for i in filtered_incidents if i.timestamp <= end_date]
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+) -> Tuple[IncidentColumns, np.ndarray, Optional[str]]:
+    """Select a page of rows (newest first) and the cursor for the next page"""
+    columns = _store.columns()
+    type_code = None
     if crime_type:
-        filtered_incidents = [i for i in filtered_incidents if i.crime_type == crime_type]
+        type_code = _store.type_code_for(crime_type)
+        if type_code is None:
+            return columns, np.empty(0, dtype=np.int64), None
     
-    # Sort by timestamp (newest first)
-    filtered_incidents.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    # Apply pagination
-    paginated_incidents = filtered_incidents[offset:offset + limit]
+    # Fetch one extra row to find out whether another page follows
+    rows = _store.newest_first(
+        columns,
+        start_us=datetime_to_epoch_us(start_date) if start_date else None,
+        end_us=datetime_to_epoch_us(end_date) if end_date else None,
+        type_code=type_code,
+        limit=limit + 1,
+        offset=offset,
+        before=decode_cursor(cursor) if cursor else None,
+        candidates=_area_rows(columns, area)
+    )
     
-    return paginated_incidents
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = int(rows[-1])
+        next_cursor = encode_cursor(int(columns.timestamp[last]), last)
+    return columns, rows, next_cursor
 
-def get_heatmap_data(
+def get_crime_incidents_page(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     crime_type: Optional[str] = None,
-    include_predictions: bool = False
-) -> CrimeHeatmapData:
-    """Get heatmap data for visualization"""
-    # Get filtered incidents
-    incidents = get_crime_incidents(start_date, end_date, crime_type, limit=1000)
-    
-    # Convert to heatmap points
-    points = []
-    for incident in incidents:
-        weight = incident.severity / 5.0  # Normalize to 0-1
-        point = CrimeHeatmapPoint(
-            location=incident.location,
-            weight=weight,
-            crime_type=incident.crime_type
-        )
-        points.append(point)
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+) -> Tuple[List[CrimeIncident], Optional[str]]:
+    """
+    Get a page of crime incidents (newest first) and the cursor for the next
+    page, or None when this is the last page
+    """
+    columns, rows, next_cursor = _incident_page(start_date, end_date, crime_type, limit, offset, cursor, area)
+    return _store.to_models(columns, rows), next_cursor
+
+def get_crime_incident_records(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """`get_crime_incidents_page` as JSON-ready dicts, without building models"""
+    columns, rows, next_cursor = _incident_page(start_date, end_date, crime_type, limit, offset, cursor, area)
+    return _store.to_records(columns, rows), next_cursor
+
+def get_crime_incident_columns(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+) -> Tuple[Columns, Optional[str]]:
+    """`get_crime_incidents_page` as a columnar response table"""
+    columns, rows, next_cursor = _incident_page(start_date, end_date, crime_type, limit, offset, cursor, area)
+    return _store.to_columnar(columns, rows), next_cursor
+
+def get_crime_incidents(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    area: Optional[AreaFilter] = None
+) -> List[CrimeIncident]:
+    """Get crime incidents based on filters"""
+    incidents, _ = get_crime_incidents_page(start_date, end_date, crime_type, limit, offset, area=area)
+    return incidents
+
+def get_heatmap_columns(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    include_predictions: bool = False,
+    area: Optional[AreaFilter] = None
+) -> Tuple[Columns, Dict]:
+    """
+    Get heatmap points as a response table (latitude, longitude, weight,
+    crime_type) along with their max_weight and min_weight
+    """
+    # Newest filtered incidents, weighted by severity normalized to 0-1
+    columns, rows, _ = _incident_page(start_date, end_date, crime_type, limit=1000, area=area)
+    latitude = columns.latitude[rows]
+    longitude = columns.longitude[rows]
+    weight = columns.severity[rows] / 5.0
+    type_codes = columns.type_code[rows].astype(np.int32)
+    type_names = list(_store.type_names)
     
     # Add prediction points if requested
     if include_predictions:
         from services.prediction_service import get_prediction_hotspots
         prediction_hotspots = get_prediction_hotspots(24)
-        
-        for hotspot in prediction_hotspots:
-            point = CrimeHeatmapPoint(
-                location=Location(
-                    latitude=hotspot["latitude"],
-                    longitude=hotspot["longitude"]
-                ),
-                weight=hotspot["probability"],
-                crime_type="Prediction"
-            )
-            points.append(point)
+        count = len(prediction_hotspots)
+        latitude = np.concatenate([latitude, [h["latitude"] for h in prediction_hotspots]])
+        longitude = np.concatenate([longitude, [h["longitude"] for h in prediction_hotspots]])
+        weight = np.concatenate([weight, [h["probability"] for h in prediction_hotspots]])
+        type_codes = np.concatenate([type_codes, np.full(count, len(type_names), dtype=np.int32)])
+        type_names.append("Prediction")
     
-    # Calculate min and max weights
-    weights = [p.weight for p in points]
-    max_weight = max(weights) if weights else 1.0
-    min_weight = min(weights) if weights else 0.0
-    
-    return CrimeHeatmapData(
-        points=points,
-        max_weight=max_weight,
-        min_weight=min_weight
-    )
+    table = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "weight": weight,
+        "crime_type": Dictionary.encode(type_codes, type_names)
+    }
+    return table, {
+        "max_weight": float(weight.max()) if len(weight) else 1.0,
+        "min_weight": float(weight.min()) if len(weight) else 0.0
+    }
 
-def get_crime_statistics(
+def heatmap_records(table: Columns, metadata: Dict) -> Dict:
+    """JSON form of `CrimeHeatmapData` for a table from `get_heatmap_columns`"""
+    type_names = table["crime_type"].values
+    return {
+        "points": [
+            {"location": {"latitude": latitude, "longitude": longitude}, "weight": weight, "crime_type": type_names[code]}
+            for latitude, longitude, weight, code in zip(
+                table["latitude"].tolist(),
+                table["longitude"].tolist(),
+                table["weight"].tolist(),
+                table["crime_type"].codes.tolist()
+            )
+        ],
+        "max_weight": metadata["max_weight"],
+        "min_weight": metadata["min_weight"]
+    }
+
+def get_heatmap_data(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    crime_type: Optional[str] = None
-) -> CrimeStatistics:
-    """Get crime statistics and aggregated data"""
-    # Get filtered incidents
-    incidents = get_crime_incidents(start_date, end_date, crime_type, limit=1000)
+    crime_type: Optional[str] = None,
+    include_predictions: bool = False,
+    area: Optional[AreaFilter] = None
+) -> CrimeHeatmapData:
+    """Get heatmap data for visualization"""
+    table, metadata = get_heatmap_columns(start_date, end_date, crime_type, include_predictions, area)
+    return CrimeHeatmapData.model_validate(heatmap_records(table, metadata))
+
+# Aggregated heatmap tiles, keyed on tile, filters and store generation
+_tile_cache = LRUCache(max_entries=TILE_CACHE_SIZE, ttl=TILE_CACHE_TTL)
+
+# Latest published high risk area clustering, replaced whole by
+# refresh_high_risk_areas()
+_hotspots: Optional[HotspotSnapshot] = None
+
+# Identical heatmap, tile and statistics queries running at the same time
+# share one computation
+query_flights = SingleFlight()
+
+def _pack(values: np.ndarray) -> str:
+    """Encode an array as base64 little-endian bytes"""
+    return base64.b64encode(values.astype(values.dtype.newbyteorder("<")).tobytes()).decode("ascii")
+
+def _bin_points(
+    longitude: np.ndarray,
+    latitude: np.ndarray,
+    weights: np.ndarray,
+    z: int, x: int, y: int,
+    bins: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aggregate points into a bins x bins grid over the tile, returns the non-empty cells"""
+    px, py = lon_lat_to_tile_pixels(longitude, latitude, z, x, y, bins)
+    cells = np.clip(py.astype(np.int64), 0, bins - 1) * bins + np.clip(px.astype(np.int64), 0, bins - 1)
+    counts = np.bincount(cells, minlength=bins * bins)
+    sums = np.bincount(cells, weights=weights, minlength=bins * bins)
+    occupied = np.flatnonzero(counts)
+    return occupied, counts[occupied], sums[occupied]
+
+def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    include_predictions: bool = False
+) -> Dict:
+    """
+    Get an aggregated heatmap tile: incidents in tile z/x/y binned into a
+    HEATMAP_TILE_BINS x HEATMAP_TILE_BINS grid with per-cell counts and
+    severity sums. Cells are row-major indices; arrays are packed as
+    base64 little-endian (cells uint16, counts uint32, sums float32).
+    """
+    columns = _store.columns()
+    forecast = None
+    if include_predictions:
+        from services.prediction_service import get_hotspot_forecast
+        forecast = get_hotspot_forecast()
+    # The prediction layer changes with every forecast refresh
+    forecast_key = (forecast.model_version, forecast.generated_at) if forecast is not None else None
+    key = (z, x, y, start_date, end_date, crime_type, forecast_key, columns.generation)
+    tile = _tile_cache.get(key)
+    if tile is not None:
+        return tile
+    
+    bins = HEATMAP_TILE_BINS
+    _, rows = _filter_rows(start_date, end_date, crime_type, AreaFilter(bbox=tile_to_bounding_box(z, x, y)))
+    cells, counts, severity_sums = _bin_points(
+        columns.longitude[rows], columns.latitude[rows], columns.severity[rows], z, x, y, bins
+    )
+    tile = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "bins": bins,
+        "total_incidents": int(len(rows)),
+        "max_count": int(counts.max()) if len(counts) else 0,
+        "cells": _pack(cells.astype(np.uint16)),
+        "counts": _pack(counts.astype(np.uint32)),
+        "severity_sums": _pack(severity_sums.astype(np.float32))
+    }
+    
+    # Add prediction weights as a separate layer if requested
+    if forecast is not None:
+        from services.prediction_service import get_prediction_hotspots
+        hotspots = get_prediction_hotspots(24, crime_type, forecast=forecast)
+        min_lon, min_lat, max_lon, max_lat = tile_to_bounding_box(z, x, y)
+        hotspots = [h for h in hotspots if min_lat <= h["latitude"] <= max_lat and min_lon <= h["longitude"] <= max_lon]
+        prediction_cells, _, probability_sums = _bin_points(
+            np.array([h["longitude"] for h in hotspots], dtype=np.float64),
+            np.array([h["latitude"] for h in hotspots], dtype=np.float64),
+            np.array([h["probability"] for h in hotspots], dtype=np.float64),
+            z, x, y, bins
+        )
+        tile["prediction_cells"] = _pack(prediction_cells.astype(np.uint16))
+        tile["prediction_weights"] = _pack(probability_sums.astype(np.float32))
     
-    # Count by type
-    by_type = {}
-    for incident in incidents:
-        by_type[incident.crime_type] = by_type.get(incident.crime_type, 0) + 1
+    tile["etag"] = hashlib.sha1(repr(sorted(tile.items())).encode()).hexdigest()
+    _tile_cache.set(key, tile)
+    return tile
+
+def _count_cube(columns: IncidentColumns, rows: np.ndarray, type_count: Optional[int] = None) -> np.ndarray:
+    """
+    Count rows by (crime type code, weekday, hour) in a single bincount over
+    the precomputed type and hour-of-week columns. Returns a (types, 7, 24)
+    array, `type_count` types by default as many as the store knows.
+    """
+    if type_count is None:
+        type_count = len(_store.type_names)
+    keys = columns.type_code[rows].astype(np.int64) * HOURS_PER_WEEK + columns.hour_of_week[rows]
+    counts = np.bincount(keys, minlength=type_count * HOURS_PER_WEEK)
+    return counts.reshape(type_count, 7, 24)
+
+def _statistics_from_cube(cube: np.ndarray) -> Dict:
+    """Derive the statistics breakdowns from a (types, 7, 24) count cube"""
+    type_counts = cube.sum(axis=(1, 2))
+    day_counts = cube.sum(axis=(0, 2))
+    hour_counts = cube.sum(axis=(0, 1))
     
-    # Count by time of day
+    by_type = {
+        _store.type_names[code]: int(count)
+        for code, count in enumerate(type_counts.tolist()) if count
+    }
     by_time_of_day = {
-        "morning": 0,   # 6AM-12PM
-        "afternoon": 0, # 12PM-6PM
-        "evening": 0,   # 6PM-12AM
-        "night": 0      # 12AM-6AM
+        "morning": int(hour_counts[6:12].sum()),     # 6AM-12PM
+        "afternoon": int(hour_counts[12:18].sum()),  # 12PM-6PM
+        "evening": int(hour_counts[18:24].sum()),    # 6PM-12AM
+        "night": int(hour_counts[0:6].sum())         # 12AM-6AM
     }
+    by_day_of_week = dict(zip(DAY_NAMES, (int(c) for c in day_counts)))
     
-    for incident in incidents:
-        hour = incident.timestamp.hour
-        if 6 <= hour < 12:
-            by_time_of_day["morning"] += 1
-        elif 12 <= hour < 18:
-            by_time_of_day["afternoon"] += 1
-        elif 18 <= hour < 24:
-            by_time_of_day["evening"] += 1
-        else:
-            by_time_of_day["night"] += 1
-    
-    # Count by day of week
-    by_day_of_week = {
-        "monday": 0,
-        "tuesday": 0,
-        "wednesday": 0,
-        "thursday": 0,
-        "friday": 0,
-        "saturday": 0,
-        "sunday": 0
+    return {
+        "total_incidents": int(type_counts.sum()),
+        "by_type": by_type,
+        "by_time_of_day": by_time_of_day,
+        "by_day_of_week": by_day_of_week
     }
+
+def _rollup_window(start_us: int, end_us: int, type_code: Optional[int]):
+    """
+    Split the inclusive range [start_us, end_us] into whole rollup slots and
+    the slivers at either end. Returns (columns, first_slot, slot_counts,
+    sliver_rows) where slot_counts is (types, slots) from the rollups and
+    sliver_rows are the matching raw rows found through the time index.
+    """
+    first_slot, end_slot = whole_slots(start_us, end_us)
+    columns, _, slot_counts = _store.read_rollups(first_slot, end_slot)
+    if first_slot == end_slot:
+        sliver_rows = _store.select(columns, start_us, end_us, type_code)
+    else:
+        sliver_rows = np.concatenate([
+            _store.select(columns, start_us, first_slot * SLOT_US - 1, type_code),
+            _store.select(columns, end_slot * SLOT_US, end_us, type_code)
+        ])
+    return columns, first_slot, slot_counts, sliver_rows
+
+def _only_type(counts: np.ndarray, type_code: Optional[int]) -> np.ndarray:
+    """Zero every type row of a (types, ...) count array except `type_code`"""
+    if type_code is None:
+        return counts
+    filtered = np.zeros_like(counts)
+    if type_code < counts.shape[0]:
+        filtered[type_code] = counts[type_code]
+    return filtered
+
+def _rollup_count_cube(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    type_code: Optional[int]
+) -> np.ndarray:
+    """
+    Count cube for an unfiltered area, answered from the rollups in
+    O(types x slots) plus a raw scan of the partial slots at the range edges
+    """
+    if start_date is None and end_date is None:
+        _, by_hour_of_week, _ = _store.read_rollups()
+        return _only_type(by_hour_of_week, type_code).reshape(-1, 7, 24)
+    
+    columns = _store.columns()
+    if len(columns.sorted_timestamp) == 0:
+        return np.zeros((0, 7, 24), dtype=np.int64)
+    start_us = datetime_to_epoch_us(start_date) if start_date else int(columns.sorted_timestamp[0])
+    end_us = datetime_to_epoch_us(end_date) if end_date else int(columns.sorted_timestamp[-1])
+    if end_us < start_us:
+        return np.zeros((0, 7, 24), dtype=np.int64)
     
-    for incident in incidents:
-        day_name = incident.timestamp.strftime("%A").lower()
-        by_day_of_week[day_name] += 1
+    # Sized from the rollup snapshot itself: types added since would not
+    # fit a cube sized beforehand, and every code in the snapshot's rows
+    # has a rollup row
+    columns, first_slot, slot_counts, sliver_rows = _rollup_window(start_us, end_us, type_code)
+    slot_counts = _only_type(slot_counts, type_code)
+    type_count = slot_counts.shape[0]
+    cube = np.zeros((type_count, HOURS_PER_WEEK), dtype=np.int64)
+    slot_hours = hour_of_week(np.arange(first_slot, first_slot + slot_counts.shape[1], dtype=np.int64) * SLOT_US)
+    for code in range(type_count):
+        cube[code] = np.bincount(slot_hours, weights=slot_counts[code], minlength=HOURS_PER_WEEK)
+    
+    return cube.reshape(type_count, 7, 24) + _count_cube(columns, sliver_rows, type_count)
+
+def get_crime_statistics(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    area: Optional[AreaFilter] = None
+) -> CrimeStatistics:
+    """
+    Get crime statistics and aggregated data over every matching incident.
+    Without a spatial filter the counts come from the maintained rollups.
+    """
+    if area is None:
+        type_code = _store.type_code_for(crime_type) if crime_type else None
+        if crime_type and type_code is None:
+            cube = np.zeros((len(_store.type_names), 7, 24), dtype=np.int64)
+        else:
+            cube = _rollup_count_cube(start_date, end_date, type_code)
+    else:
+        columns, rows = _filter_rows(start_date, end_date, crime_type, area)
+        cube = _count_cube(columns, rows)
+    statistics = _statistics_from_cube(cube)
     
     # Identify high risk areas
     high_risk_areas = get_high_risk_areas()
     
     return CrimeStatistics(
-        total_incidents=len(incidents),
-        by_type=by_type,
-        by_time_of_day=by_time_of_day,
-        by_day_of_week=by_day_of_week,
+        **statistics,
         high_risk_areas=high_risk_areas
     )
 
+def remove_incident(incident_id: str) -> bool:
+    """Remove an incident by id, returns False if it does not exist"""
+    if _repository is None:
+        return _store.remove([incident_id]) > 0
+    deleted = _repository.delete([uuid.UUID(incident_id).bytes])
+    sync_from_storage()
+    return deleted > 0
+
 def get_crime_types() -> List[str]:
     """Get all available crime types"""
     return CRIME_TYPES
 
+def _bucket_label(edge: datetime, index: int, unit: str, count: int) -> str:
+    """Format a bucket start for display"""
+    if unit == "hour" and count == 1:
+        return edge.strftime("%H:00")
+    if unit in ("minute", "hour"):
+        return edge.strftime("%Y-%m-%d %H:%M")
+    if unit == "week":
+        return f"Week {index + 1}"
+    if unit == "month":
+        return edge.strftime("%Y-%m")
+    return edge.strftime("%Y-%m-%d")
+
 def get_time_series_data(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     crime_type: Optional[str] = None,
-    interval: str = "day"
+    interval: str = "day",
+    timezone: Optional[str] = None
 ) -> Dict:
-    """Get time series data for charts"""
-    # Get filtered incidents
-    incidents = get_crime_incidents(start_date, end_date, crime_type, limit=1000)
+    """
+    Get time series data for charts. Buckets follow the calendar of
+    `timezone` (default: the configured TIMEZONE) and every matching
+    incident is assigned to its bucket in a single searchsorted pass.
+    """
+    try:
+        tz = ZoneInfo(timezone) if timezone else LOCAL_TZ
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {timezone}")
+    unit, count = parse_interval(interval)
     
-    # Default date range if not specified
-    if not start_date:
-        start_date = datetime.now() - timedelta(days=30)
+    # Default date range if not specified (last 24 hours for hourly data)
     if not end_date:
-        end_date = datetime.now()
-    
-    # Initialize time series data
-    time_series = []
-    
-    # Group by interval
-    if interval == "hour":
-        # Hourly data for the last 24 hours
-        for hour in range(24):
-            current_time = end_date - timedelta(hours=24-hour)
-            next_time = current_time + timedelta(hours=1)
-            
-            count = sum(1 for i in incidents if current_time <= i.timestamp < next_time)
-            
-            time_series.append({
-                "time": current_time.strftime("%H:00"),
-                "count": count
-            })
+        end_date = datetime.now(tz)
+    if not start_date:
+        start_date = end_date - (timedelta(hours=24) if unit in ("minute", "hour") else timedelta(days=30))
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=tz)
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=tz)
     
-    elif interval == "day":
-        # Daily data
-        days = (end_date - start_date).days + 1
-        for day in range(days):
-            current_date = start_date + timedelta(days=day)
-            next_date = current_date + timedelta(days=1)
-            
-            count = sum(1 for i in incidents if current_date <= i.timestamp < next_date)
-            
-            time_series.append({
-                "time": current_date.strftime("%Y-%m-%d"),
-                "count": count
-            })
+    edges = time_bucket_edges(start_date, end_date, interval, tz, max_buckets=MAX_TIME_SERIES_BUCKETS)
+    edges_us = np.array([datetime_to_epoch_us(edge) for edge in edges], dtype=np.int64)
     
-    elif interval == "week":
-        # Weekly data
-        weeks = ((end_date - start_date).days // 7) + 1
-        for week in range(weeks):
-            current_date = start_date + timedelta(weeks=week)
-            next_date = current_date + timedelta(weeks=1)
-            
-            count = sum(1 for i in incidents if current_date <= i.timestamp < next_date)
-            
-            time_series.append({
-                "time": f"Week {week+1}",
-                "count": count
-            })
+    type_code = _store.type_code_for(crime_type) if crime_type else None
+    if crime_type and type_code is None:
+        counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    elif np.all(edges_us % SLOT_US == 0):
+        # Slot-aligned buckets are summed from the rollups, only the partial
+        # slots at the range edges are read from the incidents
+        start_us, end_us = datetime_to_epoch_us(start_date), datetime_to_epoch_us(end_date)
+        columns, first_slot, slot_counts, sliver_rows = _rollup_window(start_us, end_us, type_code)
+        slot_totals = _only_type(slot_counts, type_code).sum(axis=0)
+        slot_starts = np.arange(first_slot, first_slot + len(slot_totals), dtype=np.int64) * SLOT_US
+        counts = np.bincount(
+            np.searchsorted(edges_us, slot_starts, side="right") - 1,
+            weights=slot_totals,
+            minlength=len(edges) - 1
+        ).astype(np.int64)
+        counts += np.bincount(
+            np.searchsorted(edges_us, columns.timestamp[sliver_rows], side="right") - 1,
+            minlength=len(edges) - 1
+        )
+    else:
+        # Range and type filters use the time index before bucketing
+        columns, rows = _filter_rows(start_date, end_date, crime_type)
+        buckets = np.searchsorted(edges_us, columns.timestamp[rows], side="right") - 1
+        counts = np.bincount(buckets, minlength=len(edges) - 1)
     
-    elif interval == "month":
-        # Monthly data
-        # This is simplified and doesn't handle month boundaries perfectly
-        months_dict = {}
-        for incident in incidents:
-            month_key = incident.timestamp.strftime("%Y-%m")
-            months_dict[month_key] = months_dict.get(month_key, 0) + 1
-        
-        for month, count in sorted(months_dict.items()):
-            time_series.append({
-                "time": month,
-                "count": count
-            })
+    time_series = [
+        {
+            "time": _bucket_label(edge, index, unit, count),
+            "start": edge.isoformat(),
+            "count": int(bucket_count)
+        }
+        for index, (edge, bucket_count) in enumerate(zip(edges[:-1], counts.tolist()))
+    ]
     
-    return {"data": time_series, "interval": interval}
+    return {"data": time_series, "interval": interval, "timezone": tz.key}
+
+def refresh_high_risk_areas() -> HotspotSnapshot:
+    """
+    Cluster the incidents of the last HOTSPOT_WINDOW_DAYS days and publish
+    the result. Skipped when the store has not changed since the run earlier
+    today. Blocking; run it off the event loop.
+    """
+    global _hotspots
+    columns = _store.columns()
+    current = _hotspots
+    # The window also slides, so re-run at least once a day
+    if current is not None and current.generation == columns.generation and current.generated_at.date() == datetime.now().date():
+        return current
+    start_us = None
+    if HOTSPOT_WINDOW_DAYS:
+        start_us = datetime_to_epoch_us(datetime.now() - timedelta(days=HOTSPOT_WINDOW_DAYS))
+    rows = _store.select(columns, start_us=start_us)
+    _hotspots = find_hotspots(columns, rows, list(_store.type_names))
+    return _hotspots
+
+def get_hotspot_snapshot() -> Optional[HotspotSnapshot]:
+    """Get the latest clustering run, or None before the first one"""
+    return _hotspots
 
 def get_high_risk_areas() -> List[dict]:
-    """Get current high risk areas"""
-    # In a real implementation, this would analyze crime clusters
-    # For now, return mock high risk areas
-    
-    # Mumbai neighborhoods
-    neighborhoods = [
-        {"name": "Andheri East", "latitude": 19.1136, "longitude": 72.8697},
-        {"name": "Dadar West", "latitude": 19.0178, "longitude": 72.8478},
-        {"name": "Bandra Station", "latitude": 19.0596, "longitude": 72.8295},
-        {"name": "Kurla Market", "latitude": 19.0726, "longitude": 72.8845},
-        {"name": "Juhu Beach", "latitude": 19.0883, "longitude": 72.8262}
-    ]
-    
-    high_risk_areas = []
-    for area in neighborhoods:
-        # Generate random crime types for each area
-        predicted_crimes = random.sample(CRIME_TYPES, k=random.randint(1, 3))
-        
-        high_risk_areas.append({
-            "name": area["name"],
-            "latitude": area["latitude"],
-            "longitude": area["longitude"],
-            "risk_level": random.choice(["high", "medium", "high", "high"]),  # Bias towards high
-            "predicted_crimes": predicted_crimes,
-            "recent_incidents": random.randint(5, 30)
-        })
-    
-    # Sort by risk level (high first)
-    high_risk_areas.sort(key=lambda x: 0 if x["risk_level"] == "high" else 1)
-    
-    return high_risk_areas
+    """Get current high risk areas from the latest clustering run"""
+    snapshot = _hotspots or refresh_high_risk_areas()
+    return list(snapshot.areas)
@@ -0,0 +1,168 @@
+from typing import List, Optional
+from dataclasses import dataclass
+from datetime import datetime
+import math
+import time
+
+import numpy as np
+
+from config import HOTSPOT_FORECAST_HORIZON, HOTSPOT_FORECAST_TOP_K
+from services.crime_model import CrimeRateModel, KM_PER_DEGREE
+from utils.data_utils import US_PER_HOUR, datetime_to_epoch_us, hour_of_week, local_isoformat
+from utils.response_formats import Columns, Dictionary
+
+# Cells ranked per block while computing, bounding the working set
+CELL_BLOCK = 4096
+
+@dataclass(frozen=True)
+class HotspotForecast:
+    """
+    Ranked hotspot forecasts for every horizon (1..horizon hours from
+    `origin`) and crime type, plus all types together in the last type
+    slot. Arrays are (horizon, types + 1, top_k), best first; slot [h - 1]
+    covers the next h hours.
+    """
+    model_version: str
+    origin: datetime          # local time the horizons count from
+    type_names: List[str]
+    cell_lat: np.ndarray      # model cell centers, indexed by `cells`
+    cell_lon: np.ndarray
+    cells: np.ndarray         # int32 model cell index
+    expected: np.ndarray      # float32 expected incidents within the horizon
+    predicted_type: np.ndarray  # int16 most likely type (all-types slot)
+    peak_hour: np.ndarray     # int16 hours after origin of the busiest hour
+    radius_km: float
+    generated_at: datetime
+    elapsed_seconds: float
+
+def _first_peak(rates: np.ndarray) -> np.ndarray:
+    """Index of the first maximum of every prefix along the last axis"""
+    running = np.maximum.accumulate(rates, axis=-1)
+    rises = np.ones(rates.shape, dtype=bool)
+    rises[..., 1:] = rates[..., 1:] > running[..., :-1]
+    return np.maximum.accumulate(np.where(rises, np.arange(rates.shape[-1]), 0), axis=-1)
+
+def compute_hotspot_forecast(
+    model: CrimeRateModel,
+    origin: datetime,
+    horizon: int = HOTSPOT_FORECAST_HORIZON,
+    top_k: int = HOTSPOT_FORECAST_TOP_K
+) -> HotspotForecast:
+    """
+    Rank model cells by expected incidents over each horizon from `origin`
+    (a naive local time, normally the start of an hour), per crime type and
+    for all types. Cells are processed in blocks and merged into a running
+    top-k, so memory does not grow with the number of cells.
+    """
+    started = time.perf_counter()
+    upcoming = hour_of_week(datetime_to_epoch_us(origin) + np.arange(horizon) * US_PER_HOUR)
+    type_count = len(model.type_names)
+    slots = type_count + 1
+
+    shape = (horizon, slots, 0)
+    best_expected = np.empty(shape, dtype=np.float32)
+    best_cells = np.empty(shape, dtype=np.int32)
+    best_types = np.empty(shape, dtype=np.int16)
+    best_peaks = np.empty(shape, dtype=np.int16)
+
+    for first in range(0, len(model.cell_keys), CELL_BLOCK):
+        hourly = model.rates[first:first + CELL_BLOCK][:, :, upcoming]          # (B, T, H)
+        hourly = np.concatenate([hourly, hourly.sum(axis=1, keepdims=True)], axis=1)  # (B, slots, H)
+        cumulative = np.cumsum(hourly, axis=2)
+        block = len(hourly)
+
+        types = np.broadcast_to(np.arange(slots, dtype=np.int16)[None, :, None], cumulative.shape).copy()
+        if type_count:
+            types[:, -1, :] = np.argmax(cumulative[:, :-1, :], axis=1)
+
+        # Candidates are (horizon, slot, cell) after the running best
+        best_expected = np.concatenate([best_expected, cumulative.transpose(2, 1, 0)], axis=2)
+        best_cells = np.concatenate([
+            best_cells, np.broadcast_to(np.arange(first, first + block, dtype=np.int32), (horizon, slots, block))
+        ], axis=2)
+        best_types = np.concatenate([best_types, types.transpose(2, 1, 0)], axis=2)
+        best_peaks = np.concatenate([best_peaks, _first_peak(hourly).astype(np.int16).transpose(2, 1, 0)], axis=2)
+
+        if best_expected.shape[2] > top_k:
+            keep = np.argpartition(-best_expected, top_k - 1, axis=2)[:, :, :top_k]
+            best_expected, best_cells, best_types, best_peaks = (
+                np.take_along_axis(values, keep, axis=2)
+                for values in (best_expected, best_cells, best_types, best_peaks)
+            )
+
+    order = np.argsort(-best_expected, axis=2, kind="stable")
+    best_expected, best_cells, best_types, best_peaks = (
+        np.take_along_axis(values, order, axis=2)
+        for values in (best_expected, best_cells, best_types, best_peaks)
+    )
+
+    return HotspotForecast(
+        model_version=model.version,
+        origin=origin,
+        type_names=list(model.type_names),
+        cell_lat=model.cell_lat,
+        cell_lon=model.cell_lon,
+        cells=best_cells,
+        expected=best_expected,
+        predicted_type=best_types,
+        peak_hour=best_peaks,
+        radius_km=round(model.cell_deg * KM_PER_DEGREE * math.sqrt(2) / 2, 3),
+        generated_at=datetime.now(),
+        elapsed_seconds=round(time.perf_counter() - started, 4)
+    )
+
+def forecast_hotspot_columns(
+    forecast: HotspotForecast,
+    hours_ahead: int,
+    crime_type: Optional[str] = None,
+    limit: int = HOTSPOT_FORECAST_TOP_K
+) -> Columns:
+    """Slice the `limit` best hotspots for a horizon and crime type as a response table"""
+    horizon = min(max(hours_ahead, 1), forecast.expected.shape[0]) - 1
+    if crime_type is None:
+        slot = len(forecast.type_names)
+    elif crime_type in forecast.type_names:
+        slot = forecast.type_names.index(crime_type)
+    else:
+        slot, limit = 0, 0
+
+    expected = forecast.expected[horizon, slot, :limit]
+    count = int(np.count_nonzero(expected > 0))
+    cells = forecast.cells[horizon, slot, :count]
+    peaks = forecast.peak_hour[horizon, slot, :count].astype(np.int64)
+    return {
+        "latitude": forecast.cell_lat[cells],
+        "longitude": forecast.cell_lon[cells],
+        "probability": -np.expm1(-expected[:count].astype(np.float64)),
+        "radius": np.full(count, forecast.radius_km),
+        "predicted_type": Dictionary.encode(forecast.predicted_type[horizon, slot, :count], forecast.type_names),
+        "predicted_time": (datetime_to_epoch_us(forecast.origin) + peaks * US_PER_HOUR).astype("datetime64[us]")
+    }
+
+def forecast_hotspots(
+    forecast: HotspotForecast,
+    hours_ahead: int,
+    crime_type: Optional[str] = None,
+    limit: int = HOTSPOT_FORECAST_TOP_K
+) -> List[dict]:
+    """Slice the `limit` best hotspots for a horizon and crime type"""
+    table = forecast_hotspot_columns(forecast, hours_ahead, crime_type, limit)
+    type_names = table["predicted_type"].values
+    return [
+        {
+            "latitude": latitude,
+            "longitude": longitude,
+            "probability": p,
+            "radius": radius,
+            "predicted_type": type_names[t],
+            "predicted_time": predicted_time
+        }
+        for latitude, longitude, p, radius, t, predicted_time in zip(
+            table["latitude"].tolist(),
+            table["longitude"].tolist(),
+            table["probability"].tolist(),
+            table["radius"].tolist(),
+            table["predicted_type"].codes.tolist(),
+            local_isoformat(table["predicted_time"].view(np.int64))
+        )
+    ]
@@ -0,0 +1,173 @@
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+import math
+import time
+
+import numpy as np
+
+from config import (
+    HOTSPOT_CELL_DEG, HOTSPOT_MIN_INCIDENTS, HOTSPOT_MIN_Z_SCORE, HOTSPOT_MAX_ROWS, HOTSPOT_MAX_AREAS
+)
+from services.incident_store import IncidentColumns
+from utils.data_utils import distances_from_point, EARTH_RADIUS_KM
+
+KM_PER_DEGREE = math.radians(1.0) * EARTH_RADIUS_KM
+
+# Known Mumbai neighborhoods used to name hotspots
+NEIGHBORHOODS = [
+    {"name": "Andheri East", "latitude": 19.1136, "longitude": 72.8697},
+    {"name": "Dadar West", "latitude": 19.0178, "longitude": 72.8478},
+    {"name": "Bandra Station", "latitude": 19.0596, "longitude": 72.8295},
+    {"name": "Kurla Market", "latitude": 19.0726, "longitude": 72.8845},
+    {"name": "Juhu Beach", "latitude": 19.0883, "longitude": 72.8262}
+]
+NEIGHBORHOOD_RADIUS_KM = 2.0
+
+@dataclass(frozen=True)
+class HotspotSnapshot:
+    """Immutable result of one clustering run"""
+    areas: Tuple[dict, ...]
+    generation: int           # store generation the run saw
+    generated_at: datetime
+    incidents_considered: int
+    sampled: bool             # True when the run clustered a uniform sample
+    elapsed_seconds: float
+
+def _connected_components(keys: np.ndarray, lon_cells: int) -> np.ndarray:
+    """
+    Label 8-connected groups of grid cells. `keys` must be sorted; returns
+    one label per key, the smallest index in its group.
+    """
+    labels = np.arange(len(keys))
+    sources, targets = [], []
+    for offset in (1, lon_cells - 1, lon_cells, lon_cells + 1):
+        neighbors = keys + offset
+        positions = np.searchsorted(keys, neighbors)
+        found = positions < len(keys)
+        found[found] = keys[positions[found]] == neighbors[found]
+        sources.append(np.flatnonzero(found))
+        targets.append(positions[found])
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    if len(sources) == 0:
+        return labels
+
+    # Propagate the minimum label along edges until nothing changes, with
+    # pointer jumping so long chains converge in few rounds
+    while True:
+        low = np.minimum(labels[sources], labels[targets])
+        before = labels.copy()
+        np.minimum.at(labels, sources, low)
+        np.minimum.at(labels, targets, low)
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            return labels
+
+def _neighborhood_name(latitude: float, longitude: float) -> str:
+    distances = distances_from_point(
+        latitude, longitude,
+        [n["latitude"] for n in NEIGHBORHOODS], [n["longitude"] for n in NEIGHBORHOODS]
+    )
+    nearest = int(np.argmin(distances))
+    if distances[nearest] <= NEIGHBORHOOD_RADIUS_KM:
+        return NEIGHBORHOODS[nearest]["name"]
+    return f"Hotspot near {latitude:.4f}, {longitude:.4f}"
+
+def find_hotspots(
+    columns: IncidentColumns,
+    rows: np.ndarray,
+    type_names: List[str],
+    cell_deg: float = HOTSPOT_CELL_DEG,
+    min_incidents: int = HOTSPOT_MIN_INCIDENTS,
+    min_z_score: float = HOTSPOT_MIN_Z_SCORE,
+    max_rows: int = HOTSPOT_MAX_ROWS,
+    max_areas: int = HOTSPOT_MAX_AREAS,
+    rng: Optional[np.random.Generator] = None
+) -> HotspotSnapshot:
+    """
+    Grid-density clustering of the given incident rows. Rows are binned
+    into cells, and a cell is dense when its count is at least
+    `min_incidents` and `min_z_score` standard deviations above the mean
+    occupied-cell count under a Poisson model (mean + z * sqrt(mean)).
+    8-connected dense cells form one hotspot; hotspots whose per-cell
+    density reaches twice that z-score are high risk. Above `max_rows` a
+    uniform sample is clustered and counts are scaled back up, which bounds
+    the run time.
+    """
+    started = time.perf_counter()
+    considered = len(rows)
+    sampled = considered > max_rows
+    scale = 1.0
+    if sampled:
+        rng = rng or np.random.default_rng()
+        rows = np.sort(rng.choice(rows, size=max_rows, replace=False))
+        scale = considered / max_rows
+
+    lon_cells = int(math.ceil(360.0 / cell_deg))
+    latitude, longitude = columns.latitude[rows], columns.longitude[rows]
+    keys = (
+        np.floor((latitude + 90.0) / cell_deg).astype(np.int64) * lon_cells
+        + np.floor((longitude + 180.0) / cell_deg).astype(np.int64)
+    )
+    cell_keys, cell_of_row, cell_counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+    areas: List[dict] = []
+    if len(cell_keys):
+        mean = cell_counts.mean()
+        spread = math.sqrt(mean)
+        threshold = max(mean + min_z_score * spread, min_incidents / scale)
+        dense = np.flatnonzero(cell_counts >= threshold)
+        labels = _connected_components(cell_keys[dense], lon_cells)
+
+        # Map every row in a dense cell to its cluster
+        cluster_of_cell = np.full(len(cell_keys), -1, dtype=np.int64)
+        cluster_ids, cluster_of_cell[dense] = np.unique(labels, return_inverse=True)
+        cluster_of_row = cluster_of_cell[cell_of_row]
+        in_cluster = cluster_of_row >= 0
+        clusters = cluster_of_row[in_cluster]
+        cluster_count = len(cluster_ids)
+
+        counts = np.bincount(clusters, minlength=cluster_count)
+        lat_sum = np.bincount(clusters, weights=latitude[in_cluster], minlength=cluster_count)
+        lon_sum = np.bincount(clusters, weights=longitude[in_cluster], minlength=cluster_count)
+        severity_sum = np.bincount(clusters, weights=columns.severity[rows][in_cluster], minlength=cluster_count)
+        type_count = len(type_names)
+        by_type = np.bincount(
+            clusters * type_count + columns.type_code[rows][in_cluster],
+            minlength=cluster_count * type_count
+        ).reshape(cluster_count, type_count)
+        cells_per_cluster = np.bincount(cluster_of_cell[dense], minlength=cluster_count)
+
+        dense_lat = (cell_keys[dense] // lon_cells + 0.5) * cell_deg - 90.0
+        dense_lon = (cell_keys[dense] % lon_cells + 0.5) * cell_deg - 180.0
+        density = counts / cells_per_cluster
+
+        for cluster in np.argsort(-counts, kind="stable")[:max_areas].tolist():
+            center_lat = lat_sum[cluster] / counts[cluster]
+            center_lon = lon_sum[cluster] / counts[cluster]
+            member_cells = cluster_of_cell[dense] == cluster
+            extent = distances_from_point(center_lat, center_lon, dense_lat[member_cells], dense_lon[member_cells], fast=True)
+            top_types = np.argsort(-by_type[cluster], kind="stable")[:3]
+            areas.append({
+                "name": _neighborhood_name(center_lat, center_lon),
+                "latitude": float(center_lat),
+                "longitude": float(center_lon),
+                "risk_level": "high" if (density[cluster] - mean) / spread >= 2 * min_z_score else "medium",
+                "predicted_crimes": [type_names[t] for t in top_types.tolist() if by_type[cluster, t] > 0],
+                "recent_incidents": int(round(counts[cluster] * scale)),
+                "radius_km": round(float(extent.max()) + cell_deg * KM_PER_DEGREE / 2, 3),
+                "cells": int(cells_per_cluster[cluster]),
+                "mean_severity": round(float(severity_sum[cluster] / counts[cluster]), 2)
+            })
+        # High risk first, then by size
+        areas.sort(key=lambda area: (0 if area["risk_level"] == "high" else 1, -area["recent_incidents"]))
+
+    return HotspotSnapshot(
+        areas=tuple(areas),
+        generation=columns.generation,
+        generated_at=datetime.now(),
+        incidents_considered=considered,
+        sampled=sampled,
+        elapsed_seconds=round(time.perf_counter() - started, 4)
+    )
@@ -0,0 +1,239 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import queue
+import sqlite3
+import threading
+
+import numpy as np
+
+from services.incident_store import ID_DTYPE, new_id_mask
+
+# row_id is AUTOINCREMENT so ids of deleted rows are never handed out
+# again: readers sync new rows with row_id > the last one they saw
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    row_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    id BLOB NOT NULL UNIQUE,
+    crime_type TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    timestamp_us INTEGER NOT NULL,
+    severity REAL NOT NULL,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents (timestamp_us);
+CREATE INDEX IF NOT EXISTS idx_incidents_type_timestamp ON incidents (crime_type, timestamp_us);
+CREATE TABLE IF NOT EXISTS deleted_incidents (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id BLOB NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS incidents_delete_log AFTER DELETE ON incidents BEGIN
+    INSERT INTO deleted_incidents (id) VALUES (old.id);
+END;
+"""
+
+# Databases created before row_id was AUTOINCREMENT are rebuilt in place,
+# keeping their row ids; the unused R*Tree index is dropped with them
+MIGRATE_ROW_ID_SQL = """
+DROP TRIGGER IF EXISTS incidents_rtree_insert;
+DROP TRIGGER IF EXISTS incidents_rtree_delete;
+DROP TABLE IF EXISTS incidents_rtree;
+ALTER TABLE incidents RENAME TO incidents_old;
+DROP INDEX IF EXISTS idx_incidents_timestamp;
+DROP INDEX IF EXISTS idx_incidents_type_timestamp;
+"""
+COPY_ROWS_SQL = (
+    "INSERT INTO incidents (row_id, id, crime_type, latitude, longitude, timestamp_us, severity, description) "
+    "SELECT row_id, id, crime_type, latitude, longitude, timestamp_us, severity, description FROM incidents_old"
+)
+
+# Statements are module constants so each pooled connection's statement
+# cache keeps them prepared across calls
+INSERT_SQL = (
+    "INSERT INTO incidents (id, crime_type, latitude, longitude, timestamp_us, severity, description) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+DELETE_SQL = "DELETE FROM incidents WHERE id = ?"
+# Ids looked up per statement when checking a batch for stored duplicates
+LOOKUP_BATCH = 500
+SELECT_COLUMNS = "i.row_id, i.id, i.crime_type, i.latitude, i.longitude, i.timestamp_us, i.severity, i.description"
+DELETED_SINCE_SQL = "SELECT seq, id FROM deleted_incidents WHERE seq > ? ORDER BY seq"
+MAX_DELETE_SEQ_SQL = "SELECT COALESCE(MAX(seq), 0) FROM deleted_incidents"
+
+def sqlite_path_from_url(database_url: str) -> Optional[str]:
+    """Get the file path from a sqlite:///path URL, or None for other schemes"""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        return None
+    return database_url[len(prefix):] or None
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections in WAL mode. Connections are
+    created lazily and handed out one caller at a time.
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, blocking while all of them are in use"""
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            connection = self._connect() if create else self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        """Close the idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class SQLiteIncidentRepository:
+    """
+    Durable incident storage in SQLite. Timestamp and (crime type, timestamp)
+    are indexed; spatial queries are served by the in-memory store's grid
+    index. Deletes are logged so other workers can replay them.
+    All methods are blocking; call them off the event loop.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as connection:
+            table = connection.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'incidents'"
+            ).fetchone()
+            if table is not None and "AUTOINCREMENT" not in table[0].upper():
+                connection.executescript(
+                    "BEGIN IMMEDIATE;" + MIGRATE_ROW_ID_SQL + SCHEMA + COPY_ROWS_SQL + ";"
+                    "DROP TABLE incidents_old; COMMIT;"
+                )
+            connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def insert_batch(
+        self,
+        ids: np.ndarray,
+        crime_types: List[str],
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        timestamp: np.ndarray,
+        severity: np.ndarray,
+        descriptions: List[Optional[str]]
+    ) -> np.ndarray:
+        """
+        Insert rows in one transaction, skipping ids that are already stored
+        or repeat an earlier row of the batch. Returns a mask of the rows
+        inserted. The write lock is taken before looking ids up, so
+        concurrent writers cannot slip a duplicate in between.
+        """
+        keys = [row_id.tobytes() for row_id in ids]
+        with self.pool.connection() as connection:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                existing = set()
+                for first in range(0, len(keys), LOOKUP_BATCH):
+                    chunk = keys[first:first + LOOKUP_BATCH]
+                    existing.update(row[0] for row in connection.execute(
+                        f"SELECT id FROM incidents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+                inserted = new_id_mask(ids, np.array(sorted(existing), dtype="S16"))
+                selected = np.flatnonzero(inserted).tolist()
+                connection.executemany(INSERT_SQL, (
+                    (keys[i], crime_types[i], float(latitude[i]), float(longitude[i]),
+                     int(timestamp[i]), float(severity[i]), descriptions[i])
+                    for i in selected
+                ))
+                return inserted
+
+    def delete(self, ids: List[bytes]) -> int:
+        """Delete rows by raw id, returns the number deleted"""
+        with self.pool.connection() as connection:
+            with connection:
+                return sum(connection.execute(DELETE_SQL, (row_id,)).rowcount for row_id in ids)
+
+    def max_delete_seq(self) -> int:
+        with self.pool.connection() as connection:
+            return connection.execute(MAX_DELETE_SEQ_SQL).fetchone()[0]
+
+    def deleted_since(self, seq: int) -> Tuple[List[bytes], int]:
+        """Get ids deleted after `seq` and the latest delete sequence number"""
+        with self.pool.connection() as connection:
+            rows = connection.execute(DELETED_SINCE_SQL, (seq,)).fetchall()
+        if not rows:
+            return [], seq
+        return [row[1] for row in rows], rows[-1][0]
+
+    def iter_chunks(
+        self,
+        after_row_id: int = 0,
+        chunk_size: int = 50000,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        crime_type: Optional[str] = None
+    ) -> Iterator[Dict]:
+        """
+        Stream matching rows in row_id order as column chunks. Each chunk is
+        a separate keyset query, so no read transaction stays open between
+        chunks.
+        """
+        sql = f"SELECT {SELECT_COLUMNS} FROM incidents i"
+        where = ["i.row_id > ?"]
+        params: list = []
+        if start_us is not None:
+            where.append("i.timestamp_us >= ?")
+            params.append(start_us)
+        if end_us is not None:
+            where.append("i.timestamp_us <= ?")
+            params.append(end_us)
+        if crime_type is not None:
+            where.append("i.crime_type = ?")
+            params.append(crime_type)
+        sql += " WHERE " + " AND ".join(where) + " ORDER BY i.row_id LIMIT ?"
+
+        last_row_id = after_row_id
+        while True:
+            with self.pool.connection() as connection:
+                rows = connection.execute(sql, [last_row_id, *params, chunk_size]).fetchall()
+            if not rows:
+                return
+            last_row_id = rows[-1][0]
+            yield _rows_to_columns(rows)
+            if len(rows) < chunk_size:
+                return
+
+def _rows_to_columns(rows: List[tuple]) -> Dict:
+    row_ids, ids, crime_types, latitude, longitude, timestamps, severity, descriptions = zip(*rows)
+    return {
+        "last_row_id": row_ids[-1],
+        "ids": np.frombuffer(b"".join(ids), dtype=ID_DTYPE),
+        "crime_types": list(crime_types),
+        "latitude": np.array(latitude, dtype=np.float64),
+        "longitude": np.array(longitude, dtype=np.float64),
+        "timestamp": np.array(timestamps, dtype=np.int64),
+        "severity": np.array(severity, dtype=np.float64),
+        "descriptions": list(descriptions)
+    }
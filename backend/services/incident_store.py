@@ -0,0 +1,499 @@
+from typing import List, Optional, Iterable, Dict, Tuple
+from dataclasses import dataclass
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from config import SPATIAL_CELL_DEG
+from models.crime import CrimeIncident, Location
+from services.spatial_index import GridIndex
+from services.rollups import IncidentRollups
+from utils.data_utils import datetime_to_epoch_us, epoch_us_to_datetime, hour_of_week, local_isoformat
+from utils.response_formats import Columns, Dictionary
+
+# Row ids are stored as raw 16-byte UUIDs
+ID_DTYPE = np.dtype("V16")
+
+# Buffered per-row columns, in IncidentColumns field order
+COLUMN_DTYPES = {
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "timestamp": np.int64,
+    "type_code": np.int16,
+    "severity": np.float64,
+    "ids": ID_DTYPE,
+    "desc_code": np.int32,
+    "hour_of_week": np.int16,
+}
+
+# Flat incident fields, in the order exports and bulk ingestion use them
+EXPORT_FIELDS = ("id", "crime_type", "latitude", "longitude", "timestamp", "severity", "description")
+
+def random_uuid4_ids(count: int) -> np.ndarray:
+    """Generate `count` random version 4 UUIDs as raw id bytes"""
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return raw.view(ID_DTYPE).reshape(count)
+
+def incidents_to_columns(incidents: Iterable[CrimeIncident]) -> Dict:
+    """Convert incident models to the column arguments of `IncidentStore.append_batch`"""
+    incidents = list(incidents)
+    count = len(incidents)
+    return {
+        "latitude": np.fromiter((i.location.latitude for i in incidents), np.float64, count),
+        "longitude": np.fromiter((i.location.longitude for i in incidents), np.float64, count),
+        "timestamp": np.fromiter((datetime_to_epoch_us(i.timestamp) for i in incidents), np.int64, count),
+        "crime_types": [i.crime_type for i in incidents],
+        "severity": np.fromiter((i.severity for i in incidents), np.float64, count),
+        "ids": np.frombuffer(b"".join(uuid.UUID(i.id).bytes for i in incidents), dtype=ID_DTYPE),
+        "descriptions": [i.description for i in incidents]
+    }
+
+def new_id_mask(ids: np.ndarray, sorted_existing: np.ndarray) -> np.ndarray:
+    """
+    Mark the ids (raw UUID bytes) that are neither in `sorted_existing`
+    (sorted "S16" keys) nor repeats of an earlier id in the same batch
+    """
+    keys = ids.view("S16")
+    mask = np.zeros(len(keys), dtype=bool)
+    _, first = np.unique(keys, return_index=True)
+    mask[first] = True
+    if len(sorted_existing):
+        positions = np.minimum(np.searchsorted(sorted_existing, keys), len(sorted_existing) - 1)
+        mask &= sorted_existing[positions] != keys
+    return mask
+
+@dataclass(frozen=True)
+class IncidentColumns:
+    """
+    Immutable snapshot of the store. Every array has exactly `len(self)` rows;
+    readers keep using a snapshot even while writers publish a newer one.
+    """
+    latitude: np.ndarray     # float64
+    longitude: np.ndarray    # float64
+    timestamp: np.ndarray    # int64, microseconds since the Unix epoch
+    type_code: np.ndarray    # int16, index into IncidentStore.type_names
+    severity: np.ndarray     # float64
+    ids: np.ndarray          # V16 raw UUID bytes
+    desc_code: np.ndarray    # int32, index into the description vocabulary, -1 for None
+    hour_of_week: np.ndarray # int16, local weekday * 24 + hour, derived from timestamp
+    order: np.ndarray        # int64 row indices sorted by (timestamp, row)
+    sorted_timestamp: np.ndarray  # timestamp[order], for binary search
+    grid: GridIndex          # spatial index over the same rows
+    generation: int = 0      # bumped on every write, for cache keys
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+class IncidentStore:
+    """
+    Crime incidents kept as contiguous typed columns.
+
+    Rows are appended into over-allocated buffers under a lock and a new
+    `IncidentColumns` snapshot is published afterwards, so queries never
+    take the lock and never observe a half-written batch.
+
+    Removed rows are tombstoned: they are dropped from the time and spatial
+    indexes (which every query goes through) but keep their row number, so
+    cursors stay valid. `rollups` is updated under the same lock.
+    """
+
+    def __init__(
+        self,
+        crime_types: Optional[List[str]] = None,
+        capacity: int = 1024,
+        cell_deg: float = SPATIAL_CELL_DEG
+    ):
+        self._lock = threading.Lock()
+        self.type_names: List[str] = []
+        self._type_index: Dict[str, int] = {}
+        for name in crime_types or []:
+            self.type_code_for(name, create=True)
+        self._descriptions: List[str] = []
+        self._desc_index: Dict[str, int] = {}
+
+        for name, dtype in COLUMN_DTYPES.items():
+            setattr(self, f"_{name}", np.empty(capacity, dtype=dtype))
+        self._size = 0
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_timestamp = np.empty(0, dtype=np.int64)
+        # Ids of the live rows, sorted, to find duplicates by binary search
+        self._sorted_ids = np.empty(0, dtype="S16")
+        self._grid = GridIndex(cell_deg)
+        self._generation = 0
+        self.rollups = IncidentRollups()
+        self._columns = self._snapshot()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def columns(self) -> IncidentColumns:
+        """Get the current immutable snapshot"""
+        return self._columns
+
+    def type_code_for(self, crime_type: str, create: bool = False) -> Optional[int]:
+        """Map a crime type name to its integer code"""
+        code = self._type_index.get(crime_type)
+        if code is None and create:
+            code = len(self.type_names)
+            self.type_names.append(crime_type)
+            self._type_index[crime_type] = code
+        return code
+
+    def _desc_code_for(self, description: Optional[str]) -> int:
+        if description is None:
+            return -1
+        code = self._desc_index.get(description)
+        if code is None:
+            code = len(self._descriptions)
+            self._descriptions.append(description)
+            self._desc_index[description] = code
+        return code
+
+    def append_incidents(self, incidents: Iterable[CrimeIncident]) -> int:
+        """Append validated incident models, returns the number of rows added"""
+        return self.append_batch(**incidents_to_columns(incidents))
+
+    def append_batch(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        timestamp: np.ndarray,
+        crime_types: List[str],
+        severity: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+        descriptions: Optional[List[Optional[str]]] = None
+    ) -> int:
+        """
+        Append already-validated columns (timestamps in epoch microseconds).
+        Missing ids are generated; rows whose id is already stored, or
+        repeats an earlier row of the batch, are skipped. Returns the number
+        of rows added.
+        """
+        return int(self.append_new(latitude, longitude, timestamp, crime_types, severity, ids, descriptions).sum())
+
+    def append_new(
+        self,
+        latitude: np.ndarray,
+        longitude: np.ndarray,
+        timestamp: np.ndarray,
+        crime_types: List[str],
+        severity: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+        descriptions: Optional[List[Optional[str]]] = None
+    ) -> np.ndarray:
+        """`append_batch`, returning a mask of the rows that were added"""
+        count = len(timestamp)
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+        if ids is None:
+            ids = random_uuid4_ids(count)
+        with self._lock:
+            added = new_id_mask(ids, self._sorted_ids)
+            keep = np.flatnonzero(added)
+            if len(keep) == 0:
+                return added
+            self._append_locked(
+                latitude=latitude[keep],
+                longitude=longitude[keep],
+                timestamp=timestamp[keep],
+                type_code=np.fromiter(
+                    (self.type_code_for(crime_types[i], create=True) for i in keep.tolist()), np.int16, len(keep)
+                ),
+                severity=severity[keep],
+                ids=ids[keep],
+                desc_code=(
+                    np.fromiter((self._desc_code_for(descriptions[i]) for i in keep.tolist()), np.int32, len(keep))
+                    if descriptions is not None else np.full(len(keep), -1, dtype=np.int32)
+                ),
+            )
+            return added
+
+    def _append_locked(self, **batch: np.ndarray) -> int:
+        batch["hour_of_week"] = hour_of_week(batch["timestamp"])
+        count = len(batch["timestamp"])
+        self._reserve(self._size + count)
+        start, end = self._size, self._size + count
+        for name, values in batch.items():
+            getattr(self, f"_{name}")[start:end] = values
+        self._merge_into_order(batch["timestamp"], start)
+        keys = np.sort(batch["ids"].view("S16"))
+        self._sorted_ids = np.insert(self._sorted_ids, np.searchsorted(self._sorted_ids, keys), keys)
+        self._grid = self._grid.merged(batch["latitude"], batch["longitude"], start)
+        self.rollups.add(batch["type_code"], batch["timestamp"], batch["hour_of_week"])
+        self._size = end
+        self._generation += 1
+        self._columns = self._snapshot()
+        return count
+
+    def remove(self, incident_ids: List[str]) -> int:
+        """
+        Remove incidents by id, returns the number of rows removed.
+        Raises ValueError for ids that are not UUIDs.
+        """
+        keys = np.array([uuid.UUID(i).bytes for i in incident_ids], dtype="S16")
+        with self._lock:
+            live = self._order
+            rows = live[np.isin(self._ids[live].view("S16"), keys)]
+            if len(rows) == 0:
+                return 0
+            keep = ~np.isin(self._order, rows)
+            self._order = self._order[keep]
+            self._sorted_timestamp = self._sorted_timestamp[keep]
+            self._sorted_ids = self._sorted_ids[~np.isin(self._sorted_ids, self._ids[rows].view("S16"))]
+            self._grid = self._grid.without(rows)
+            self.rollups.add(self._type_code[rows], self._timestamp[rows], self._hour_of_week[rows], sign=-1)
+            self._generation += 1
+            self._columns = self._snapshot()
+            return len(rows)
+
+    def rebuild_rollups(self) -> None:
+        """Recompute the rollups from the live rows"""
+        with self._lock:
+            rows = self._order
+            self.rollups.clear()
+            self.rollups.add(self._type_code[rows], self._timestamp[rows], self._hour_of_week[rows])
+
+    def read_rollups(self, first_slot: Optional[int] = None, end_slot: Optional[int] = None):
+        """
+        Read rollups consistently with a column snapshot. Returns
+        (columns, hour-of-week counts copy, slot counts copy or None)
+        """
+        with self._lock:
+            slot_counts = None
+            if first_slot is not None:
+                slot_counts = self.rollups.slot_counts(first_slot, end_slot)
+            return self._columns, self.rollups.hour_of_week.copy(), slot_counts
+
+    def _reserve(self, needed: int) -> None:
+        capacity = len(self._timestamp)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Grow into fresh buffers so existing snapshots stay valid
+        for name in COLUMN_DTYPES:
+            old = getattr(self, f"_{name}")
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, f"_{name}", new)
+
+    def _merge_into_order(self, timestamps: np.ndarray, first_row: int) -> None:
+        # New rows have larger row indices than every indexed row, so inserting
+        # them after equal timestamps keeps the index ordered by (timestamp, row)
+        batch_order = np.argsort(timestamps, kind="stable")
+        batch_ts = timestamps[batch_order]
+        positions = np.searchsorted(self._sorted_timestamp, batch_ts, side="right")
+        self._order = np.insert(self._order, positions, batch_order + first_row)
+        self._sorted_timestamp = np.insert(self._sorted_timestamp, positions, batch_ts)
+
+    def _snapshot(self) -> IncidentColumns:
+        n = self._size
+        return IncidentColumns(
+            **{name: getattr(self, f"_{name}")[:n] for name in COLUMN_DTYPES},
+            order=self._order,
+            sorted_timestamp=self._sorted_timestamp,
+            grid=self._grid,
+            generation=self._generation,
+        )
+
+    def select(
+        self,
+        columns: IncidentColumns,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        type_code: Optional[int] = None,
+        candidates: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Get the row indices matching the time range and crime type. Without
+        `candidates` the time index is binary searched and rows come back in
+        time order; otherwise only the candidate rows are checked.
+        """
+        if candidates is None:
+            lo, hi = self.time_range_bounds(columns, start_us, end_us)
+            rows = columns.order[lo:hi]
+        else:
+            rows = candidates
+            timestamps = columns.timestamp[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if start_us is not None:
+                keep &= timestamps >= start_us
+            if end_us is not None:
+                keep &= timestamps <= end_us
+            rows = rows[keep]
+        if type_code is not None:
+            rows = rows[columns.type_code[rows] == type_code]
+        return rows
+
+    def time_range_bounds(
+        self,
+        columns: IncidentColumns,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """Binary search the time index, returns the [lo, hi) slice of `columns.order`"""
+        lo = 0 if start_us is None else int(np.searchsorted(columns.sorted_timestamp, start_us, side="left"))
+        hi = len(columns.order) if end_us is None else int(np.searchsorted(columns.sorted_timestamp, end_us, side="right"))
+        return lo, max(lo, hi)
+
+    def newest_first(
+        self,
+        columns: IncidentColumns,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        type_code: Optional[int] = None,
+        limit: int = 100,
+        offset: int = 0,
+        before: Optional[Tuple[int, int]] = None,
+        candidates: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Get up to `limit` matching row indices, newest first, walking the time
+        index downwards. `before` is a (timestamp, row) key: only rows strictly
+        older than it in index order are returned (keyset pagination).
+        When `candidates` is given (e.g. from a spatial query) only those rows
+        are considered and they are ordered directly instead.
+        """
+        if candidates is not None:
+            return self._newest_first_of(columns, candidates, start_us, end_us, type_code, limit, offset, before)
+
+        lo, hi = self.time_range_bounds(columns, start_us, end_us)
+        if before is not None:
+            key_ts, key_row = before
+            eq_lo = int(np.searchsorted(columns.sorted_timestamp, key_ts, side="left"))
+            eq_hi = int(np.searchsorted(columns.sorted_timestamp, key_ts, side="right"))
+            position = eq_lo + int(np.searchsorted(columns.order[eq_lo:eq_hi], key_row, side="left"))
+            hi = max(lo, min(hi, position))
+
+        if type_code is None:
+            top = max(lo, hi - offset)
+            return columns.order[max(lo, top - limit):top][::-1]
+
+        # Scan backwards in growing chunks until enough rows of this type are found
+        wanted = offset + limit
+        found = []
+        found_count = 0
+        chunk = max(2 * wanted, 256)
+        position = hi
+        while position > lo and found_count < wanted:
+            start = max(lo, position - chunk)
+            rows = columns.order[start:position][::-1]
+            rows = rows[columns.type_code[rows] == type_code]
+            found.append(rows)
+            found_count += len(rows)
+            position = start
+            chunk *= 2
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)[offset:wanted]
+
+    def _newest_first_of(
+        self,
+        columns: IncidentColumns,
+        rows: np.ndarray,
+        start_us: Optional[int],
+        end_us: Optional[int],
+        type_code: Optional[int],
+        limit: int,
+        offset: int,
+        before: Optional[Tuple[int, int]]
+    ) -> np.ndarray:
+        timestamps = columns.timestamp[rows]
+        keep = np.ones(len(rows), dtype=bool)
+        if start_us is not None:
+            keep &= timestamps >= start_us
+        if end_us is not None:
+            keep &= timestamps <= end_us
+        if type_code is not None:
+            keep &= columns.type_code[rows] == type_code
+        if before is not None:
+            key_ts, key_row = before
+            keep &= (timestamps < key_ts) | ((timestamps == key_ts) & (rows < key_row))
+        rows, timestamps = rows[keep], timestamps[keep]
+        # Sort by (timestamp, row) descending, matching the time index order
+        order = np.lexsort((-rows, -timestamps))
+        return rows[order[offset:offset + limit]]
+
+    def rows_in_bbox(self, columns: IncidentColumns, bbox: List[float]) -> np.ndarray:
+        """Get the sorted row indices inside `bbox` ([min_lon, min_lat, max_lon, max_lat])"""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        rows = columns.grid.rows_in_bbox(bbox)
+        latitude, longitude = columns.latitude[rows], columns.longitude[rows]
+        inside = (latitude >= min_lat) & (latitude <= max_lat) & (longitude >= min_lon) & (longitude <= max_lon)
+        return np.sort(rows[inside])
+
+    def to_models(self, columns: IncidentColumns, rows: np.ndarray) -> List[CrimeIncident]:
+        """Build `CrimeIncident` models for the selected row indices only"""
+        incidents = []
+        for row in rows.tolist():
+            desc_code = int(columns.desc_code[row])
+            incidents.append(CrimeIncident(
+                id=str(uuid.UUID(bytes=columns.ids[row].tobytes())),
+                crime_type=self.type_names[columns.type_code[row]],
+                location=Location(
+                    latitude=float(columns.latitude[row]),
+                    longitude=float(columns.longitude[row])
+                ),
+                timestamp=epoch_us_to_datetime(columns.timestamp[row]),
+                severity=float(columns.severity[row]),
+                description=self._descriptions[desc_code] if desc_code >= 0 else None
+            ))
+        return incidents
+
+    def to_lists(self, columns: IncidentColumns, rows: np.ndarray) -> Dict[str, list]:
+        """
+        Gather the selected rows as one list per `EXPORT_FIELDS` field, in
+        their JSON form (UUID strings, naive local ISO timestamps, None for
+        missing descriptions), without building models
+        """
+        hex_ids = columns.ids[rows].tobytes().hex()
+        descriptions = self._descriptions
+        return {
+            "id": [
+                f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+                for h in (hex_ids[i:i + 32] for i in range(0, len(hex_ids), 32))
+            ],
+            "crime_type": [self.type_names[code] for code in columns.type_code[rows].tolist()],
+            "latitude": columns.latitude[rows].tolist(),
+            "longitude": columns.longitude[rows].tolist(),
+            "timestamp": local_isoformat(columns.timestamp[rows]),
+            "severity": columns.severity[rows].tolist(),
+            "description": [descriptions[code] if code >= 0 else None for code in columns.desc_code[rows].tolist()]
+        }
+
+    def to_records(self, columns: IncidentColumns, rows: np.ndarray) -> List[dict]:
+        """
+        Build the JSON form of `CrimeIncident` for the selected rows as plain
+        dicts. Rows were validated on the way in, so this skips constructing
+        models.
+        """
+        fields = self.to_lists(columns, rows)
+        return [
+            {
+                "id": incident_id,
+                "crime_type": crime_type,
+                "location": {"latitude": latitude, "longitude": longitude},
+                "timestamp": timestamp,
+                "severity": severity,
+                "description": description
+            }
+            for incident_id, crime_type, latitude, longitude, timestamp, severity, description in zip(
+                *(fields[name] for name in EXPORT_FIELDS)
+            )
+        ]
+
+    def to_columnar(self, columns: IncidentColumns, rows: np.ndarray) -> Columns:
+        """Gather the selected rows as a response table, strings dictionary-encoded"""
+        return {
+            "id": columns.ids[rows],
+            "crime_type": Dictionary.encode(columns.type_code[rows], self.type_names),
+            "latitude": columns.latitude[rows],
+            "longitude": columns.longitude[rows],
+            "timestamp": columns.timestamp[rows].astype("datetime64[us]"),
+            "severity": columns.severity[rows],
+            "description": Dictionary.encode(columns.desc_code[rows], self._descriptions)
+        }
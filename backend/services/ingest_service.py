@@ -0,0 +1,326 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import csv
+import json
+import uuid
+import warnings
+
+import numpy as np
+
+from config import INGEST_BATCH_SIZE, INGEST_MAX_ERRORS
+from services.crime_service import add_incident_batch
+from services.incident_store import ID_DTYPE, random_uuid4_ids
+from utils.data_utils import datetime_to_epoch_us, from_local_epoch_us
+
+REQUIRED_FIELDS = ("crime_type", "latitude", "longitude", "timestamp", "severity")
+
+# A CSV record with an unbalanced quote is cut off at this size instead of
+# swallowing the rest of the stream, and longer lines are rejected unread
+MAX_RECORD_CHARS = 1 << 20
+
+class IngestReport:
+    """Running totals for one bulk ingestion, with a capped list of row errors"""
+
+    def __init__(self, max_errors: int = INGEST_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+
+    def error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> Dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+def _to_floats(values: List) -> np.ndarray:
+    """Convert a column to float64 in one call, with NaN for unparseable values"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        result = np.full(len(values), np.nan)
+        for index, value in enumerate(values):
+            try:
+                result[index] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return result
+
+# Timestamps must stay within what datetime can represent in any timezone
+_EPOCH_US_RANGE = (datetime_to_epoch_us(datetime(1, 1, 2)), datetime_to_epoch_us(datetime(9999, 12, 30)))
+
+def _parse_timestamp(value) -> int:
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            # Purely numeric strings (CSV cells) are epoch seconds too
+            value = float(value) if value.lstrip("-").replace(".", "", 1).isdigit() else value
+        except ValueError:
+            pass
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Numeric timestamps are epoch seconds
+        return int(round(value * 1_000_000))
+    return datetime_to_epoch_us(datetime.fromisoformat(str(value)))
+
+def _is_iso_shaped(value) -> bool:
+    """A naive ISO date or datetime NumPy can parse: YYYY-MM-DD..., no offset"""
+    return (
+        isinstance(value, str) and len(value) >= 10 and value[4] == "-"
+        and value[-1:].isdigit() and "+" not in value
+    )
+
+def _parse_timestamps(values: List):
+    """
+    Parse a timestamp column to epoch microseconds. Naive ISO strings are
+    parsed by NumPy in one call; anything else (offsets, epoch numbers,
+    bad values) falls back to per-value parsing; purely numeric strings are
+    epoch seconds. Unparseable or out of range values are flagged in the
+    returned mask.
+    """
+    if values and all(_is_iso_shaped(v) for v in values):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                local = np.array(values, dtype="datetime64[us]")
+            if not np.isnat(local).any():
+                timestamps = from_local_epoch_us(local.astype(np.int64))
+                return timestamps, _in_range(timestamps)
+        except (ValueError, TypeError, OverflowError, Warning):
+            pass
+
+    timestamps = np.zeros(len(values), dtype=np.int64)
+    parsed = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        try:
+            timestamps[index] = _parse_timestamp(value)
+            parsed[index] = True
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return timestamps, parsed & _in_range(timestamps)
+
+def _in_range(timestamps: np.ndarray) -> np.ndarray:
+    return (timestamps >= _EPOCH_US_RANGE[0]) & (timestamps <= _EPOCH_US_RANGE[1])
+
+def _ingest_records(records: List[Tuple[int, Dict]], report: IngestReport) -> None:
+    """
+    Validate a batch of raw records column by column and append the valid
+    rows to the incident store in one write
+    """
+    count = len(records)
+    rows = [row for row, _ in records]
+    crime_types = [str(record.get("crime_type") or "").strip() for _, record in records]
+    latitude = _to_floats([record.get("latitude") for _, record in records])
+    longitude = _to_floats([record.get("longitude") for _, record in records])
+    severity = _to_floats([record.get("severity") for _, record in records])
+    descriptions = [record.get("description") or None for _, record in records]
+
+    # Vectorized range checks; NaN fails every comparison
+    errors: List[Optional[str]] = [None] * count
+    checks = [
+        (~((latitude >= -90) & (latitude <= 90)), "latitude must be a number between -90 and 90"),
+        (~((longitude >= -180) & (longitude <= 180)), "longitude must be a number between -180 and 180"),
+        (~((severity >= 0) & (severity <= 5)), "severity must be a number between 0 and 5"),
+    ]
+    for failed, message in checks:
+        for index in np.flatnonzero(failed).tolist():
+            errors[index] = errors[index] or message
+
+    timestamps, parsed = _parse_timestamps([record.get("timestamp") for _, record in records])
+    ids = np.zeros(count, dtype=ID_DTYPE)
+    has_id = np.zeros(count, dtype=bool)
+    for index, (_, record) in enumerate(records):
+        if errors[index]:
+            continue
+        if not crime_types[index]:
+            errors[index] = "crime_type is required"
+            continue
+        if not parsed[index]:
+            errors[index] = "timestamp must be an ISO 8601 datetime or epoch seconds"
+            continue
+        if record.get("id"):
+            try:
+                ids[index] = np.frombuffer(uuid.UUID(str(record["id"])).bytes, dtype=ID_DTYPE)[0]
+                has_id[index] = True
+            except ValueError:
+                errors[index] = "id must be a UUID"
+
+    for index, message in enumerate(errors):
+        if message:
+            report.error(rows[index], message)
+
+    valid = np.array([message is None for message in errors], dtype=bool)
+    if not valid.any():
+        return
+    selected = np.flatnonzero(valid)
+    added = add_incident_batch(
+        latitude=latitude[selected],
+        longitude=longitude[selected],
+        timestamp=timestamps[selected],
+        crime_types=[crime_types[i] for i in selected.tolist()],
+        severity=severity[selected],
+        ids=_fill_missing_ids(ids[selected], has_id[selected]),
+        descriptions=[descriptions[i] for i in selected.tolist()]
+    )
+    report.inserted += int(added.sum())
+    for index in selected[~added].tolist():
+        report.error(rows[index], "duplicate id")
+
+def _fill_missing_ids(ids: np.ndarray, has_id: np.ndarray) -> np.ndarray:
+    """Generate ids for the rows that did not supply one"""
+    missing = np.flatnonzero(~has_id)
+    if len(missing):
+        ids[missing] = random_uuid4_ids(len(missing))
+    return ids
+
+def _parse_ndjson(lines: List[Tuple[int, str]], report: IngestReport) -> List[Tuple[int, Dict]]:
+    records = []
+    for row, line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            report.error(row, "invalid JSON")
+            continue
+        if not isinstance(record, dict):
+            report.error(row, "each line must be a JSON object")
+            continue
+        # Accept the nested CrimeIncident shape as well as flat rows
+        location = record.get("location")
+        if isinstance(location, dict):
+            record.setdefault("latitude", location.get("latitude"))
+            record.setdefault("longitude", location.get("longitude"))
+        records.append((row, record))
+    return records
+
+def _parse_csv(lines: List[Tuple[int, str]], header: List[str], report: IngestReport) -> List[Tuple[int, Dict]]:
+    try:
+        parsed = list(csv.reader([line for _, line in lines]))
+    except csv.Error:
+        parsed = None
+    records = []
+    for index, (row, line) in enumerate(lines):
+        if parsed is not None:
+            values = parsed[index]
+        else:
+            # Re-parse record by record to find the malformed ones
+            try:
+                values = next(csv.reader([line]))
+            except (csv.Error, StopIteration):
+                report.error(row, "invalid CSV record")
+                continue
+        if len(values) != len(header):
+            report.error(row, f"expected {len(header)} fields, got {len(values)}")
+            continue
+        records.append((row, dict(zip(header, values))))
+    return records
+
+async def _records(chunks: AsyncIterator[bytes], csv_format: bool):
+    """
+    Split a byte stream into (row number, record text) pairs. For CSV, a
+    record whose quoted field spans lines is joined back together. A line
+    longer than MAX_RECORD_CHARS bytes is skipped to its end without being
+    buffered and yielded with None as its text.
+    """
+    partial: List[bytes] = []   # start of the line the last chunk ended in
+    partial_size = 0
+    too_long = False
+    pending = ""
+    row = 0
+
+    def complete(raw: bytes) -> Optional[str]:
+        """Take a whole line, returning the record it completes, if any"""
+        nonlocal pending
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+        if csv_format:
+            pending = f"{pending}\n{line}" if pending else line
+            if pending.count('"') % 2 and len(pending) < MAX_RECORD_CHARS:
+                return None
+            line, pending = pending, ""
+        return line if line.strip() else None
+
+    async for chunk in chunks:
+        *ends, rest = chunk.split(b"\n")
+        for piece in ends:
+            if too_long or partial_size + len(piece) > MAX_RECORD_CHARS:
+                partial, partial_size, too_long, pending = [], 0, False, ""
+                row += 1
+                yield row, None
+                continue
+            partial.append(piece)
+            line = complete(b"".join(partial))
+            partial, partial_size = [], 0
+            if line is not None:
+                row += 1
+                yield row, line
+        if not too_long:
+            partial.append(rest)
+            partial_size += len(rest)
+            if partial_size > MAX_RECORD_CHARS:
+                partial, partial_size, too_long = [], 0, True
+
+    if too_long:
+        yield row + 1, None
+        return
+    tail = b"".join(partial).decode("utf-8", errors="replace").rstrip("\r")
+    if csv_format and pending:
+        tail = f"{pending}\n{tail}" if tail else pending
+    if tail.strip():
+        yield row + 1, tail
+
+async def ingest_incidents(chunks: AsyncIterator[bytes], fmt: str = "ndjson") -> Dict:
+    """
+    Ingest a streamed NDJSON or CSV body into the incident store. Records are
+    validated and appended INGEST_BATCH_SIZE at a time in a worker thread, so
+    memory stays bounded by one batch regardless of the body size.
+    """
+    report = IngestReport()
+    csv_format = fmt == "csv"
+    header: Optional[List[str]] = None
+    batch: List[Tuple[int, str]] = []
+
+    async def flush():
+        if not batch:
+            return
+        lines = list(batch)
+        batch.clear()
+        report.received += len(lines)
+
+        def process():
+            if csv_format:
+                records = _parse_csv(lines, header, report)
+            else:
+                records = _parse_ndjson(lines, report)
+            if records:
+                _ingest_records(records, report)
+
+        await asyncio.to_thread(process)
+
+    async for row, line in _records(chunks, csv_format):
+        if line is None:
+            if csv_format and header is None:
+                raise ValueError(f"CSV header is longer than {MAX_RECORD_CHARS} bytes")
+            report.received += 1
+            report.error(row - 1 if csv_format else row, f"record is longer than {MAX_RECORD_CHARS} bytes")
+            continue
+        if csv_format and header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+            missing = [name for name in REQUIRED_FIELDS if name not in header]
+            if missing:
+                raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+            continue
+        # Data rows are numbered from 1, after the CSV header
+        batch.append((row - 1 if csv_format else row, line))
+        if len(batch) >= INGEST_BATCH_SIZE:
+            await flush()
+    await flush()
+
+    return report.to_dict()
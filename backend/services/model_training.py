@@ -0,0 +1,171 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from config import (
+    MODEL_CELL_DEG, STORAGE_CHUNK_SIZE, TRAINING_HALF_LIFE_DAYS, TRAINING_SHARDS, TRAINING_WORKERS
+)
+from services.crime_model import CrimeRateModel, fit_rate_model, new_version
+from utils.data_utils import US_PER_DAY, HOURS_PER_WEEK, hour_of_week
+
+US_PER_WEEK = 7 * US_PER_DAY
+
+# One spilled incident: grid cell, timestamp and crime type code
+SPILL_DTYPE = np.dtype([("cell", "<i8"), ("timestamp", "<i8"), ("type_code", "<i2")])
+
+# A chunk of incidents: latitude, longitude, timestamp (epoch us), and per
+# row crime type codes indexing the chunk's own list of type names
+Chunk = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[str]]
+
+def repository_chunks(
+    repository,
+    chunk_size: int = STORAGE_CHUNK_SIZE,
+    start_us: Optional[int] = None,
+    end_us: Optional[int] = None
+) -> Iterator[Chunk]:
+    """Stream incidents from a SQLiteIncidentRepository in keyset-paged chunks"""
+    for chunk in repository.iter_chunks(chunk_size=chunk_size, start_us=start_us, end_us=end_us):
+        names, codes = np.unique(np.array(chunk["crime_types"], dtype=object), return_inverse=True)
+        yield chunk["latitude"], chunk["longitude"], chunk["timestamp"], codes, list(names)
+
+def store_chunks(
+    store,
+    chunk_size: int = STORAGE_CHUNK_SIZE,
+    start_us: Optional[int] = None,
+    end_us: Optional[int] = None
+) -> Iterator[Chunk]:
+    """Stream the live rows of an IncidentStore in row order, one chunk at a time"""
+    columns = store.columns()
+    rows = np.sort(columns.order)
+    for first in range(0, len(rows), chunk_size):
+        chunk = rows[first:first + chunk_size]
+        timestamps = columns.timestamp[chunk]
+        keep = np.ones(len(chunk), dtype=bool)
+        if start_us is not None:
+            keep &= timestamps >= start_us
+        if end_us is not None:
+            keep &= timestamps <= end_us
+        chunk = chunk[keep]
+        yield (
+            columns.latitude[chunk], columns.longitude[chunk], columns.timestamp[chunk],
+            columns.type_code[chunk].astype(np.int64), list(store.type_names)
+        )
+
+def _count_shard(path: str, type_count: int, reference_us: int, half_life_us: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the recency-weighted (cell, type, hour of week) counts of one
+    spill file. Runs in a worker process; each shard holds whole cells, so
+    shard results never overlap.
+    """
+    records = np.fromfile(path, dtype=SPILL_DTYPE)
+    if len(records) == 0:
+        return np.empty(0, dtype=np.int64), np.zeros((0, type_count, HOURS_PER_WEEK))
+    cell_keys, cells = np.unique(records["cell"], return_inverse=True)
+    weights = np.exp2(-(reference_us - records["timestamp"]) / half_life_us)
+    flat = (cells * type_count + records["type_code"]) * HOURS_PER_WEEK + hour_of_week(records["timestamp"])
+    counts = np.bincount(flat, weights=weights, minlength=len(cell_keys) * type_count * HOURS_PER_WEEK)
+    return cell_keys, counts.reshape(len(cell_keys), type_count, HOURS_PER_WEEK)
+
+def effective_weeks(span_us: int, half_life_us: float) -> float:
+    """
+    Recency-weighted length of the observed span in weeks: the integral of
+    the weight over the span, so weighted counts divided by it are rates
+    """
+    span_weeks = max(span_us / US_PER_WEEK, 1.0)
+    half_life_weeks = half_life_us / US_PER_WEEK
+    return half_life_weeks / math.log(2) * (1 - math.exp2(-span_weeks / half_life_weeks))
+
+def train_rate_model(
+    chunks: Iterator[Chunk],
+    cell_deg: float = MODEL_CELL_DEG,
+    half_life_days: float = TRAINING_HALF_LIFE_DAYS,
+    workers: int = TRAINING_WORKERS,
+    shards: int = TRAINING_SHARDS,
+    work_dir: Optional[str] = None,
+    version: Optional[str] = None
+) -> CrimeRateModel:
+    """
+    Train a CrimeRateModel from a stream of incident chunks in two passes:
+
+    1. Each chunk is binned into grid cells and spilled to one of `shards`
+       files by cell, so only one chunk is ever held in memory.
+    2. A process pool turns each shard into recency-weighted
+       (cell, type, hour of week) counts, halving a row's weight every
+       `half_life_days` before the newest incident.
+
+    The counts are then fitted with `fit_rate_model`.
+    """
+    started = time.perf_counter()
+    lon_cells = int(math.ceil(360.0 / cell_deg))
+    type_names: List[str] = []
+    type_index: Dict[str, int] = {}
+    rows = 0
+    min_ts: Optional[int] = None
+    max_ts: Optional[int] = None
+
+    with tempfile.TemporaryDirectory(prefix="crime_model_", dir=work_dir) as spill_dir:
+        paths = [os.path.join(spill_dir, f"shard_{shard:04d}.bin") for shard in range(shards)]
+        for latitude, longitude, timestamps, codes, names in chunks:
+            if len(timestamps) == 0:
+                continue
+            for name in names:
+                if name not in type_index:
+                    type_index[name] = len(type_names)
+                    type_names.append(name)
+            records = np.empty(len(timestamps), dtype=SPILL_DTYPE)
+            records["cell"] = (
+                np.floor((latitude + 90.0) / cell_deg).astype(np.int64) * lon_cells
+                + np.floor((longitude + 180.0) / cell_deg).astype(np.int64)
+            )
+            records["timestamp"] = timestamps
+            records["type_code"] = np.array([type_index[name] for name in names], dtype=np.int16)[codes]
+
+            shard_of = records["cell"] % shards
+            order = np.argsort(shard_of, kind="stable")
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(shard_of, minlength=shards))])
+            for shard in np.flatnonzero(np.diff(bounds)).tolist():
+                with open(paths[shard], "ab") as f:
+                    records[order[bounds[shard]:bounds[shard + 1]]].tofile(f)
+
+            rows += len(timestamps)
+            min_ts = int(timestamps.min()) if min_ts is None else min(min_ts, int(timestamps.min()))
+            max_ts = int(timestamps.max()) if max_ts is None else max(max_ts, int(timestamps.max()))
+
+        if rows == 0:
+            raise ValueError("No incidents to train on")
+
+        half_life_us = half_life_days * US_PER_DAY
+        spilled = [path for path in paths if os.path.exists(path)]
+        with ProcessPoolExecutor(max_workers=workers or None) as pool:
+            results = list(pool.map(
+                _count_shard,
+                spilled,
+                [len(type_names)] * len(spilled),
+                [max_ts] * len(spilled),
+                [half_life_us] * len(spilled)
+            ))
+
+    cell_keys = np.concatenate([keys for keys, _ in results])
+    counts = np.concatenate([shard_counts for _, shard_counts in results])
+    return fit_rate_model(
+        version=version or new_version(),
+        cell_deg=cell_deg,
+        cell_keys=cell_keys,
+        counts=counts,
+        weeks=effective_weeks(max_ts - min_ts, half_life_us),
+        type_names=type_names,
+        metadata={
+            "source": "training",
+            "incidents": rows,
+            "data_start_us": min_ts,
+            "data_end_us": max_ts,
+            "half_life_days": half_life_days,
+            "shards": len(spilled),
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+    )
@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from datetime import datetime
+import math
+import threading
+
+from config import (
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_MAX_MB, PREDICTION_CACHE_TTL,
+    PREDICTION_CACHE_CELL_DEG, PREDICTION_CACHE_TIME_STEP
+)
+from utils.cache import LRUCache
+from utils.data_utils import US_PER_SECOND, datetime_to_epoch_us, epoch_us_to_datetime
+
+class PredictionCache:
+    """
+    Cache of prediction results keyed on canonical inputs: locations snapped
+    to a `cell_deg` grid, times aligned to `time_step` seconds and crime
+    types as a sorted set. Callers compute misses from the same canonical
+    inputs, so every request sharing a key gets the same answer.
+
+    Entries expire after `ttl` seconds and the whole cache is dropped when
+    a new model version is activated; reads and writes for any other
+    version are ignored. Memory is bounded by both entry count and
+    the summed serialized size of the entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = PREDICTION_CACHE_SIZE,
+        max_bytes: int = int(PREDICTION_CACHE_MAX_MB * 1024 * 1024),
+        ttl: float = PREDICTION_CACHE_TTL,
+        cell_deg: float = PREDICTION_CACHE_CELL_DEG,
+        time_step: float = PREDICTION_CACHE_TIME_STEP
+    ):
+        self.entries = LRUCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+        self.cell_deg = cell_deg
+        self.step_us = int(time_step * US_PER_SECOND)
+        self.model_version: Optional[str] = None
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def location_key(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self.cell_deg), math.floor(longitude / self.cell_deg))
+
+    def snap_location(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        """The center of the grid cell holding the point"""
+        lat_cell, lon_cell = self.location_key(latitude, longitude)
+        return (
+            round((lat_cell + 0.5) * self.cell_deg, 7),
+            round((lon_cell + 0.5) * self.cell_deg, 7)
+        )
+
+    def align_start(self, value: datetime) -> datetime:
+        """Round down to the time step (as a naive local datetime)"""
+        epoch_us = datetime_to_epoch_us(value)
+        return epoch_us_to_datetime(epoch_us - epoch_us % self.step_us)
+
+    def align_end(self, value: datetime) -> datetime:
+        """Round up to the time step, so an aligned window covers the original"""
+        epoch_us = datetime_to_epoch_us(value)
+        return epoch_us_to_datetime(-(-epoch_us // self.step_us) * self.step_us)
+
+    def time_bucket(self, value: Optional[datetime] = None) -> int:
+        """Index of the time step holding `value` (default now)"""
+        return datetime_to_epoch_us(value or datetime.now()) // self.step_us
+
+    @staticmethod
+    def crime_types_key(crime_types: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+        return tuple(sorted(set(crime_types))) if crime_types else None
+
+    def activate(self, model_version: str) -> None:
+        """Register the version now serving, dropping every entry of the previous one"""
+        with self._lock:
+            if model_version != self.model_version:
+                if self.model_version is not None:
+                    self.entries.clear()
+                    self.invalidations += 1
+                self.model_version = model_version
+
+    def _current(self, model_version: str) -> bool:
+        # Call with the lock held. Before any activation the first version
+        # seen is adopted; after that only the registered one is served.
+        if self.model_version is None:
+            self.model_version = model_version
+        return model_version == self.model_version
+
+    def get(self, key: Hashable, model_version: str) -> Any:
+        """Get a cached value for the given model version, or None"""
+        with self._lock:
+            if not self._current(model_version):
+                return None
+        return self.entries.get(key)
+
+    def set(self, key: Hashable, value: Any, model_version: str, size: int) -> None:
+        """Store a value computed by `model_version`; `size` is its serialized size in bytes"""
+        with self._lock:
+            if not self._current(model_version):
+                # Computed by a model that has since been replaced
+                return
+            self.entries.set(key, value, size=size)
+
+    def get_or_compute(self, key: Hashable, model_version: str, compute: Callable[[], Any], sizeof: Callable[[Any], int]) -> Any:
+        value = self.get(key, model_version)
+        if value is None:
+            value = compute()
+            self.set(key, value, model_version, sizeof(value))
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.entries.stats(),
+            "model_version": self.model_version,
+            "invalidations": self.invalidations,
+            "cell_deg": self.cell_deg,
+            "time_step_seconds": self.step_us / US_PER_SECOND
+        }
@@ -1,13 +1,306 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-import random
-import math
+import json
+import os
+import threading
 
-from models.crime import Location, TimeRange, PredictionResponse, PredictionResult
+import numpy as np
 
-# Mumbai coordinates for mock data generation
+from config import (
+    MODEL_PATH, PREDICTION_RADIUS_KM, PREDICTION_TOP_K, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS,
+    HOTSPOT_FORECAST_RESULTS, MODEL_PRIOR_STRENGTH, MODEL_SPATIAL_SMOOTHING, BACKTEST_FOLDS,
+    BACKTEST_HORIZON_HOURS, BACKTEST_WINDOW_DAYS, BACKTEST_TOP_K, BACKTEST_WORKERS
+)
+from models.crime import Location, TimeRange, PredictionRequest, PredictionResponse, PredictionResult
+from services.crime_service import get_incident_store
+from services.backtest import BacktestResult, run_backtest
+from services.hotspot_forecast import HotspotForecast, compute_hotspot_forecast, forecast_hotspot_columns, forecast_hotspots
+from services.prediction_cache import PredictionCache
+from services.crime_model import CrimeRateModel, find_artifact, fit_rate_model, hour_weights_batch, latest_artifact, load_model_file
+from services.risk_surface import RiskSurface, RiskSurfaceSnapshot, assess_area
+from utils.cache import LRUCache
+from utils.data_utils import US_PER_DAY, US_PER_HOUR, datetime_to_epoch_us
+from utils.micro_batch import MicroBatcher
+from utils.response_formats import Columns, Dictionary
+
+# Mumbai coordinates, used for smoke tests when a model has no cells
 MUMBAI_CENTER = {"latitude": 19.0760, "longitude": 72.8777}
-MUMBAI_RADIUS = 0.1  # Roughly 10km
+
+# Per-cell incident rates behind area risk assessments, kept up to date by
+# refresh_risk_surface() from a background task
+_risk_surface = RiskSurface(get_incident_store())
+
+def refresh_risk_surface() -> RiskSurfaceSnapshot:
+    """Fold new incidents into the risk surface. Blocking; run it off the event loop."""
+    return _risk_surface.refresh()
+
+def get_risk_surface() -> RiskSurfaceSnapshot:
+    """Get the latest risk surface, building it on first use"""
+    return _risk_surface.snapshot() or _risk_surface.refresh()
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """The serving model and where it came from, swapped as one reference"""
+    model: CrimeRateModel
+    source: Optional[str]           # artifact path, None for a baseline
+    signature: Optional[tuple]      # (path, mtime, size) of the artifact
+    loaded_at: datetime
+    pinned: bool = False            # requested by version, kept until a reload without one
+
+# Model used for predictions, loaded by load_model() at startup and
+# replaced whole by reloads. Requests read it once, so a request in flight
+# during a swap finishes on the model it started with.
+_loaded: Optional[LoadedModel] = None
+_reload_lock = threading.Lock()
+_reload_stats = {"reloads": 0, "failures": 0, "last_error": None, "failed_signature": None}
+
+def baseline_model() -> CrimeRateModel:
+    """Fit a model from the current risk surface, for when no trained artifact exists"""
+    surface = get_risk_surface()
+    return fit_rate_model(
+        version=f"baseline-{surface.generation}",
+        cell_deg=surface.cell_deg,
+        cell_keys=surface.cell_keys,
+        counts=surface.counts,
+        weeks=surface.weeks,
+        type_names=surface.type_names,
+        metadata={"source": "incident store"}
+    )
+
+def _smoke_requests(model: CrimeRateModel) -> List[PredictionRequest]:
+    """A small fixed batch around the model's busiest cells"""
+    now = datetime.now()
+    busiest = np.argsort(-model.support)[:4] if len(model.support) else []
+    points = [(model.cell_lat[c], model.cell_lon[c]) for c in busiest] or [
+        (MUMBAI_CENTER["latitude"], MUMBAI_CENTER["longitude"])
+    ]
+    return [
+        PredictionRequest(
+            location=Location(latitude=float(lat), longitude=float(lon)),
+            time_range=TimeRange(start_time=now, end_time=now + timedelta(hours=hours)),
+            crime_types=None
+        )
+        for lat, lon in points for hours in (1, 24)
+    ]
+
+def _artifact_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+def _smoke_test(model: CrimeRateModel) -> None:
+    """
+    Warm the model up with a smoke batch and check its output.
+    Raises ValueError when the model is unusable.
+    """
+    if not np.isfinite(model.rates).all() or (model.rates < 0).any():
+        raise ValueError(f"Model {model.version} has negative or non-finite rates")
+    requests = _smoke_requests(model)
+    responses = score_prediction_requests(requests, model)
+    if len(responses) != len(requests):
+        raise ValueError(f"Model {model.version} answered {len(responses)} of {len(requests)} smoke requests")
+    for response in responses:
+        for prediction in response.predictions:
+            if not (0.0 <= prediction.probability <= 1.0 and 0.0 <= prediction.confidence <= 1.0):
+                raise ValueError(f"Model {model.version} produced out of range probabilities")
+
+def load_model(path: Optional[str] = None, pinned: bool = False) -> CrimeRateModel:
+    """
+    Load a model artifact (default the newest under MODEL_PATH, or a
+    baseline fitted from stored incidents when there is none), warm it up
+    and smoke-test it, then swap it in. The current model keeps serving
+    until the swap, and stays in place if loading fails. A `pinned` model
+    is not replaced by automatic reloads. Blocking; run it off the event
+    loop.
+    """
+    global _loaded
+    with _reload_lock:
+        path = path or latest_artifact(MODEL_PATH)
+        signature = _artifact_signature(path) if path else None
+        try:
+            model = load_model_file(path) if path else baseline_model()
+            _smoke_test(model)
+        except Exception as e:
+            _reload_stats["failures"] += 1
+            _reload_stats["last_error"] = f"{path or 'baseline'}: {e}"
+            _reload_stats["failed_signature"] = signature
+            raise
+        if _loaded is not None:
+            _reload_stats["reloads"] += 1
+        # Results of the outgoing model are refused from here on
+        _prediction_cache.activate(model.version)
+        _loaded = LoadedModel(
+            model=model, source=path, signature=signature, loaded_at=datetime.now(), pinned=pinned
+        )
+        return model
+
+def reload_model(version: Optional[str] = None) -> CrimeRateModel:
+    """
+    Load and swap in the artifact for `version`, default the newest one.
+    A requested version is pinned: automatic reloads leave it serving (so
+    a rollback sticks) until a reload without a version unpins it.
+    Raises FileNotFoundError for an unknown version and ValueError when the
+    artifact fails its smoke test.
+    """
+    path = None
+    if version is not None:
+        path = find_artifact(MODEL_PATH, version)
+        if path is None:
+            raise FileNotFoundError(f"No model artifact for version {version}")
+    return load_model(path, pinned=version is not None)
+
+def reload_model_if_changed() -> Optional[CrimeRateModel]:
+    """
+    Reload when the newest artifact under MODEL_PATH differs from the one
+    serving, unless that one is pinned. An artifact that already failed is
+    not retried until it changes.
+    """
+    current = _loaded
+    if current is not None and current.pinned:
+        return None
+    path = latest_artifact(MODEL_PATH)
+    if path is None:
+        return None
+    signature = _artifact_signature(path)
+    if current is not None and current.signature == signature:
+        return None
+    if signature == _reload_stats["failed_signature"]:
+        return None
+    return load_model(path)
+
+def get_model() -> CrimeRateModel:
+    """Get the current model, loading it on first use"""
+    loaded = _loaded
+    return loaded.model if loaded is not None else load_model()
+
+def model_info() -> Dict:
+    """Version and origin of the serving model, with reload counters"""
+    loaded = _loaded
+    return {
+        "model_version": loaded.model.version if loaded else None,
+        "source": loaded.source if loaded else None,
+        "trained_at": loaded.model.trained_at.isoformat() if loaded else None,
+        "loaded_at": loaded.loaded_at.isoformat() if loaded else None,
+        "pinned": loaded.pinned if loaded else False,
+        "reloads": _reload_stats["reloads"],
+        "failures": _reload_stats["failures"],
+        "last_error": _reload_stats["last_error"]
+    }
+
+def score_prediction_requests(
+    requests: List[PredictionRequest],
+    model: Optional[CrimeRateModel] = None
+) -> List[PredictionResponse]:
+    """
+    Score a batch of prediction requests in one vectorized pass. Each
+    request is answered with the PREDICTION_TOP_K (cell, crime type) pairs
+    within PREDICTION_RADIUS_KM most likely to see an incident during its
+    time range, with probability 1 - exp(-expected count).
+    """
+    model = model or get_model()
+    generated_at = datetime.now()
+    type_count = len(model.type_names)
+
+    # Features for the whole batch: one row per (request, nearby cell) pair
+    owner, cells = model.cells_near_many(
+        [r.location.latitude for r in requests], [r.location.longitude for r in requests], PREDICTION_RADIUS_KM
+    )
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=len(requests)))])
+
+    weights = hour_weights_batch(
+        np.array([datetime_to_epoch_us(r.time_range.start_time) for r in requests], dtype=np.int64),
+        np.array([datetime_to_epoch_us(r.time_range.end_time) for r in requests], dtype=np.int64)
+    )
+    type_mask = np.ones((len(requests), type_count), dtype=bool)
+    for index, request in enumerate(requests):
+        if request.crime_types:
+            type_mask[index] = np.isin(model.type_names, request.crime_types)
+
+    expected = model.expected_counts(cells, weights[owner]) * type_mask[owner]
+    probability = -np.expm1(-expected)
+    confidence = model.confidence(cells)
+
+    # Rank every request's (cell, type) pairs at once in a padded
+    # (requests, cells * types) matrix; padding never ranks above a real pair
+    width = int(np.diff(offsets).max()) * type_count if len(requests) else 0
+    padded = np.full((len(requests), max(width, 1)), -1.0)
+    slot = (np.arange(len(cells)) - offsets[owner])[:, None] * type_count + np.arange(type_count)
+    padded[owner[:, None], slot] = probability
+    k = min(PREDICTION_TOP_K, padded.shape[1])
+    top = np.argpartition(-padded, k - 1, axis=1)[:, :k]
+    # Highest probability first, ties in (cell, type) order
+    rank = np.lexsort((top, -np.take_along_axis(padded, top, axis=1)), axis=1)
+    top = np.take_along_axis(top, rank, axis=1)
+    top_probability = np.take_along_axis(padded, top, axis=1)
+    top_pair = offsets[:-1, None] + top // max(type_count, 1)
+    top_type = top % max(type_count, 1)
+
+    responses = []
+    for index in range(len(requests)):
+        predictions = []
+        for p, pair, t in zip(top_probability[index].tolist(), top_pair[index].tolist(), top_type[index].tolist()):
+            if p <= 0:
+                break
+            cell = cells[pair]
+            predictions.append(PredictionResult(
+                location=Location(latitude=float(model.cell_lat[cell]), longitude=float(model.cell_lon[cell])),
+                probability=p,
+                crime_type=model.type_names[t],
+                confidence=float(confidence[pair])
+            ))
+        responses.append(PredictionResponse(
+            predictions=predictions,
+            generated_at=generated_at,
+            model_version=model.version
+        ))
+    return responses
+
+# Results of generate_predictions, get_prediction_hotspots and
+# get_area_risk_assessment, dropped whenever the model version changes
+_prediction_cache = PredictionCache()
+
+def _json_size(value) -> int:
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(json.dumps(value, default=str))
+
+def _canonical_request(request: PredictionRequest) -> Tuple[PredictionRequest, tuple]:
+    """
+    Snap a request to the cache grid and time step. Returns the request to
+    score and its cache key.
+    """
+    cache = _prediction_cache
+    latitude, longitude = cache.snap_location(request.location.latitude, request.location.longitude)
+    crime_types = cache.crime_types_key(request.crime_types)
+    canonical = PredictionRequest(
+        location=Location(latitude=latitude, longitude=longitude),
+        time_range=TimeRange(
+            start_time=cache.align_start(request.time_range.start_time),
+            end_time=cache.align_end(request.time_range.end_time)
+        ),
+        crime_types=list(crime_types) if crime_types else None
+    )
+    key = (
+        "predictions",
+        cache.location_key(request.location.latitude, request.location.longitude),
+        canonical.time_range.start_time,
+        canonical.time_range.end_time,
+        crime_types
+    )
+    return canonical, key
+
+def _cached_predictions(requests: List[PredictionRequest]) -> List[PredictionResponse]:
+    """Answer requests from the cache, scoring the misses together"""
+    version = get_model().version
+    entries = [_canonical_request(request) for request in requests]
+    responses = [_prediction_cache.get(key, version) for _, key in entries]
+    misses = [index for index, response in enumerate(responses) if response is None]
+    if misses:
+        scored = score_prediction_requests([entries[index][0] for index in misses])
+        for index, response in zip(misses, scored):
+            _prediction_cache.set(entries[index][1], response, response.model_version, _json_size(response))
+            responses[index] = response
+    return responses
 
 def generate_predictions(
     location: Location,
@@ -15,154 +308,252 @@ def generate_predictions(
     crime_types: Optional[List[str]] = None
 ) -> PredictionResponse:
     """Generate crime predictions based on location and time range"""
-    # In a real implementation, this would call the ML model
-    # For now, return mock predictions
-    
-    predictions = []
-    
-    # Generate 5-10 prediction points around the specified location
-    num_predictions = random.randint(5, 10)
-    
-    for _ in range(num_predictions):
-        # Random location within 2km of the specified location
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, 0.02)  # ~2km
-        latitude = location.latitude + distance * math.cos(angle)
-        longitude = location.longitude + distance * math.sin(angle)
-        
-        # Random probability and confidence
-        probability = random.uniform(0.5, 0.95)
-        confidence = random.uniform(0.6, 0.9)
-        
-        # Random crime type if not specified
-        if crime_types:
-            crime_type = random.choice(crime_types)
-        else:
-            from services.crime_service import CRIME_TYPES
-            crime_type = random.choice(CRIME_TYPES)
-        
-        prediction = PredictionResult(
-            location=Location(latitude=latitude, longitude=longitude),
-            probability=probability,
-            crime_type=crime_type,
-            confidence=confidence
-        )
-        predictions.append(prediction)
-    
-    return PredictionResponse(
-        predictions=predictions,
-        generated_at=datetime.now(),
-        model_version="0.1.0"
-    )
+    request = PredictionRequest(location=location, time_range=time_range, crime_types=crime_types)
+    return _cached_predictions([request])[0]
+
+def generate_predictions_batch(requests: List[PredictionRequest]) -> List[PredictionResponse]:
+    """
+    Score many prediction requests in one pass, returning responses aligned
+    with the inputs. Raises ValueError naming the first request with an
+    empty time range. Blocking; run it off the event loop.
+    """
+    for index, request in enumerate(requests):
+        if request.time_range.end_time <= request.time_range.start_time:
+            raise ValueError(f"requests[{index}]: time_range.end_time must be after start_time")
+    return _cached_predictions(requests)
+
+def predictions_to_columns(responses: List[PredictionResponse]) -> Tuple[Columns, Dict]:
+    """
+    Flatten prediction responses into one response table; the `request`
+    column is the index of the response each row belongs to
+    """
+    predictions = [prediction for response in responses for prediction in response.predictions]
+    type_names = sorted({p.crime_type for p in predictions if p.crime_type is not None})
+    type_index = {name: code for code, name in enumerate(type_names)}
+    count = len(predictions)
+    table = {
+        "request": np.repeat(
+            np.arange(len(responses), dtype=np.uint32), [len(response.predictions) for response in responses]
+        ),
+        "latitude": np.fromiter((p.location.latitude for p in predictions), np.float64, count),
+        "longitude": np.fromiter((p.location.longitude for p in predictions), np.float64, count),
+        "probability": np.fromiter((p.probability for p in predictions), np.float64, count),
+        "crime_type": Dictionary(
+            np.fromiter((type_index.get(p.crime_type, -1) for p in predictions), np.int32, count), type_names
+        ),
+        "confidence": np.fromiter((p.confidence for p in predictions), np.float64, count)
+    }
+    return table, {
+        "model_version": responses[0].model_version if responses else get_model().version,
+        "generated_at": [response.generated_at.isoformat() for response in responses]
+    }
+
+# Concurrent /generate requests are scored together in micro-batches
+_inference_queue = MicroBatcher(
+    score_prediction_requests,
+    max_batch_size=INFERENCE_MAX_BATCH,
+    max_wait=INFERENCE_MAX_WAIT_MS / 1000
+)
+
+def start_inference_queue() -> None:
+    _inference_queue.start()
+
+async def stop_inference_queue() -> None:
+    await _inference_queue.stop()
+
+def inference_stats() -> Dict:
+    return _inference_queue.stats()
+
+def prediction_cache_stats() -> Dict:
+    return _prediction_cache.stats()
+
+async def predict(request: PredictionRequest) -> PredictionResponse:
+    """
+    Answer one request from the cache or through the micro-batching queue.
+    Raises ValueError when the time range is empty.
+    """
+    if request.time_range.end_time <= request.time_range.start_time:
+        raise ValueError("time_range.end_time must be after start_time")
+    canonical, key = _canonical_request(request)
+    cached = _prediction_cache.get(key, get_model().version)
+    if cached is not None:
+        return cached
+    response = await _inference_queue.submit(canonical)
+    _prediction_cache.set(key, response, response.model_version, _json_size(response))
+    return response
+
+# Latest precomputed hotspot forecast, replaced whole by
+# refresh_hotspot_forecast()
+_forecast: Optional[HotspotForecast] = None
+
+def refresh_hotspot_forecast() -> HotspotForecast:
+    """
+    Recompute hotspot forecasts when the hour or the model changed since
+    the last run. Blocking; run it off the event loop.
+    """
+    global _forecast
+    model = get_model()
+    origin = datetime.now().replace(minute=0, second=0, microsecond=0)
+    current = _forecast
+    if current is not None and current.model_version == model.version and current.origin == origin:
+        return current
+    _forecast = compute_hotspot_forecast(model, origin)
+    return _forecast
+
+def get_hotspot_forecast_snapshot() -> Optional[HotspotForecast]:
+    """Get the latest hotspot forecast, or None before the first one"""
+    return _forecast
+
+def get_hotspot_forecast() -> HotspotForecast:
+    """Get the latest hotspot forecast, computing it on first use"""
+    return _forecast or refresh_hotspot_forecast()
 
 def get_prediction_hotspots(
     hours_ahead: int = 24,
-    crime_type: Optional[str] = None
+    crime_type: Optional[str] = None,
+    limit: int = HOTSPOT_FORECAST_RESULTS,
+    forecast: Optional[HotspotForecast] = None
 ) -> List[dict]:
-    """Get predicted crime hotspots for the next X hours"""
-    # In a real implementation, this would call the ML model
-    # For now, return mock hotspots
-    
-    hotspots = []
-    
-    # Generate 10-20 hotspots around Mumbai
-    num_hotspots = random.randint(10, 20)
-    
-    for _ in range(num_hotspots):
-        # Random location within Mumbai area
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, MUMBAI_RADIUS)
-        latitude = MUMBAI_CENTER["latitude"] + distance * math.cos(angle)
-        longitude = MUMBAI_CENTER["longitude"] + distance * math.sin(angle)
-        
-        # Random probability and radius
-        probability = random.uniform(0.5, 0.95)
-        radius = random.uniform(0.2, 1.0)  # km
-        
-        # Random crime type if not specified
-        if crime_type:
-            predicted_type = crime_type
-        else:
-            from services.crime_service import CRIME_TYPES
-            predicted_type = random.choice(CRIME_TYPES)
-        
-        # Random time within the specified hours ahead
-        hours_from_now = random.uniform(1, hours_ahead)
-        predicted_time = datetime.now() + timedelta(hours=hours_from_now)
-        
-        hotspot = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "probability": probability,
-            "radius": radius,
-            "predicted_type": predicted_type,
-            "predicted_time": predicted_time.isoformat()
+    """
+    Get predicted crime hotspots for the next X hours from the precomputed
+    forecast, or from `forecast` when the caller already holds one
+    """
+    forecast = forecast or get_hotspot_forecast()
+    key = ("hotspots", hours_ahead, crime_type, limit, forecast.generated_at)
+    hotspots = _prediction_cache.get_or_compute(
+        key,
+        forecast.model_version,
+        lambda: forecast_hotspots(forecast, hours_ahead, crime_type, limit),
+        _json_size
+    )
+    return list(hotspots)
+
+def get_prediction_hotspot_columns(
+    hours_ahead: int = 24,
+    crime_type: Optional[str] = None,
+    limit: int = HOTSPOT_FORECAST_RESULTS,
+    forecast: Optional[HotspotForecast] = None
+) -> Columns:
+    """`get_prediction_hotspots` as a response table, sliced straight from the forecast arrays"""
+    return forecast_hotspot_columns(forecast or get_hotspot_forecast(), hours_ahead, crime_type, limit)
+
+# Backtest results by (model version, data window), and the latest one
+_backtests = LRUCache(max_entries=16)
+_latest_backtest: Optional[BacktestResult] = None
+_backtest_lock = threading.Lock()
+
+def _backtest_key(model: CrimeRateModel) -> tuple:
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (model.version, end, BACKTEST_FOLDS, BACKTEST_HORIZON_HOURS, BACKTEST_WINDOW_DAYS, BACKTEST_TOP_K)
+
+def refresh_backtest() -> BacktestResult:
+    """
+    Backtest the serving model unless its version and data window already
+    have results. Blocking; run it off the event loop.
+    """
+    global _latest_backtest
+    with _backtest_lock:
+        model = get_model()
+        key = _backtest_key(model)
+        result = _backtests.get(key)
+        if result is not None:
+            return result
+
+        horizon_us = BACKTEST_HORIZON_HOURS * US_PER_HOUR
+        end_us = datetime_to_epoch_us(key[1])
+        origins = [end_us - horizon_us * fold for fold in range(BACKTEST_FOLDS, 0, -1)]
+        store = get_incident_store()
+        columns = store.columns()
+        rows = store.select(columns, origins[0] - int(BACKTEST_WINDOW_DAYS * US_PER_DAY), end_us)
+        params = {
+            "cell_deg": model.cell_deg,
+            "prior_strength": model.metadata.get("prior_strength", MODEL_PRIOR_STRENGTH),
+            "spatial_smoothing": model.metadata.get("spatial_smoothing", MODEL_SPATIAL_SMOOTHING),
+            "half_life_days": model.metadata.get("half_life_days")
         }
-        hotspots.append(hotspot)
-    
-    # Sort by probability (highest first)
-    hotspots.sort(key=lambda x: x["probability"], reverse=True)
-    
-    return hotspots
+        result = run_backtest(
+            key=key,
+            model_version=model.version,
+            latitude=columns.latitude[rows],
+            longitude=columns.longitude[rows],
+            timestamp=columns.timestamp[rows],
+            type_code=columns.type_code[rows],
+            type_names=list(store.type_names),
+            params=params,
+            origins=origins,
+            horizon_hours=BACKTEST_HORIZON_HOURS,
+            window_days=BACKTEST_WINDOW_DAYS,
+            top_k=BACKTEST_TOP_K,
+            workers=BACKTEST_WORKERS
+        )
+        _backtests.set(key, result)
+        _latest_backtest = result
+        return result
 
 def get_prediction_accuracy() -> Dict:
-    """Get model prediction accuracy metrics"""
-    # In a real implementation, this would calculate actual model metrics
-    # For now, return mock accuracy metrics
-    
+    """
+    Get model prediction accuracy metrics from the rolling-origin backtest.
+    While the serving model's backtest is still running the previous
+    results are returned, marked stale; only the very first call waits.
+    """
+    result = _backtests.get(_backtest_key(get_model()))
+    stale = result is None and _latest_backtest is not None
+    if result is None:
+        result = _latest_backtest or refresh_backtest()
+    folds, horizon = result.key[2], result.key[3]
+
     return {
-        "overall_accuracy": 0.87,
-        "precision": 0.82,
-        "recall": 0.79,
-        "f1_score": 0.80,
-        "metrics_as_of": datetime.now().isoformat(),
-        "model_version": "0.1.0",
-        "training_data_end_date": (datetime.now() - timedelta(days=7)).isoformat(),
-        "evaluation_method": "5-fold cross-validation"
+        **result.metrics,
+        "metrics_as_of": result.computed_at.isoformat(),
+        "model_version": result.model_version,
+        "training_data_end_date": result.key[1].isoformat(),
+        "evaluation_method": f"rolling-origin backtest ({folds} folds, {horizon}h horizon)",
+        "stale": stale,
+        "folds": list(result.folds)
     }
 
 def get_area_risk_assessment(
     location: Location,
     radius: float = 1.0
 ) -> Dict:
-    """Get risk assessment for a specific area"""
-    # In a real implementation, this would analyze historical data and predictions
-    # For now, return mock risk assessment
-    
-    # Random risk level with bias towards medium
-    risk_levels = ["low", "medium", "medium", "high", "medium"]
-    risk_level = random.choice(risk_levels)
-    
-    # Risk score based on risk level
-    if risk_level == "low":
-        risk_score = random.uniform(0.1, 0.3)
-    elif risk_level == "medium":
-        risk_score = random.uniform(0.4, 0.7)
-    else:  # high
-        risk_score = random.uniform(0.7, 0.9)
-    
-    # Get crime types for this area
-    from services.crime_service import CRIME_TYPES
-    common_crimes = random.sample(CRIME_TYPES, k=random.randint(2, 4))
-    
-    # Generate time-based risk factors
-    time_risk = {
-        "morning": random.uniform(0.1, 0.4),
-        "afternoon": random.uniform(0.2, 0.5),
-        "evening": random.uniform(0.5, 0.8),
-        "night": random.uniform(0.6, 0.9)
+    """
+    Get risk assessment for a specific area from the precomputed risk
+    surface: incident rates of the grid cells within `radius` km, measured
+    from the location snapped to the prediction cache grid
+    """
+    surface = get_risk_surface()
+    cache = _prediction_cache
+    key = (
+        "risk",
+        cache.location_key(location.latitude, location.longitude),
+        radius,
+        surface.generation,
+        cache.time_bucket()
+    )
+    latitude, longitude = cache.snap_location(location.latitude, location.longitude)
+    assessment = dict(cache.get_or_compute(
+        key,
+        get_model().version,
+        lambda: _assess_risk(surface, Location(latitude=latitude, longitude=longitude), radius),
+        _json_size
+    ))
+    assessment["location"] = {
+        "latitude": location.latitude,
+        "longitude": location.longitude,
+        "radius_km": radius
     }
+    return assessment
+
+def _assess_risk(surface: RiskSurfaceSnapshot, location: Location, radius: float) -> Dict:
+    assessment = assess_area(surface, location.latitude, location.longitude, radius)
+    risk_score = assessment["risk_score"]
     
-    # Generate day-based risk factors
-    day_risk = {
-        "monday": random.uniform(0.3, 0.6),
-        "tuesday": random.uniform(0.3, 0.6),
-        "wednesday": random.uniform(0.3, 0.6),
-        "thursday": random.uniform(0.3, 0.6),
-        "friday": random.uniform(0.5, 0.8),
-        "saturday": random.uniform(0.6, 0.9),
-        "sunday": random.uniform(0.5, 0.8)
-    }
+    if risk_score >= 0.7:
+        risk_level = "high"
+    elif risk_score >= 0.4:
+        risk_level = "medium"
+    else:
+        risk_level = "low"
     
     # Generate safety tips based on risk level
     safety_tips = []
@@ -193,11 +584,12 @@ def get_area_risk_assessment(
         },
         "risk_level": risk_level,
         "risk_score": risk_score,
-        "common_crimes": common_crimes,
-        "time_risk_factors": time_risk,
-        "day_risk_factors": day_risk,
-        "recent_incidents_count": random.randint(5, 30),
-        "predicted_incidents_next_24h": random.randint(1, 10),
+        "common_crimes": assessment["common_crimes"],
+        "time_risk_factors": assessment["time_risk_factors"],
+        "day_risk_factors": assessment["day_risk_factors"],
+        "recent_incidents_count": assessment["recent_incidents_count"],
+        "predicted_incidents_next_24h": assessment["predicted_incidents_next_24h"],
         "safety_tips": safety_tips,
-        "assessment_time": datetime.now().isoformat()
+        "assessment_time": datetime.now().isoformat(),
+        "data_as_of": surface.refreshed_at.isoformat()
     }
@@ -0,0 +1,242 @@
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+from datetime import datetime
+import math
+import threading
+
+import numpy as np
+
+from config import RISK_CELL_DEG, RISK_RECENT_DAYS
+from services.incident_store import IncidentStore, IncidentColumns
+from utils.data_utils import (
+    US_PER_DAY, HOURS_PER_WEEK, EARTH_RADIUS_KM, datetime_to_epoch_us, hour_of_week, points_within_radius
+)
+
+US_PER_WEEK = 7 * US_PER_DAY
+KM_PER_DEGREE = math.radians(1.0) * EARTH_RADIUS_KM
+
+# Local hours making up each part of the day reported in time_risk_factors
+DAY_PERIODS = {
+    "morning": range(6, 12),
+    "afternoon": range(12, 17),
+    "evening": range(17, 21),
+    "night": [21, 22, 23, 0, 1, 2, 3, 4, 5],
+}
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+@dataclass(frozen=True)
+class RiskSurfaceSnapshot:
+    """
+    Immutable per-cell incident counts over the occupied cells of a uniform
+    grid. `counts[cell, type, hour_of_week]` divided by `weeks` is the
+    weekly incident rate for that cell, crime type and local hour of week.
+    """
+    cell_deg: float
+    cell_keys: np.ndarray     # int64 grid cell keys (lat cell * lon cells + lon cell)
+    cell_lat: np.ndarray      # float64 cell center latitudes
+    cell_lon: np.ndarray      # float64 cell center longitudes
+    counts: np.ndarray        # int32 (cells, types, 168)
+    recent: np.ndarray        # int64 incidents per cell in the last RISK_RECENT_DAYS days
+    sorted_totals: np.ndarray # per-cell totals, sorted, for percentile ranks
+    type_names: List[str]
+    weeks: float              # observed span the rates are relative to
+    generation: int           # store generation the surface reflects
+    refreshed_at: datetime
+
+    def cells_within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """
+        Get the cells whose center lies within the radius. A radius smaller
+        than a cell still covers the cell around the point.
+        """
+        half_diagonal = self.cell_deg * KM_PER_DEGREE * math.sqrt(2) / 2
+        return points_within_radius(
+            latitude, longitude, max(radius_km, half_diagonal), self.cell_lat, self.cell_lon, fast=True
+        )
+
+class RiskSurface:
+    """
+    Incident rates per grid cell, crime type and local hour of week, derived
+    from the incident store. `refresh` folds rows appended since the last
+    refresh into the counts and publishes a new snapshot; removals trigger a
+    full rebuild. Readers only ever use `snapshot()`, which never blocks.
+    """
+
+    def __init__(self, store: IncidentStore, cell_deg: float = RISK_CELL_DEG, recent_days: int = RISK_RECENT_DAYS):
+        self.store = store
+        self.cell_deg = cell_deg
+        self.recent_days = recent_days
+        self.lon_cells = int(math.ceil(360.0 / cell_deg))
+        self._lock = threading.Lock()
+        self._snapshot: Optional[RiskSurfaceSnapshot] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._cell_index: Dict[int, int] = {}
+        self._cell_keys = np.empty(0, dtype=np.int64)
+        self._counts = np.zeros((0, 0, HOURS_PER_WEEK), dtype=np.int32)
+        self._days: Dict[int, np.ndarray] = {}
+        self._rows_seen = 0
+        self._live = 0
+        self._min_ts: Optional[int] = None
+        self._max_ts: Optional[int] = None
+
+    def snapshot(self) -> Optional[RiskSurfaceSnapshot]:
+        return self._snapshot
+
+    def refresh(self) -> RiskSurfaceSnapshot:
+        """Bring the surface up to date with the store and publish a snapshot"""
+        with self._lock:
+            columns = self.store.columns()
+            current = self._snapshot
+            if current is not None and current.generation == columns.generation and not self._window_moved(current):
+                return current
+
+            order = columns.order
+            new_rows = order[order >= self._rows_seen]
+            if len(order) - len(new_rows) < self._live:
+                # Rows were removed since the last refresh
+                self._reset()
+                new_rows = order
+            self._add_rows(columns, np.sort(new_rows))
+            self._rows_seen = len(columns)
+            self._live = len(order)
+            self._snapshot = self._publish(columns.generation)
+            return self._snapshot
+
+    def _window_moved(self, snapshot: RiskSurfaceSnapshot) -> bool:
+        return datetime.now().date() != snapshot.refreshed_at.date()
+
+    def _add_rows(self, columns: IncidentColumns, rows: np.ndarray) -> None:
+        type_count = max(len(self.store.type_names), self._counts.shape[1])
+        if len(rows) == 0:
+            self._grow(len(self._cell_keys), type_count)
+            return
+        latitude, longitude = columns.latitude[rows], columns.longitude[rows]
+        timestamps = columns.timestamp[rows]
+        lat_cell = np.floor((latitude + 90.0) / self.cell_deg).astype(np.int64)
+        lon_cell = np.floor((longitude + 180.0) / self.cell_deg).astype(np.int64)
+        keys = lat_cell * self.lon_cells + lon_cell
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        new_keys = [key for key in unique_keys.tolist() if key not in self._cell_index]
+        for key in new_keys:
+            self._cell_index[key] = len(self._cell_index)
+        if new_keys:
+            self._cell_keys = np.append(self._cell_keys, np.array(new_keys, dtype=np.int64))
+        cell_count = len(self._cell_keys)
+        self._grow(cell_count, type_count)
+
+        cells = np.array([self._cell_index[key] for key in unique_keys.tolist()], dtype=np.int64)[inverse]
+        np.add.at(self._counts, (cells, columns.type_code[rows].astype(np.int64), columns.hour_of_week[rows]), 1)
+
+        # Per-day cell counts are only kept for the recent window
+        days = timestamps // US_PER_DAY
+        recent = days > self._first_recent_day()
+        if recent.any():
+            unique_days, day_index = np.unique(days[recent], return_inverse=True)
+            by_day = np.bincount(
+                day_index * cell_count + cells[recent], minlength=len(unique_days) * cell_count
+            ).reshape(len(unique_days), cell_count)
+            for day, day_counts in zip(unique_days.tolist(), by_day):
+                self._day_block(day)[:] += day_counts.astype(np.int32)
+
+        self._min_ts = int(timestamps.min()) if self._min_ts is None else min(self._min_ts, int(timestamps.min()))
+        self._max_ts = int(timestamps.max()) if self._max_ts is None else max(self._max_ts, int(timestamps.max()))
+
+    def _first_recent_day(self) -> int:
+        return datetime_to_epoch_us(datetime.now()) // US_PER_DAY - self.recent_days
+
+    def _grow(self, cell_count: int, type_count: int) -> None:
+        cells, types, _ = self._counts.shape
+        if cell_count > cells or type_count > types:
+            grown = np.zeros((cell_count, type_count, HOURS_PER_WEEK), dtype=np.int32)
+            grown[:cells, :types] = self._counts
+            self._counts = grown
+
+    def _day_block(self, day: int) -> np.ndarray:
+        block = self._days.get(day)
+        cell_count = len(self._cell_keys)
+        if block is None or len(block) < cell_count:
+            grown = np.zeros(cell_count, dtype=np.int32)
+            if block is not None:
+                grown[:len(block)] = block
+            block = self._days[day] = grown
+        return block
+
+    def _publish(self, generation: int) -> RiskSurfaceSnapshot:
+        cell_count = len(self._cell_keys)
+        lat_cell = self._cell_keys // self.lon_cells
+        lon_cell = self._cell_keys % self.lon_cells
+
+        first_recent_day = self._first_recent_day()
+        for day in [day for day in self._days if day <= first_recent_day]:
+            del self._days[day]
+        recent = np.zeros(cell_count, dtype=np.int64)
+        for block in self._days.values():
+            recent[:len(block)] += block
+
+        weeks = 1.0
+        if self._min_ts is not None:
+            weeks = max(1.0, (self._max_ts - self._min_ts) / US_PER_WEEK)
+        totals = self._counts.sum(axis=(1, 2))
+        return RiskSurfaceSnapshot(
+            cell_deg=self.cell_deg,
+            cell_keys=self._cell_keys.copy(),
+            cell_lat=(lat_cell + 0.5) * self.cell_deg - 90.0,
+            cell_lon=(lon_cell + 0.5) * self.cell_deg - 180.0,
+            counts=self._counts.copy(),
+            recent=recent,
+            sorted_totals=np.sort(totals),
+            type_names=list(self.store.type_names),
+            weeks=weeks,
+            generation=generation,
+            refreshed_at=datetime.now()
+        )
+
+def assess_area(snapshot: RiskSurfaceSnapshot, latitude: float, longitude: float, radius_km: float) -> Dict:
+    """
+    Summarize the surface cells within the radius:
+
+    - risk_score: share of occupied cells whose incident count is at most the
+      area's average per covered cell (covered cells include empty ones)
+    - time/day risk factors: average hourly rate in each part of the day or
+      weekday, relative to the highest one
+    - predicted incidents in the next 24 hours: the sum of weekly rates over
+      the coming 24 local hours of the week
+    """
+    cells = snapshot.cells_within(latitude, longitude, radius_km)
+    cube = snapshot.counts[cells].sum(axis=0, dtype=np.int64)  # (types, 168)
+    by_hour = cube.sum(axis=0)
+    total = int(by_hour.sum())
+
+    cell_km = snapshot.cell_deg * KM_PER_DEGREE
+    covered_cells = max(1.0, math.pi * radius_km ** 2 / (cell_km * cell_km * math.cos(math.radians(latitude))))
+    per_cell = total / covered_cells
+    ranked = len(snapshot.sorted_totals)
+    risk_score = float(np.searchsorted(snapshot.sorted_totals, per_cell, side="right")) / ranked if ranked and total else 0.0
+
+    by_type = cube.sum(axis=1)
+    top_types = np.argsort(-by_type, kind="stable")[:4]
+    common_crimes = [snapshot.type_names[code] for code in top_types.tolist() if by_type[code] > 0]
+
+    hours = by_hour.reshape(7, 24)
+    period_rates = {name: float(hours[:, list(period)].mean()) for name, period in DAY_PERIODS.items()}
+    day_rates = dict(zip(DAY_NAMES, hours.mean(axis=1).tolist()))
+
+    now_how = int(hour_of_week(np.array([datetime_to_epoch_us(datetime.now())]))[0])
+    next_day = (now_how + np.arange(24)) % HOURS_PER_WEEK
+    predicted = float(by_hour[next_day].sum()) / snapshot.weeks
+
+    return {
+        "risk_score": risk_score,
+        "common_crimes": common_crimes,
+        "time_risk_factors": _relative(period_rates),
+        "day_risk_factors": _relative(day_rates),
+        "recent_incidents_count": int(snapshot.recent[cells].sum()),
+        "predicted_incidents_next_24h": int(round(predicted)),
+        "cells": len(cells),
+    }
+
+def _relative(rates: Dict[str, float]) -> Dict[str, float]:
+    peak = max(rates.values())
+    return {name: round(rate / peak, 3) if peak else 0.0 for name, rate in rates.items()}
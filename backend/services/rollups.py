@@ -0,0 +1,93 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from utils.data_utils import US_PER_SECOND, US_PER_DAY, HOURS_PER_WEEK
+
+# Rollup slot width. Every timezone offset is a multiple of 15 minutes, so
+# local hour, day, week and month boundaries always fall on a slot edge.
+SLOT_US = 15 * 60 * US_PER_SECOND
+SLOTS_PER_DAY = US_PER_DAY // SLOT_US
+
+class IncidentRollups:
+    """
+    Materialized incident counts kept in step with the incident store:
+
+    - per (crime type, local hour of week) over all time
+    - per (crime type, 15-minute slot), stored as one block per UTC day so
+      sparse or very old data does not allocate dense history
+
+    Every write touches one counter per incident in each rollup. Callers
+    must hold the store's write lock.
+    """
+
+    def __init__(self):
+        self.type_count = 0
+        self.hour_of_week = np.zeros((0, HOURS_PER_WEEK), dtype=np.int64)
+        self._days: Dict[int, np.ndarray] = {}
+
+    def _ensure_types(self, type_count: int) -> None:
+        if type_count > self.type_count:
+            padding = np.zeros((type_count - self.type_count, HOURS_PER_WEEK), dtype=np.int64)
+            self.hour_of_week = np.vstack([self.hour_of_week, padding])
+            self.type_count = type_count
+
+    def _day_block(self, day: int) -> np.ndarray:
+        block = self._days.get(day)
+        if block is None or block.shape[0] < self.type_count:
+            grown = np.zeros((self.type_count, SLOTS_PER_DAY), dtype=np.int32)
+            if block is not None:
+                grown[:block.shape[0]] = block
+            block = self._days[day] = grown
+        return block
+
+    def add(
+        self,
+        type_code: np.ndarray,
+        timestamp: np.ndarray,
+        hour_of_week: np.ndarray,
+        sign: int = 1
+    ) -> None:
+        """Count (sign=1) or uncount (sign=-1) a batch of incidents"""
+        if len(type_code) == 0:
+            return
+        type_code = type_code.astype(np.int64)
+        self._ensure_types(int(type_code.max()) + 1)
+        np.add.at(self.hour_of_week, (type_code, hour_of_week), sign)
+
+        slots = timestamp // SLOT_US
+        days = slots // SLOTS_PER_DAY
+        day_order = np.argsort(days, kind="stable")
+        unique_days, starts = np.unique(days[day_order], return_index=True)
+        ends = np.append(starts[1:], len(day_order))
+        for day, start, end in zip(unique_days.tolist(), starts.tolist(), ends.tolist()):
+            rows = day_order[start:end]
+            np.add.at(self._day_block(day), (type_code[rows], slots[rows] % SLOTS_PER_DAY), sign)
+
+    def clear(self) -> None:
+        """Drop every counter"""
+        self.hour_of_week[:] = 0
+        self._days.clear()
+
+    def slot_counts(self, first_slot: int, end_slot: int) -> np.ndarray:
+        """Get a dense (types, end_slot - first_slot) copy of the slot counts"""
+        counts = np.zeros((self.type_count, max(0, end_slot - first_slot)), dtype=np.int64)
+        if end_slot <= first_slot:
+            return counts
+        for day in range(first_slot // SLOTS_PER_DAY, (end_slot - 1) // SLOTS_PER_DAY + 1):
+            block = self._days.get(day)
+            if block is None:
+                continue
+            day_first = day * SLOTS_PER_DAY
+            lo, hi = max(first_slot, day_first), min(end_slot, day_first + SLOTS_PER_DAY)
+            counts[:block.shape[0], lo - first_slot:hi - first_slot] = block[:, lo - day_first:hi - day_first]
+        return counts
+
+def whole_slots(start_us: int, end_us: int) -> Tuple[int, int]:
+    """
+    Get the [first, end) range of slots lying entirely inside the inclusive
+    microsecond range [start_us, end_us]
+    """
+    first_slot = -(-start_us // SLOT_US)
+    end_slot = (end_us + 1) // SLOT_US
+    return first_slot, max(first_slot, end_slot)
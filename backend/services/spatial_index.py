@@ -0,0 +1,73 @@
+from typing import List, Optional
+import math
+
+import numpy as np
+
+class GridIndex:
+    """
+    Uniform latitude/longitude grid over incident rows.
+
+    Rows are kept sorted by cell key (lat cell * cells per lat row + lon cell),
+    so each latitude band of a bounding box is one contiguous run of keys and
+    a viewport query only touches the cells it covers. Instances are
+    immutable; `merged` returns a new index with extra rows.
+    """
+
+    def __init__(
+        self,
+        cell_deg: float,
+        order: Optional[np.ndarray] = None,
+        sorted_keys: Optional[np.ndarray] = None
+    ):
+        self.cell_deg = cell_deg
+        self.lon_cells = int(math.ceil(360.0 / cell_deg))
+        self.lat_cells = int(math.ceil(180.0 / cell_deg))
+        self.order = order if order is not None else np.empty(0, dtype=np.int64)
+        self.sorted_keys = sorted_keys if sorted_keys is not None else np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _lat_cell(self, latitude):
+        return np.clip(np.floor((np.asarray(latitude) + 90.0) / self.cell_deg), 0, self.lat_cells - 1).astype(np.int64)
+
+    def _lon_cell(self, longitude):
+        return np.clip(np.floor((np.asarray(longitude) + 180.0) / self.cell_deg), 0, self.lon_cells - 1).astype(np.int64)
+
+    def cell_keys(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """Get the grid cell key of each point"""
+        return self._lat_cell(latitude) * self.lon_cells + self._lon_cell(longitude)
+
+    def merged(self, latitude: np.ndarray, longitude: np.ndarray, first_row: int) -> "GridIndex":
+        """Get a new index that also covers rows `first_row .. first_row + len(latitude)`"""
+        keys = self.cell_keys(latitude, longitude)
+        batch_order = np.argsort(keys, kind="stable")
+        batch_keys = keys[batch_order]
+        positions = np.searchsorted(self.sorted_keys, batch_keys, side="right")
+        return GridIndex(
+            self.cell_deg,
+            order=np.insert(self.order, positions, batch_order + first_row),
+            sorted_keys=np.insert(self.sorted_keys, positions, batch_keys)
+        )
+
+    def without(self, rows: np.ndarray) -> "GridIndex":
+        """Get a new index with the given rows dropped"""
+        keep = ~np.isin(self.order, rows)
+        return GridIndex(self.cell_deg, order=self.order[keep], sorted_keys=self.sorted_keys[keep])
+
+    def rows_in_bbox(self, bbox: List[float]) -> np.ndarray:
+        """
+        Get the rows in every cell overlapping `bbox` ([min_lon, min_lat, max_lon, max_lat]).
+        Candidates may lie slightly outside the box; callers apply the exact check.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        lat_first, lat_last = int(self._lat_cell(min_lat)), int(self._lat_cell(max_lat))
+        lon_first, lon_last = int(self._lon_cell(min_lon)), int(self._lon_cell(max_lon))
+
+        band_base = np.arange(lat_first, lat_last + 1, dtype=np.int64) * self.lon_cells
+        starts = np.searchsorted(self.sorted_keys, band_base + lon_first, side="left")
+        ends = np.searchsorted(self.sorted_keys, band_base + lon_last, side="right")
+        runs = [self.order[start:end] for start, end in zip(starts.tolist(), ends.tolist()) if end > start]
+        if not runs:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(runs)
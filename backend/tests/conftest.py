@@ -0,0 +1,52 @@
+from datetime import datetime
+import os
+import sys
+import tempfile
+
+# Configuration is read at import time, so pin it before any app module loads
+os.environ["DATABASE_URL"] = ""
+os.environ["MODEL_PATH"] = tempfile.mkdtemp(prefix="test_models_")
+os.environ["GEOCODE_CACHE_PATH"] = ""
+os.environ["MODEL_WATCH_INTERVAL"] = "0"
+os.environ["ADMIN_TOKEN"] = "test-token"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from services import crime_service
+from services.incident_repository import SQLiteIncidentRepository
+from services.incident_store import IncidentStore
+from utils.data_utils import datetime_to_epoch_us
+
+@pytest.fixture
+def store(monkeypatch) -> IncidentStore:
+    """An empty in-memory incident store in place of the shared one"""
+    fresh = IncidentStore(crime_service.CRIME_TYPES)
+    monkeypatch.setattr(crime_service, "_store", fresh)
+    return fresh
+
+@pytest.fixture
+def repository(store, tmp_path, monkeypatch) -> SQLiteIncidentRepository:
+    """SQLite storage behind an empty store, as init_storage() would set it up"""
+    repo = SQLiteIncidentRepository(str(tmp_path / "incidents.db"))
+    monkeypatch.setattr(crime_service, "_repository", repo)
+    monkeypatch.setattr(crime_service, "_synced_row_id", 0)
+    monkeypatch.setattr(crime_service, "_synced_delete_seq", 0)
+    yield repo
+    repo.close()
+
+@pytest.fixture
+def add_random_incidents(store):
+    """Add `count` reproducible incidents spread over two weeks from `start`"""
+    def add(count: int, seed: int = 7, start: datetime = datetime(2024, 3, 4)) -> None:
+        rng = np.random.default_rng(seed)
+        offsets = rng.integers(0, 14 * 24 * 3600 * 10**6, count)
+        store.append_batch(
+            latitude=rng.uniform(18.9, 19.3, count),
+            longitude=rng.uniform(72.7, 73.1, count),
+            timestamp=datetime_to_epoch_us(start) + offsets,
+            crime_types=list(rng.choice(crime_service.CRIME_TYPES[:4], count)),
+            severity=rng.uniform(0, 5, count)
+        )
+    return add
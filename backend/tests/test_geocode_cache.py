@@ -0,0 +1,20 @@
+import sqlite3
+
+from utils.geocode_cache import DiskStore
+
+def test_disk_row_count_is_kept_without_scanning(tmp_path):
+    path = str(tmp_path / "geocode.db")
+    disk = DiskStore(path)
+    disk.set("a", {"n": 1}, ttl=60)
+    disk.set("b", {"n": 2}, ttl=60)
+    disk.set("a", {"n": 3}, ttl=60)
+    assert len(disk) == 2
+    disk.close()
+
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE geocode_cache SET expires_at = 0 WHERE key = 'b'")
+    reopened = DiskStore(path)
+    assert len(reopened) == 1 and reopened.get("a") == {"n": 3}
+    reopened.clear()
+    assert len(reopened) == 0
+    reopened.close()
@@ -0,0 +1,26 @@
+from dataclasses import replace
+from datetime import timedelta
+
+from services import crime_service, prediction_service
+from utils.cache import LRUCache
+
+def test_prediction_tiles_follow_forecast_refreshes(store, add_random_incidents, monkeypatch):
+    add_random_incidents(50)
+    monkeypatch.setattr(crime_service, "_tile_cache", LRUCache(max_entries=16))
+    forecast = prediction_service.refresh_hotspot_forecast()
+    current = [forecast]
+    sliced = []
+    get_prediction_hotspots = prediction_service.get_prediction_hotspots
+    def spy(*args, forecast=None, **kwargs):
+        sliced.append(forecast)
+        return get_prediction_hotspots(*args, forecast=forecast, **kwargs)
+    monkeypatch.setattr(prediction_service, "get_hotspot_forecast", lambda: current[0])
+    monkeypatch.setattr(prediction_service, "get_prediction_hotspots", spy)
+
+    crime_service.get_heatmap_tile(10, 723, 460, include_predictions=True)
+    crime_service.get_heatmap_tile(10, 723, 460, include_predictions=True)
+    assert sliced == [forecast]
+
+    current[0] = replace(forecast, generated_at=forecast.generated_at + timedelta(hours=1))
+    crime_service.get_heatmap_tile(10, 723, 460, include_predictions=True)
+    assert sliced == [forecast, current[0]]
@@ -0,0 +1,30 @@
+import asyncio
+
+import httpx
+import pytest
+
+from utils.http_client import HTTPClient
+
+def _get(retry_after: str, max_retry_after: float = 1) -> tuple:
+    calls = []
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, headers={"Retry-After": retry_after})
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        client = HTTPClient(retries=2, max_retry_after=max_retry_after, transport=httpx.MockTransport(handler))
+        try:
+            return await client.get_json("http://upstream.test/")
+        finally:
+            await client.aclose()
+    return asyncio.run(run()), len(calls)
+
+def test_short_retry_after_is_honoured():
+    assert _get("0") == ({"ok": True}, 2)
+
+def test_long_retry_after_fails_fast():
+    with pytest.raises(httpx.HTTPStatusError) as error:
+        _get("3600")
+    assert error.value.response.status_code == 503
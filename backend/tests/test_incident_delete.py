@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+
+import main
+from utils import admin
+
+def test_delete_requires_the_admin_token(store, add_random_incidents, monkeypatch):
+    add_random_incidents(3)
+    columns = store.columns()
+    incident_id = store.to_lists(columns, columns.order)["id"][0]
+    client = TestClient(main.app)
+    url = f"/api/crime/incidents/{incident_id}"
+
+    assert client.delete(url).status_code == 403
+    assert client.delete(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert len(store) == 3
+    assert client.delete(url, headers={"X-Admin-Token": "test-token"}).json() == {"deleted": incident_id}
+    assert len(store) == 2
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.delete(url, headers={"X-Admin-Token": "test-token"}).status_code == 403
@@ -0,0 +1,76 @@
+import sqlite3
+
+from services.crime_service import add_incident_batch, generate_mock_incidents, remove_incident, sync_from_storage
+from services.incident_repository import SQLiteIncidentRepository
+from services.incident_store import incidents_to_columns
+
+def _db_ids(repository):
+    with repository.pool.connection() as connection:
+        return {row[0] for row in connection.execute("SELECT id FROM incidents")}
+
+def _store_ids(store):
+    columns = store.columns()
+    return {columns.ids[row].tobytes() for row in columns.order.tolist()}
+
+def test_reinsert_after_deleting_newest_row_is_synced(store, repository):
+    incidents = generate_mock_incidents(5)
+    add_incident_batch(**incidents_to_columns(incidents))
+    # The newest row has the highest row_id; its id must not be reused
+    assert remove_incident(incidents[-1].id)
+    add_incident_batch(**incidents_to_columns(generate_mock_incidents(1)))
+
+    assert len(store) == 5
+    assert _store_ids(store) == _db_ids(repository)
+
+def test_writes_by_another_worker_are_synced(store, repository):
+    add_incident_batch(**incidents_to_columns(generate_mock_incidents(3)))
+    other = SQLiteIncidentRepository(repository.pool.path)
+    try:
+        other.insert_batch(**incidents_to_columns(generate_mock_incidents(2)))
+        other.delete([next(iter(_db_ids(repository)))])
+    finally:
+        other.close()
+
+    sync_from_storage()
+    assert len(store) == 4
+    assert _store_ids(store) == _db_ids(repository)
+
+def test_duplicate_ids_are_not_inserted_twice(store, repository):
+    columns = incidents_to_columns(generate_mock_incidents(3))
+    assert repository.insert_batch(**columns).tolist() == [True, True, True]
+    assert repository.insert_batch(**columns).tolist() == [False, False, False]
+
+def test_legacy_schema_is_migrated_keeping_rows(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE incidents (
+            row_id INTEGER PRIMARY KEY, id BLOB NOT NULL UNIQUE, crime_type TEXT NOT NULL,
+            latitude REAL NOT NULL, longitude REAL NOT NULL, timestamp_us INTEGER NOT NULL,
+            severity REAL NOT NULL, description TEXT
+        );
+        CREATE VIRTUAL TABLE incidents_rtree USING rtree(row_id, min_lat, max_lat, min_lon, max_lon);
+        CREATE TABLE deleted_incidents (seq INTEGER PRIMARY KEY AUTOINCREMENT, id BLOB NOT NULL);
+        INSERT INTO incidents VALUES (1, x'01', 'Theft', 19.0, 72.8, 0, 1.0, NULL);
+        INSERT INTO incidents VALUES (2, x'02', 'Theft', 19.0, 72.8, 1, 1.0, NULL);
+    """)
+    connection.commit()
+    connection.close()
+
+    repository = SQLiteIncidentRepository(path)
+    try:
+        with repository.pool.connection() as connection:
+            assert connection.execute("SELECT row_id, id FROM incidents ORDER BY row_id").fetchall() == [
+                (1, b"\x01"), (2, b"\x02")
+            ]
+            assert connection.execute("SELECT name FROM sqlite_master WHERE name = 'incidents_rtree'").fetchone() is None
+            connection.execute("DELETE FROM incidents WHERE row_id = 2")
+            connection.execute(
+                "INSERT INTO incidents (id, crime_type, latitude, longitude, timestamp_us, severity) "
+                "VALUES (x'03', 'Theft', 19.0, 72.8, 2, 1.0)"
+            )
+            connection.commit()
+            assert connection.execute("SELECT MAX(row_id) FROM incidents").fetchone()[0] == 3
+            assert connection.execute("SELECT id FROM deleted_incidents").fetchall() == [(b"\x02",)]
+    finally:
+        repository.close()
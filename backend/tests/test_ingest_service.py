@@ -0,0 +1,106 @@
+import asyncio
+import json
+import uuid
+
+import numpy as np
+import pytest
+
+from services.ingest_service import MAX_RECORD_CHARS, ingest_incidents
+
+def _ingest(body: bytes, fmt: str = "ndjson", chunk_size: int = 7) -> dict:
+    async def chunks():
+        for first in range(0, len(body), chunk_size):
+            yield body[first:first + chunk_size]
+    return asyncio.run(ingest_incidents(chunks(), fmt))
+
+def _row(**overrides) -> dict:
+    row = {
+        "crime_type": "Theft",
+        "latitude": 19.07,
+        "longitude": 72.87,
+        "timestamp": "2024-05-01T10:30:00",
+        "severity": 2.5,
+    }
+    row.update(overrides)
+    return row
+
+def _ndjson(*rows) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+def _assert_consistent(report: dict) -> None:
+    assert report["inserted"] == report["received"] - report["failed"]
+
+def test_invalid_rows_are_reported_and_valid_rows_inserted(store):
+    body = _ndjson(_row(), _row(latitude=91), _row(timestamp="yesterday")) + b"not json\n" + _ndjson(_row(id="x"))
+    report = _ingest(body)
+    assert report["received"] == 5 and report["inserted"] == 1
+    assert [(e["row"], e["error"]) for e in report["errors"]] == [
+        (2, "latitude must be a number between -90 and 90"),
+        (3, "timestamp must be an ISO 8601 datetime or epoch seconds"),
+        (4, "invalid JSON"),
+        (5, "id must be a UUID"),
+    ]
+    _assert_consistent(report)
+    assert len(store) == 1
+
+def test_csv_records_spanning_lines(store):
+    body = (
+        b"crime_type,latitude,longitude,timestamp,severity,description\n"
+        b'Theft,19.07,72.87,2024-05-01T10:30:00,2.5,"two\nlines"\n'
+        b"Theft,19.07,72.87,2024-05-01T10:30:00,9,\n"
+    )
+    report = _ingest(body, "csv")
+    assert report["inserted"] == 1
+    assert report["errors"] == [{"row": 2, "error": "severity must be a number between 0 and 5"}]
+    assert store.to_models(store.columns(), store.columns().order)[0].description == "two\nlines"
+
+@pytest.mark.parametrize("terminated", [True, False])
+def test_overlong_lines_are_rejected_without_buffering(store, terminated):
+    huge = b"x" * (MAX_RECORD_CHARS * 3)
+    body = _ndjson(_row()) + huge + (b"\n" + _ndjson(_row()) if terminated else b"")
+    report = _ingest(body, chunk_size=64 * 1024)
+    assert report["errors"] == [{"row": 2, "error": f"record is longer than {MAX_RECORD_CHARS} bytes"}]
+    assert report["inserted"] == (2 if terminated else 1)
+    _assert_consistent(report)
+
+def _duplicates_body(existing_id: str) -> bytes:
+    repeated = str(uuid.uuid4())
+    return _ndjson(_row(id=repeated), _row(id=repeated), _row(id=existing_id), _row())
+
+def test_duplicate_ids_are_reported_in_memory(store):
+    existing = str(uuid.uuid4())
+    _ingest(_ndjson(_row(id=existing)))
+    report = _ingest(_duplicates_body(existing))
+    assert report["errors"] == [{"row": 2, "error": "duplicate id"}, {"row": 3, "error": "duplicate id"}]
+    _assert_consistent(report)
+    assert len(store) == 3
+
+def test_duplicate_ids_are_reported_with_storage(store, repository):
+    existing = str(uuid.uuid4())
+    _ingest(_ndjson(_row(id=existing)))
+    report = _ingest(_duplicates_body(existing))
+    assert report["errors"] == [{"row": 2, "error": "duplicate id"}, {"row": 3, "error": "duplicate id"}]
+    _assert_consistent(report)
+    assert len(store) == 3
+
+def test_numeric_timestamps_are_epoch_seconds(store):
+    body = (
+        b"crime_type,latitude,longitude,timestamp,severity\n"
+        b"Theft,19.07,72.87,1700000000,3\n"
+        b"Theft,19.07,72.87,1700000000.5,3\n"
+        b"Theft,19.07,72.87,99999999999999,3\n"
+        b"Theft,19.07,72.87,2024-05-01T10:30:00,3\n"
+    )
+    report = _ingest(body, "csv")
+    assert report["errors"] == [{"row": 3, "error": "timestamp must be an ISO 8601 datetime or epoch seconds"}]
+    assert report["inserted"] == 3
+    columns = store.columns()
+    assert sorted(columns.timestamp.tolist())[:2] == [1_700_000_000_000_000, 1_700_000_000_500_000]
+
+def test_severity_is_returned_exactly_as_written(store, repository):
+    report = _ingest(_ndjson(_row(severity=3.7), _row(severity=0.1, id=str(uuid.uuid4()))))
+    assert report["inserted"] == 2
+    columns = store.columns()
+    assert sorted(store.to_lists(columns, columns.order)["severity"]) == [0.1, 3.7]
+    stored = np.concatenate([chunk["severity"] for chunk in repository.iter_chunks()])
+    assert sorted(stored.tolist()) == [0.1, 3.7]
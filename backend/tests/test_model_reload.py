@@ -0,0 +1,75 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils import admin
+from services import prediction_service
+from services.crime_model import save_model
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    """An empty MODEL_PATH and no serving model"""
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", str(tmp_path))
+    monkeypatch.setattr(prediction_service, "_loaded", None)
+    monkeypatch.setattr(prediction_service, "_reload_stats", dict(prediction_service._reload_stats))
+    return str(tmp_path)
+
+def _save(directory: str, version: str, rates=None) -> None:
+    model = replace(prediction_service.baseline_model(), version=version)
+    if rates is not None:
+        model = replace(model, rates=rates)
+    save_model(model, directory)
+
+def test_watcher_picks_up_newer_artifacts(model_dir):
+    _save(model_dir, "20250101T000000Z")
+    assert prediction_service.get_model().version == "20250101T000000Z"
+    assert prediction_service.reload_model_if_changed() is None
+
+    _save(model_dir, "20250201T000000Z")
+    assert prediction_service.reload_model_if_changed().version == "20250201T000000Z"
+    assert prediction_service.model_info()["reloads"] == 1
+
+def test_rollback_is_pinned_until_unpinned(model_dir):
+    _save(model_dir, "20250101T000000Z")
+    _save(model_dir, "20250201T000000Z")
+    assert prediction_service.get_model().version == "20250201T000000Z"
+
+    prediction_service.reload_model("20250101T000000Z")
+    _save(model_dir, "20250301T000000Z")
+    assert prediction_service.reload_model_if_changed() is None
+    info = prediction_service.model_info()
+    assert info["model_version"] == "20250101T000000Z" and info["pinned"]
+
+    prediction_service.reload_model()
+    info = prediction_service.model_info()
+    assert info["model_version"] == "20250301T000000Z" and not info["pinned"]
+
+def test_bad_artifacts_are_rejected_and_not_retried(model_dir):
+    _save(model_dir, "20250101T000000Z")
+    model = prediction_service.get_model()
+    _save(model_dir, "20250201T000000Z", rates=np.full_like(model.rates, np.nan))
+
+    with pytest.raises(ValueError):
+        prediction_service.reload_model_if_changed()
+    assert prediction_service.get_model().version == "20250101T000000Z"
+    assert prediction_service.reload_model_if_changed() is None
+    with pytest.raises(FileNotFoundError):
+        prediction_service.reload_model("19990101T000000Z")
+
+def test_reload_endpoint_requires_the_admin_token(model_dir, monkeypatch):
+    _save(model_dir, "20250101T000000Z")
+    client = TestClient(main.app)
+    url = "/api/predictions/model/reload"
+
+    assert client.post(url).status_code == 403
+    assert client.post(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.post(url, params={"version": "20250101T000000Z"}, headers={"X-Admin-Token": "test-token"})
+    assert response.status_code == 200
+    assert response.json()["pinned"]
+    assert client.post(url, params={"version": "nope"}, headers={"X-Admin-Token": "test-token"}).status_code == 404
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", None)
+    assert client.post(url, headers={"X-Admin-Token": "test-token"}).status_code == 403
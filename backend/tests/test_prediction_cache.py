@@ -0,0 +1,22 @@
+from services.prediction_cache import PredictionCache
+
+def test_late_write_from_a_replaced_model_is_dropped():
+    cache = PredictionCache()
+    cache.activate("v1")
+    cache.set("a", {"n": 1}, "v1", size=10)
+    cache.activate("v2")
+    assert cache.get("a", "v2") is None
+
+    cache.set("b", {"n": 2}, "v1", size=10)
+    assert cache.model_version == "v2" and cache.invalidations == 1
+    assert cache.get("b", "v1") is None and cache.get("b", "v2") is None
+
+    cache.set("b", {"n": 3}, "v2", size=10)
+    assert cache.get("b", "v2") == {"n": 3}
+
+def test_rollback_to_an_older_version_is_adopted():
+    cache = PredictionCache()
+    cache.set("a", {"n": 1}, "v2", size=10)
+    assert cache.model_version == "v2"
+    cache.activate("v1")
+    assert cache.get("a", "v1") is None and cache.invalidations == 1
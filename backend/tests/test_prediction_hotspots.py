@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+import main
+from services import prediction_service
+
+def test_hotspots_read_one_forecast_off_the_event_loop(store, monkeypatch):
+    forecast = prediction_service.refresh_hotspot_forecast()
+    calls = []
+    def get_hotspot_forecast():
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        calls.append(forecast)
+        return forecast
+    monkeypatch.setattr(prediction_service, "get_hotspot_forecast", get_hotspot_forecast)
+
+    response = TestClient(main.app).get("/api/predictions/hotspots", params={"hours_ahead": 6})
+    assert response.status_code == 200
+    assert response.headers["X-Forecast-Generated-At"] == forecast.generated_at.isoformat()
+    assert response.json() == prediction_service.get_prediction_hotspots(6, forecast=forecast)
+    assert len(calls) == 1
+
+def test_metrics_do_not_compute_the_forecast(store, monkeypatch):
+    monkeypatch.setattr(prediction_service, "_forecast", None)
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["hotspot_forecast"] is None
+    assert prediction_service.get_hotspot_forecast_snapshot() is None
@@ -0,0 +1,64 @@
+import base64
+import uuid
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from utils import response_formats
+from utils.response_formats import JSON, MSGPACK, PACKED_JSON, negotiate
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, JSON),
+    ("", JSON),
+    ("*/*", JSON),
+    ("application/*", JSON),
+    ("application/vnd.columnar+json", PACKED_JSON),
+    ("application/json;q=0.5, application/vnd.columnar+json", PACKED_JSON),
+    ("application/json;q=0, */*;q=0.1", PACKED_JSON),
+    ("application/vnd.columnar+json;q=0.9, */*;q=0.9", PACKED_JSON),
+    ("text/html", None),
+    ("application/json;q=0", None),
+    ("application/json;q=abc", None),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+def test_msgpack_alias_is_only_offered_with_msgpack(monkeypatch):
+    monkeypatch.setattr(response_formats, "msgpack", None)
+    assert negotiate("application/x-msgpack") is None
+    assert MSGPACK not in response_formats.media_types()
+
+def _incidents(accept=None, **params):
+    headers = {"Accept": accept} if accept else {}
+    return TestClient(main.app).get("/api/crime/incidents", params=params, headers=headers)
+
+def test_json_matches_the_pydantic_serialization(store, add_random_incidents):
+    add_random_incidents(50)
+    response = _incidents(limit=50)
+    assert response.status_code == 200 and response.headers["content-type"] == JSON
+    columns = store.columns()
+    newest_first = columns.order[::-1]
+    assert response.json() == [incident.model_dump(mode="json") for incident in store.to_models(columns, newest_first)]
+
+def test_packed_json_decodes_to_the_same_rows(store, add_random_incidents):
+    add_random_incidents(50)
+    rows = _incidents(limit=20).json()
+    response = _incidents(PACKED_JSON, limit=20)
+    assert response.headers["content-type"] == PACKED_JSON
+    assert "Accept" in response.headers["Vary"]
+    document = response.json()
+    assert document["length"] == 20
+    table = document["columns"]
+    latitude = np.frombuffer(base64.b64decode(table["latitude"]["data"]), dtype="<f8")
+    ids = np.frombuffer(base64.b64decode(table["id"]["data"]), dtype="V16")
+    crime_type = table["crime_type"]
+    codes = np.frombuffer(base64.b64decode(crime_type["codes"]), dtype=crime_type["index_type"])
+    assert latitude.tolist() == [row["location"]["latitude"] for row in rows]
+    assert [str(uuid.UUID(bytes=raw.tobytes())) for raw in ids] == [row["id"] for row in rows]
+    assert [crime_type["values"][code] for code in codes.tolist()] == [row["crime_type"] for row in rows]
+
+def test_unacceptable_media_type_is_406(store):
+    response = _incidents("text/html")
+    assert response.status_code == 406
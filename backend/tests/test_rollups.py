@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services import crime_service
+from utils.data_utils import datetime_to_epoch_us
+
+START = datetime(2024, 3, 4, 0, 0)
+
+def _scanned_cube(start_date, end_date, crime_type):
+    columns, rows = crime_service._filter_rows(start_date, end_date, crime_type)
+    return crime_service._count_cube(columns, rows)
+
+def _same_counts(rolled, scanned):
+    types = max(rolled.shape[0], scanned.shape[0])
+    pad = lambda cube: np.concatenate([cube, np.zeros((types - cube.shape[0], 7, 24), dtype=cube.dtype)])
+    np.testing.assert_array_equal(pad(rolled), pad(scanned))
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (None, None),
+    (START + timedelta(hours=5, minutes=7, seconds=3), START + timedelta(days=9, minutes=44)),
+    (START + timedelta(days=2, minutes=1), START + timedelta(days=2, minutes=9)),
+    (START + timedelta(days=3), None),
+])
+@pytest.mark.parametrize("crime_type", [None, "Theft"])
+def test_rollup_statistics_match_a_raw_scan(store, add_random_incidents, start_date, end_date, crime_type):
+    add_random_incidents(2000, start=START)
+    type_code = store.type_code_for(crime_type) if crime_type else None
+    _same_counts(
+        crime_service._rollup_count_cube(start_date, end_date, type_code),
+        _scanned_cube(start_date, end_date, crime_type)
+    )
+
+@pytest.mark.parametrize("crime_type", [None, "Theft"])
+def test_rollup_time_series_matches_a_raw_scan(add_random_incidents, crime_type):
+    add_random_incidents(2000, start=START)
+    start_date, end_date = START + timedelta(days=1, minutes=13), START + timedelta(days=3, hours=5)
+    series = crime_service.get_time_series_data(start_date, end_date, crime_type, interval="hour")
+    columns, rows = crime_service._filter_rows(start_date, end_date, crime_type)
+    timestamps = columns.timestamp[rows]
+    for bucket in series["data"]:
+        lo = max(datetime_to_epoch_us(datetime.fromisoformat(bucket["start"])), datetime_to_epoch_us(start_date))
+        hi = datetime_to_epoch_us(datetime.fromisoformat(bucket["start"]) + timedelta(hours=1))
+        assert bucket["count"] == int(np.count_nonzero((timestamps >= lo) & (timestamps < hi)))
+
+def test_rollup_cube_is_sized_from_its_snapshot(store, add_random_incidents, monkeypatch):
+    add_random_incidents(200, start=START)
+    read_rollups = store.read_rollups
+    def read_after_new_type(*args):
+        # A writer adds a crime type between sizing and reading
+        store.append_batch(
+            latitude=np.array([19.0]),
+            longitude=np.array([72.8]),
+            timestamp=np.array([datetime_to_epoch_us(START + timedelta(days=4, minutes=20))]),
+            crime_types=["Arson"],
+            severity=np.array([1.0])
+        )
+        return read_rollups(*args)
+    monkeypatch.setattr(store, "read_rollups", read_after_new_type)
+
+    cube = crime_service._rollup_count_cube(START, START + timedelta(days=10), None)
+    assert cube.shape[0] == len(store.type_names)
+    assert int(cube[store.type_code_for("Arson")].sum()) == 1
+
+def test_time_series_endpoint_buckets_off_the_event_loop(add_random_incidents, monkeypatch):
+    add_random_incidents(100, start=START)
+    get_time_series_data = crime_service.get_time_series_data
+    def off_loop(**kwargs):
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return get_time_series_data(**kwargs)
+    monkeypatch.setattr(crime_service, "get_time_series_data", off_loop)
+
+    params = {"start_date": START.isoformat(), "end_date": (START + timedelta(days=14)).isoformat()}
+    response = TestClient(main.app).get("/api/crime/time-series", params=params)
+    assert response.status_code == 200
+    assert sum(bucket["count"] for bucket in response.json()["data"]) == 100
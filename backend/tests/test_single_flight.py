@@ -0,0 +1,17 @@
+import asyncio
+
+from utils.single_flight import SingleFlight, key_digest
+
+def test_stats_do_not_expose_keys():
+    flights = SingleFlight()
+    async def lookup():
+        return "ok"
+    key = ("forward", "221b baker street, london")
+    assert asyncio.run(flights.do(key, lookup)) == "ok"
+
+    stats = flights.stats()
+    assert "baker" not in str(stats)
+    assert stats["keys"] == [{
+        "key": key_digest(key), "calls": 1, "executions": 1, "coalesced": 0, "errors": 0, "rejected": 0, "peak_waiters": 1
+    }]
+    assert stats["calls"] == 1 and stats["in_flight"] == 0
@@ -0,0 +1,70 @@
+"""
+Train a crime rate model from the incident history and write it to
+MODEL_PATH, where running servers pick it up without a restart.
+
+    python train.py [--start 2023-01-01] [--end 2025-01-01] [--workers 8]
+
+Incidents are read from DATABASE_URL in chunks; without it the in-memory
+store (seeded with mock data) is used.
+"""
+from datetime import datetime
+import argparse
+
+from config import (
+    DATABASE_URL, MODEL_PATH, MODEL_CELL_DEG, STORAGE_CHUNK_SIZE, TRAINING_HALF_LIFE_DAYS,
+    TRAINING_SHARDS, TRAINING_WORKERS
+)
+from services.crime_model import save_model
+from services.incident_repository import SQLiteIncidentRepository, sqlite_path_from_url
+from services.model_training import repository_chunks, store_chunks, train_rate_model
+from utils.data_utils import datetime_to_epoch_us
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train a crime rate model from stored incidents")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="First incident time to train on")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Last incident time to train on")
+    parser.add_argument("--output", default=MODEL_PATH, help="Directory to write the model artifact to")
+    parser.add_argument("--cell-deg", type=float, default=MODEL_CELL_DEG, help="Grid cell size in degrees")
+    parser.add_argument("--half-life-days", type=float, default=TRAINING_HALF_LIFE_DAYS, help="Recency weight half-life")
+    parser.add_argument("--workers", type=int, default=TRAINING_WORKERS, help="Worker processes (0 for one per CPU)")
+    parser.add_argument("--shards", type=int, default=TRAINING_SHARDS, help="Cell partitions processed in parallel")
+    parser.add_argument("--chunk-size", type=int, default=STORAGE_CHUNK_SIZE, help="Incidents read per chunk")
+    parser.add_argument("--work-dir", help="Directory for temporary spill files")
+    args = parser.parse_args()
+
+    start_us = datetime_to_epoch_us(args.start) if args.start else None
+    end_us = datetime_to_epoch_us(args.end) if args.end else None
+
+    repository = None
+    if DATABASE_URL:
+        path = sqlite_path_from_url(DATABASE_URL)
+        if path is None:
+            raise SystemExit(f"Unsupported DATABASE_URL, expected sqlite:///path: {DATABASE_URL}")
+        repository = SQLiteIncidentRepository(path)
+        chunks = repository_chunks(repository, args.chunk_size, start_us, end_us)
+    else:
+        print("DATABASE_URL is not set, training on the in-memory store")
+        from services.crime_service import get_incident_store
+        chunks = store_chunks(get_incident_store(), args.chunk_size, start_us, end_us)
+
+    try:
+        model = train_rate_model(
+            chunks,
+            cell_deg=args.cell_deg,
+            half_life_days=args.half_life_days,
+            workers=args.workers,
+            shards=args.shards,
+            work_dir=args.work_dir
+        )
+    finally:
+        if repository is not None:
+            repository.close()
+
+    path = save_model(model, args.output)
+    print(
+        f"Trained model {model.version} on {model.metadata['incidents']} incidents "
+        f"({len(model.cell_keys)} cells) in {model.metadata['elapsed_seconds']}s: {path}"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from typing import Optional
+import hmac
+
+from fastapi import Header, HTTPException
+
+from config import ADMIN_TOKEN
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding admin endpoints: the X-Admin-Token header must
+    match ADMIN_TOKEN. While ADMIN_TOKEN is unset they are disabled.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
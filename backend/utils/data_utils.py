@@ -1,24 +1,210 @@
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
 import math
 import random
 
+import numpy as np
+
+from config import TIMEZONE
+
+# Microseconds per unit, for epoch-microsecond timestamp columns
+US_PER_SECOND = 1_000_000
+US_PER_HOUR = 3600 * US_PER_SECOND
+US_PER_DAY = 24 * US_PER_HOUR
+HOURS_PER_WEEK = 7 * 24
+
+# Mean earth radius in km
+EARTH_RADIUS_KM = 6371.0
+
+LOCAL_TZ = ZoneInfo(TIMEZONE)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def datetime_to_epoch_us(dt: datetime) -> int:
+    """
+    Convert a datetime to integer microseconds since the Unix epoch.
+    Naive datetimes are interpreted in the configured local timezone.
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=LOCAL_TZ)
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * US_PER_SECOND + delta.microseconds
+
+def epoch_us_to_datetime(epoch_us: int) -> datetime:
+    """Convert epoch microseconds back to a naive local datetime"""
+    utc = EPOCH + timedelta(microseconds=int(epoch_us))
+    return utc.astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+@lru_cache(maxsize=None)
+def _utc_offset_us(epoch_hour: int) -> int:
+    """UTC offset of the local timezone at the given UTC hour since the epoch"""
+    return int((EPOCH + timedelta(hours=epoch_hour)).astimezone(LOCAL_TZ).utcoffset().total_seconds()) * US_PER_SECOND
+
+@lru_cache(maxsize=None)
+def _local_utc_offset_us(local_hour: int) -> int:
+    """UTC offset of the local timezone at the given local wall-clock hour since the epoch"""
+    naive = datetime(1970, 1, 1) + timedelta(hours=local_hour)
+    return int(naive.replace(tzinfo=LOCAL_TZ).utcoffset().total_seconds()) * US_PER_SECOND
+
+def _hourly_offsets(hours: np.ndarray, lookup) -> np.ndarray:
+    """
+    Look up `lookup(hour)` for every element of `hours`: once per hour of
+    the covered span, or once per distinct hour when the values are few
+    and far apart (e.g. timestamps from unrelated requests)
+    """
+    first_hour = int(hours.min())
+    span = int(hours.max()) - first_hour + 1
+    if span <= 4 * hours.size:
+        offsets = np.array([lookup(h) for h in range(first_hour, first_hour + span)], dtype=np.int64)
+        return offsets[hours - first_hour]
+    distinct, inverse = np.unique(hours, return_inverse=True)
+    offsets = np.array([lookup(h) for h in distinct.tolist()], dtype=np.int64)
+    return offsets[inverse.reshape(hours.shape)]
+
+def to_local_epoch_us(epoch_us: np.ndarray) -> np.ndarray:
+    """
+    Shift epoch microseconds (array) to local wall-clock microseconds in the
+    configured timezone. UTC offsets are looked up once per hour of the
+    covered span, so DST changes are honoured without per-row datetimes.
+    """
+    epoch_us = np.asarray(epoch_us, dtype=np.int64)
+    if epoch_us.size == 0:
+        return epoch_us.copy()
+    return epoch_us + _hourly_offsets(epoch_us // US_PER_HOUR, _utc_offset_us)
+
+def from_local_epoch_us(local_us: np.ndarray) -> np.ndarray:
+    """
+    Inverse of `to_local_epoch_us`: convert local wall-clock microseconds
+    (array) to epoch microseconds, resolving each wall time the same way
+    `datetime_to_epoch_us` resolves a naive datetime
+    """
+    local_us = np.asarray(local_us, dtype=np.int64)
+    if local_us.size == 0:
+        return local_us.copy()
+    return local_us - _hourly_offsets(local_us // US_PER_HOUR, _local_utc_offset_us)
+
+def local_isoformat(epoch_us: np.ndarray) -> List[str]:
+    """
+    Format epoch microseconds (array) as naive local ISO 8601 strings,
+    identical to `epoch_us_to_datetime(t).isoformat()` for every value
+    """
+    local = to_local_epoch_us(epoch_us).astype("datetime64[us]")
+    return [
+        text[:-7] if text.endswith(".000000") else text
+        for text in np.datetime_as_string(local, unit="us").tolist()
+    ]
+
+def hour_of_week(epoch_us: np.ndarray) -> np.ndarray:
+    """Get the local hour of the week (weekday * 24 + hour, Monday = 0) of each timestamp"""
+    local_hours = to_local_epoch_us(epoch_us) // US_PER_HOUR
+    # 1970-01-01 was a Thursday (weekday 3)
+    weekday = (local_hours // 24 + 3) % 7
+    return (weekday * 24 + local_hours % 24).astype(np.int16)
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees)
+    on the earth (specified in decimal degrees).
+    Arguments may also be NumPy arrays, in which case they broadcast.
     """
     # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
     
     # Haversine formula
     dlon = lon2 - lon1
     dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Radius of earth in kilometers
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    
+    return c * EARTH_RADIUS_KM
+
+def equirectangular_distance(lat1, lon1, lat2, lon2):
+    """
+    Fast approximate distance in km (scalars or broadcasting arrays), treating
+    the earth as flat around the points' mean latitude. Against
+    `haversine_distance`, the relative error is below 1e-5 (under half a
+    metre) for points up to 50 km apart below 60 degrees latitude, and grows
+    with the square of the distance. Longitudes are not wrapped, so points
+    must not straddle the antimeridian.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return np.hypot(x, y) * EARTH_RADIUS_KM
+
+def distances_from_point(
+    latitude: float,
+    longitude: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    fast: bool = False
+) -> np.ndarray:
+    """
+    Get the distance in km from one point to each of many points.
+    `fast` uses the equirectangular approximation (see `equirectangular_distance`).
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    if fast:
+        return equirectangular_distance(latitude, longitude, latitudes, longitudes)
+    return haversine_distance(latitude, longitude, latitudes, longitudes)
+
+def pairwise_distances(
+    latitudes_a: np.ndarray,
+    longitudes_a: np.ndarray,
+    latitudes_b: np.ndarray,
+    longitudes_b: np.ndarray,
+    fast: bool = False
+) -> np.ndarray:
+    """
+    Get the (len(a), len(b)) matrix of distances in km between two point
+    sets. The whole matrix is materialized; chunk `a` for large inputs.
+    """
+    lat_a = np.asarray(latitudes_a, dtype=np.float64)[:, np.newaxis]
+    lon_a = np.asarray(longitudes_a, dtype=np.float64)[:, np.newaxis]
+    lat_b = np.asarray(latitudes_b, dtype=np.float64)[np.newaxis, :]
+    lon_b = np.asarray(longitudes_b, dtype=np.float64)[np.newaxis, :]
+    if fast:
+        return equirectangular_distance(lat_a, lon_a, lat_b, lon_b)
+    return haversine_distance(lat_a, lon_a, lat_b, lon_b)
+
+def points_within_radius(
+    center_lat: float,
+    center_lon: float,
+    radius_km: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    fast: bool = False
+) -> np.ndarray:
+    """
+    Get the sorted indices of the points within `radius_km` of the center.
+    Points outside the radius's bounding box are dropped with cheap
+    comparisons first, so distances are only computed for the candidates.
+    """
+    # Imported here, mapbox_utils pulls in the HTTP client stack
+    from utils.mapbox_utils import calculate_bounding_box
+    
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    try:
+        min_lon, min_lat, max_lon, max_lat = calculate_bounding_box(center_lat, center_lon, radius_km)
+    except (ValueError, ZeroDivisionError):
+        # The radius reaches a pole; only latitude can be bounded
+        min_lon, max_lon = -180.0, 180.0
+        min_lat = center_lat - math.degrees(radius_km / EARTH_RADIUS_KM)
+        max_lat = center_lat + math.degrees(radius_km / EARTH_RADIUS_KM)
     
-    return c * r
+    candidates = (latitudes >= min_lat) & (latitudes <= max_lat)
+    if min_lon >= -180.0 and max_lon <= 180.0:
+        # Boxes crossing the antimeridian keep every longitude
+        candidates &= (longitudes >= min_lon) & (longitudes <= max_lon)
+    candidates = np.flatnonzero(candidates)
+    
+    distances = distances_from_point(
+        center_lat, center_lon, latitudes[candidates], longitudes[candidates], fast=fast
+    )
+    return candidates[distances <= radius_km]
 
 def generate_points_in_radius(
     center_lat: float,
@@ -89,3 +275,69 @@ def format_time_for_display(dt: datetime, interval: str = "day") -> str:
         return dt.strftime("%b %Y")
     else:
         return dt.isoformat()
+
+# Custom bucket widths such as "15m", "6h" or "2d"
+_WIDTH_UNITS = {"m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1)}
+
+def parse_interval(interval: str):
+    """
+    Parse a time series interval: one of hour/day/week/month, or a custom
+    width "<n>m", "<n>h" or "<n>d". Returns (unit, count).
+    """
+    if interval in ("hour", "day", "week", "month"):
+        return interval, 1
+    count, unit = interval[:-1], interval[-1:]
+    if unit not in _WIDTH_UNITS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return {"m": "minute", "h": "hour", "d": "day"}[unit], int(count)
+
+def time_bucket_edges(
+    start: datetime,
+    end: datetime,
+    interval: str,
+    tz: ZoneInfo = LOCAL_TZ,
+    max_buckets: Optional[int] = None
+) -> List[datetime]:
+    """
+    Generate calendar-aligned bucket edges in `tz` covering [start, end].
+    Days, weeks (from Monday) and months follow the local calendar, so DST
+    days and real month lengths are respected; minute and hour widths are
+    exact durations. Naive datetimes are interpreted in `tz`.
+    Returns the edges as aware datetimes, one more than the bucket count.
+    """
+    unit, count = parse_interval(interval)
+    start = start.replace(tzinfo=tz) if start.tzinfo is None else start.astimezone(tz)
+    end = end.replace(tzinfo=tz) if end.tzinfo is None else end.astimezone(tz)
+    
+    # Align the first edge to the start of its calendar unit, and to a
+    # multiple of the width when it divides the hour or day evenly
+    edge = start.replace(second=0, microsecond=0)
+    if unit == "minute" and 60 % count == 0:
+        edge = edge.replace(minute=edge.minute - edge.minute % count)
+    if unit != "minute":
+        edge = edge.replace(minute=0)
+    if unit == "hour" and 24 % count == 0:
+        edge = edge.replace(hour=edge.hour - edge.hour % count)
+    if unit in ("day", "week", "month"):
+        edge = edge.replace(hour=0)
+    if unit == "week":
+        edge -= timedelta(days=edge.weekday())
+    if unit == "month":
+        edge = edge.replace(day=1)
+    
+    edges = [edge]
+    while edges[-1] <= end:
+        edge = edges[-1]
+        if unit == "month":
+            month = edge.month - 1 + count
+            edge = edge.replace(year=edge.year + month // 12, month=month % 12 + 1)
+        elif unit in ("day", "week"):
+            # Wall-clock arithmetic keeps local midnight across DST changes
+            edge = edge + timedelta(days=count * (7 if unit == "week" else 1))
+        else:
+            # Exact durations, stepped in UTC
+            edge = (edge.astimezone(timezone.utc) + count * _WIDTH_UNITS[unit[0]]).astimezone(tz)
+        edges.append(edge)
+        if max_buckets is not None and len(edges) - 1 > max_buckets:
+            raise ValueError(f"Time range needs more than {max_buckets} buckets at interval {interval}")
+    return edges
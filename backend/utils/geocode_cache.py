@@ -0,0 +1,166 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    GEOCODE_CACHE_SIZE,
+    GEOCODE_CACHE_TTL,
+    GEOCODE_CACHE_PATH,
+    GEOCODE_COORD_PRECISION
+)
+from utils.cache import LRUCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+def normalize_query(query: str) -> str:
+    """Normalize a free-text query so trivially different spellings share a key"""
+    return " ".join(query.casefold().split()).strip(" ,")
+
+def round_coordinates(longitude: float, latitude: float, precision: int = GEOCODE_COORD_PRECISION) -> Tuple[float, float]:
+    """Round coordinates to `precision` decimal places (4 is about 11 m)"""
+    return round(longitude, precision), round(latitude, precision)
+
+def forward_key(query: str, **params) -> str:
+    return _key("forward", normalize_query(query), params)
+
+def reverse_key(longitude: float, latitude: float, precision: int = GEOCODE_COORD_PRECISION, **params) -> str:
+    longitude, latitude = round_coordinates(longitude, latitude, precision)
+    return _key("reverse", f"{longitude:.{precision}f},{latitude:.{precision}f}", params)
+
+def _key(kind: str, subject: str, params: Dict[str, Any]) -> str:
+    extra = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+    return f"{kind}:{subject}?{extra}"
+
+class DiskStore:
+    """
+    Persistent key/value store for geocoding responses in a local SQLite
+    file, so cached lookups survive restarts. Expired rows are skipped on
+    read and purged on open. Methods are blocking, except `len()`, which
+    is a row count kept up to date by this process's writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(SCHEMA)
+            self._connection.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),))
+            self._rows = self._connection.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM geocode_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock, self._connection:
+            exists = self._connection.execute("SELECT 1 FROM geocode_cache WHERE key = ?", (key,)).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl)
+            )
+            if not exists:
+                self._rows += 1
+
+    def __len__(self) -> int:
+        # Counting rows is a table scan, too slow for the stats endpoints
+        return self._rows
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM geocode_cache")
+            self._rows = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+class GeocodeCache:
+    """
+    Two-tier cache for geocoding responses: an in-process LRU with TTL in
+    front of an optional on-disk store. A disk hit is promoted into memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = GEOCODE_CACHE_SIZE,
+        ttl: float = GEOCODE_CACHE_TTL,
+        path: Optional[str] = GEOCODE_CACHE_PATH
+    ):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.disk = DiskStore(path) if path else None
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Get a cached response, or await `fetch()` and cache what it returns"""
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return value
+        self.misses += 1
+
+        value = await fetch()
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, self.ttl)
+        return value
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counters for both tiers; misses are lookups that went upstream"""
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "lookups": lookups,
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": memory["evictions"],
+            "hit_ratio": (memory["hits"] + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": memory["entries"],
+            "max_memory_entries": memory["max_entries"],
+            "disk_entries": len(self.disk) if self.disk is not None else None
+        }
+
+_cache: Optional[GeocodeCache] = None
+
+def get_geocode_cache() -> GeocodeCache:
+    """Get the process-wide geocoding cache, opening it on first use"""
+    global _cache
+    if _cache is None:
+        _cache = GeocodeCache()
+    return _cache
+
+def close_geocode_cache() -> None:
+    global _cache
+    if _cache is not None and _cache.disk is not None:
+        _cache.disk.close()
+    _cache = None
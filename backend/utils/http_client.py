@@ -0,0 +1,111 @@
+from typing import Any, Dict, Optional
+import asyncio
+import random
+
+import httpx
+
+from config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_CONCURRENCY,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRIES,
+    HTTP_RETRY_BACKOFF,
+    HTTP_MAX_RETRY_AFTER
+)
+
+# Upstream statuses worth retrying; anything else is returned to the caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HTTPClient:
+    """
+    Shared async HTTP client for upstream APIs. Connections are pooled and
+    kept alive, every request has connect/read timeouts, at most
+    `max_concurrency` requests are in flight at once, and transport errors
+    and retryable statuses are retried with exponential backoff and jitter.
+    An upstream asking to wait longer than `max_retry_after` seconds is not
+    retried, so a caller is never held for longer than that.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_concurrency: int = HTTP_MAX_CONCURRENCY,
+        connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = HTTP_READ_TIMEOUT,
+        retries: int = HTTP_RETRIES,
+        backoff: float = HTTP_RETRY_BACKOFF,
+        max_retry_after: float = HTTP_MAX_RETRY_AFTER,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            transport=transport
+        )
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """Seconds to wait before retrying, None when Retry-After asks for too long"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "").strip()
+            if retry_after.isdigit():
+                delay = float(retry_after)
+                return delay if delay <= self.max_retry_after else None
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """
+        GET `url`, retrying transient failures. Raises httpx.HTTPStatusError
+        for error statuses and httpx.TransportError once retries run out.
+        """
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, params=params)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                delay = self._delay(attempt, response)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+            response.raise_for_status()
+            return response
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        response = await self.get(url, params=params)
+        return response.json()
+
+_client: Optional[HTTPClient] = None
+
+def init_http_client(**kwargs) -> HTTPClient:
+    """Create the shared client; called from the app lifespan"""
+    global _client
+    _client = HTTPClient(**kwargs)
+    return _client
+
+def get_http_client() -> HTTPClient:
+    """Get the shared client, creating it on first use outside the app lifespan"""
+    if _client is None:
+        return init_http_client()
+    return _client
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,24 +1,71 @@
-import requests
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
 import math
 
-from config import MAPBOX_TOKEN, MAPBOX_API_URL
+import httpx
 
-def geocode_address(address: str, country: Optional[str] = None) -> Dict:
-    """Convert address to coordinates using Mapbox Geocoding API"""
-    url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{address}.json"
-    params = {
-        "access_token": MAPBOX_TOKEN,
-        "limit": 1
-    }
-    
-    if country:
-        params["country"] = country
+import numpy as np
+
+from config import MAPBOX_TOKEN, MAPBOX_API_URL, GEOCODE_BATCH_CONCURRENCY
+from utils.http_client import get_http_client
+from utils.single_flight import SingleFlight
+from utils.geocode_cache import get_geocode_cache, normalize_query, round_coordinates, forward_key, reverse_key
+
+# Identical upstream calls in flight at the same time share one request
+upstream_flights = SingleFlight()
+
+async def forward_geocoding(query: str, limit: int = 5, country: Optional[str] = None) -> Dict:
+    """Get the Mapbox Geocoding API response for an address, through the geocoding cache"""
+    query = normalize_query(query)
+    
+    async def fetch() -> Dict:
+        url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{query}.json"
+        params = {
+            "access_token": MAPBOX_TOKEN,
+            "limit": limit
+        }
         
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+        if country:
+            params["country"] = country
+            
+        return await get_http_client().get_json(url, params=params)
     
-    data = response.json()
+    key = forward_key(query, limit=limit, country=country)
+    return await upstream_flights.do(key, lambda: get_geocode_cache().get_or_fetch(key, fetch))
+
+async def reverse_geocoding(
+    longitude: float,
+    latitude: float,
+    types: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Dict:
+    """
+    Get the Mapbox reverse geocoding response for a point, through the
+    geocoding cache. Coordinates are rounded to GEOCODE_COORD_PRECISION
+    so nearby points share one lookup.
+    """
+    longitude, latitude = round_coordinates(longitude, latitude)
+    
+    async def fetch() -> Dict:
+        url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{longitude},{latitude}.json"
+        params = {
+            "access_token": MAPBOX_TOKEN
+        }
+        
+        if types:
+            params["types"] = types
+        if limit:
+            params["limit"] = limit
+            
+        return await get_http_client().get_json(url, params=params)
+    
+    key = reverse_key(longitude, latitude, types=types, limit=limit)
+    return await upstream_flights.do(key, lambda: get_geocode_cache().get_or_fetch(key, fetch))
+
+async def geocode_address(address: str, country: Optional[str] = None) -> Dict:
+    """Convert address to coordinates using Mapbox Geocoding API"""
+    data = await forward_geocoding(address, limit=1, country=country)
     
     if not data["features"]:
         return {"error": "No results found"}
@@ -33,18 +80,9 @@ def geocode_address(address: str, country: Optional[str] = None) -> Dict:
         "id": feature["id"]
     }
 
-def reverse_geocode(longitude: float, latitude: float) -> Dict:
+async def reverse_geocode(longitude: float, latitude: float) -> Dict:
     """Convert coordinates to address using Mapbox Geocoding API"""
-    url = f"{MAPBOX_API_URL}/geocoding/v5/mapbox.places/{longitude},{latitude}.json"
-    params = {
-        "access_token": MAPBOX_TOKEN,
-        "limit": 1
-    }
-        
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    
-    data = response.json()
+    data = await reverse_geocoding(longitude, latitude, limit=1)
     
     if not data["features"]:
         return {"error": "No results found"}
@@ -57,7 +95,68 @@ def reverse_geocode(longitude: float, latitude: float) -> Dict:
         "place_type": feature["place_type"]
     }
 
-def get_directions(
+def _lookup_error(error: Exception) -> str:
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"Geocoding provider returned status {error.response.status_code}"
+    if isinstance(error, httpx.TimeoutException):
+        return "Geocoding provider timed out"
+    return f"Geocoding error: {error}"
+
+async def geocode_batch(
+    items: List[Dict],
+    country: Optional[str] = None,
+    concurrency: int = GEOCODE_BATCH_CONCURRENCY
+) -> AsyncIterator[Dict]:
+    """
+    Geocode a batch of inputs, each either {"query": address} or
+    {"longitude", "latitude"}. Inputs sharing a cache key are looked up
+    once, at most `concurrency` lookups run at a time, and one result or
+    error per input is yielded in input order as soon as it and every
+    earlier input have finished.
+    """
+    plan: List[Tuple[Optional[str], Optional[str]]] = []
+    calls: Dict[str, Callable[[], Awaitable[Dict]]] = {}
+    for item in items:
+        query = item.get("query")
+        longitude, latitude = item.get("longitude"), item.get("latitude")
+        if query and query.strip():
+            key = forward_key(query, country=country)
+            calls.setdefault(key, lambda query=query: geocode_address(query, country=country))
+        elif longitude is not None and latitude is not None:
+            key = reverse_key(longitude, latitude)
+            calls.setdefault(key, lambda lon=longitude, lat=latitude: reverse_geocode(lon, lat))
+        else:
+            plan.append((None, "Each item needs a query or a longitude and latitude"))
+            continue
+        plan.append((key, None))
+    
+    loop = asyncio.get_running_loop()
+    outcomes = {key: loop.create_future() for key in calls}
+    pending = deque(calls.items())
+    
+    async def worker():
+        while pending:
+            key, call = pending.popleft()
+            try:
+                result = await call()
+                outcome = {"error": result["error"]} if "error" in result else {"result": result}
+            except Exception as e:
+                outcome = {"error": _lookup_error(e)}
+            outcomes[key].set_result(outcome)
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(calls)))]
+    try:
+        for index, (key, error) in enumerate(plan):
+            if key is None:
+                yield {"index": index, "error": error}
+            else:
+                yield {"index": index, **await outcomes[key]}
+    finally:
+        # Stop looking up when the consumer goes away early
+        for task in workers:
+            task.cancel()
+
+async def get_directions(
     start_coords: Tuple[float, float],
     end_coords: Tuple[float, float],
     profile: str = "walking"
@@ -74,10 +173,8 @@ def get_directions(
         "overview": "full"
     }
         
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    
-    return response.json()
+    key = ("directions", profile, start_lon, start_lat, end_lon, end_lat)
+    return await upstream_flights.do(key, lambda: get_http_client().get_json(url, params=params))
 
 def calculate_bounding_box(
     center_lat: float,
@@ -113,7 +210,31 @@ def calculate_bounding_box(
     # Return as [min_lon, min_lat, max_lon, max_lat] (Mapbox format)
     return [min_lon_deg, min_lat_deg, max_lon_deg, max_lat_deg]
 
-def get_isochrone(
+def tile_to_bounding_box(z: int, x: int, y: int) -> List[float]:
+    """Calculate the bounding box of a Web Mercator (XYZ) map tile"""
+    n = 2 ** z
+    
+    def tile_lat(tile_y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+    
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    
+    # Return as [min_lon, min_lat, max_lon, max_lat] (Mapbox format)
+    return [min_lon, tile_lat(y + 1), max_lon, tile_lat(y)]
+
+def lon_lat_to_tile_pixels(longitude, latitude, z: int, x: int, y: int, tile_size: int):
+    """
+    Project coordinates (scalars or NumPy arrays) to pixel offsets
+    within tile z/x/y, where the tile is `tile_size` pixels wide
+    """
+    n = 2 ** z
+    lat_rad = np.radians(latitude)
+    px = ((np.asarray(longitude) + 180.0) / 360.0 * n - x) * tile_size
+    py = ((1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n - y) * tile_size
+    return px, py
+
+async def get_isochrone(
     longitude: float,
     latitude: float,
     contours_minutes: List[int] = [5, 10, 15],
@@ -130,7 +251,4 @@ def get_isochrone(
         "polygons": "true"
     }
         
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    
-    return response.json()
+    return await get_http_client().get_json(url, params=params)
@@ -0,0 +1,137 @@
+from typing import Any, Callable, Deque, Dict, List, Optional
+from collections import deque
+import asyncio
+import time
+
+import numpy as np
+
+class MicroBatcher:
+    """
+    Groups concurrently submitted items into batches for one vectorized
+    call. A batch closes when it reaches `max_batch_size` items or
+    `max_wait` seconds after its first item arrived, then `process` runs
+    on it in a worker thread while the next batch gathers. `process` gets
+    a list of items and must return one result per item; if it raises,
+    every item in the batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        max_queue: int = 10000,
+        history: int = 1024
+    ):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=history)
+        self._waits: Deque[float] = deque(maxlen=history)
+        self._process_times: Deque[float] = deque(maxlen=history)
+
+    def start(self) -> None:
+        """Start the batching worker on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker; items still queued fail with CancelledError"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        # Waits here when the queue is full, pushing back on callers
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _next_batch(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=remaining)
+            if getter not in done:
+                # Cancelling before the getter ran leaves the item queued
+                getter.cancel()
+                break
+            batch.append(getter.result())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            # Skip items whose callers already went away
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self._waits.extend(started - enqueued for _, _, enqueued in batch)
+            try:
+                results = await asyncio.to_thread(self.process, [item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self.errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._process_times.append(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batch size, queue wait and processing time figures over recent batches"""
+        def summary(values, scale: float = 1.0) -> Dict[str, float]:
+            if not values:
+                return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+            array = np.fromiter(values, dtype=np.float64) * scale
+            p50, p95 = np.percentile(array, [50, 95])
+            return {
+                "mean": round(float(array.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "max": round(float(array.max()), 3)
+            }
+
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size": summary(self._batch_sizes),
+            "queue_wait_ms": summary(self._waits, 1000),
+            "process_ms": summary(self._process_times, 1000)
+        }
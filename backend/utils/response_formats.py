@@ -0,0 +1,218 @@
+from typing import Any, Dict, List, Optional, Union
+from dataclasses import dataclass
+import base64
+import json
+
+import numpy as np
+from fastapi import Header, HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+# Optional encoders: orjson speeds up JSON, msgpack and pyarrow enable
+# their media types. Without them those types are simply not offered.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON = "application/json"
+# Columns as base64 little-endian arrays inside a JSON document
+PACKED_JSON = "application/vnd.columnar+json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+_ALIASES = {"application/x-msgpack": MSGPACK}
+
+@dataclass(frozen=True)
+class Dictionary:
+    """A string column as integer codes into `values`, code -1 for null"""
+    codes: np.ndarray
+    values: List[str]
+
+    def narrow_codes(self) -> np.ndarray:
+        """Codes in the smallest signed integer type that holds them"""
+        for dtype in (np.int8, np.int16):
+            if len(self.values) <= np.iinfo(dtype).max:
+                return self.codes.astype(dtype)
+        return self.codes.astype(np.int32)
+
+    @classmethod
+    def encode(cls, codes: np.ndarray, vocabulary: List[str]) -> "Dictionary":
+        """Encode `codes` into a larger `vocabulary`, keeping only the values used"""
+        codes = np.asarray(codes)
+        present = codes >= 0
+        used = np.unique(codes[present])
+        compact = np.full(len(codes), -1, dtype=np.int32)
+        compact[present] = np.searchsorted(used, codes[present])
+        return cls(compact, [vocabulary[code] for code in used.tolist()])
+
+# A response table: column name to a numeric, datetime64[us] or fixed
+# width bytes ("V<n>") array, or a Dictionary; all of the same length
+Columns = Dict[str, Union[np.ndarray, Dictionary]]
+
+def media_types() -> List[str]:
+    """Media types that can be produced, in order of preference"""
+    offered = [JSON, PACKED_JSON]
+    if msgpack is not None:
+        offered.append(MSGPACK)
+    if pa is not None:
+        offered.append(ARROW)
+    return offered
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick the response media type for an Accept header, or None if nothing
+    offered is acceptable. Each offered type takes the q-value of its most
+    specific matching range; ties go to the more specific range, then the
+    one listed first, then the server's preference. JSON is used when the
+    header is missing.
+    """
+    if not accept or not accept.strip():
+        return JSON
+    ranges = []
+    for position, part in enumerate(accept.split(",")):
+        media, *params = part.split(";")
+        media = media.strip().lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        ranges.append((_ALIASES.get(media, media), q, position))
+
+    best, best_rank = None, None
+    for preference, offered in enumerate(media_types()):
+        kind = offered.split("/")[0]
+        matches = [
+            (specificity, q, position)
+            for media, q, position in ranges
+            for specificity, pattern in ((2, offered), (1, f"{kind}/*"), (0, "*/*"))
+            if media == pattern
+        ]
+        if not matches:
+            continue
+        specificity, q, position = max(matches, key=lambda m: (m[0], -m[2]))
+        rank = (q, specificity, -position, -preference)
+        if q > 0 and (best_rank is None or rank > best_rank):
+            best, best_rank = offered, rank
+    return best
+
+def response_media_type(accept: Optional[str] = Header(None)) -> str:
+    """Dependency negotiating the response media type, 406 when none is acceptable"""
+    media_type = negotiate(accept)
+    if media_type is None:
+        raise HTTPException(status_code=406, detail=f"Supported media types: {', '.join(media_types())}")
+    return media_type
+
+def dumps_json(content: Any) -> bytes:
+    """Serialize plain JSON data (dicts, lists, str, int, float, None)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Respond with data that is already in its JSON shape. Returning a
+    Response skips FastAPI's re-validation against the route's response
+    model, which costs more than the serialization itself for large
+    results of already validated service output.
+    """
+    return Response(dumps_json(content), media_type=JSON, headers=headers)
+
+def model_response(model: BaseModel, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respond with a validated model serialized once, without re-validation"""
+    return Response(model.model_dump_json(), media_type=JSON, headers=headers)
+
+def _column_type(values: np.ndarray) -> str:
+    if values.dtype.kind == "M":
+        return "timestamp[us]"
+    if values.dtype.kind == "V":
+        return f"binary{values.dtype.itemsize}"
+    return values.dtype.name
+
+def _column_bytes(values: np.ndarray) -> bytes:
+    if values.dtype.kind == "M":
+        values = values.astype("datetime64[us]").view(np.int64)
+    if values.dtype.kind != "V":
+        values = values.astype(values.dtype.newbyteorder("<"), copy=False)
+    return np.ascontiguousarray(values).tobytes()
+
+def _length(columns: Columns) -> int:
+    for values in columns.values():
+        return len(values.codes) if isinstance(values, Dictionary) else len(values)
+    return 0
+
+def _describe(columns: Columns, metadata: Optional[Dict], encode) -> Dict:
+    """Self-describing document of packed columns, `encode` turning raw bytes into the wire form"""
+    described = {}
+    for name, values in columns.items():
+        if isinstance(values, Dictionary):
+            codes = values.narrow_codes()
+            described[name] = {
+                "type": "dictionary",
+                "index_type": codes.dtype.name,
+                "values": values.values,
+                "codes": encode(_column_bytes(codes))
+            }
+        else:
+            described[name] = {"type": _column_type(values), "data": encode(_column_bytes(values))}
+    return {"length": _length(columns), "columns": described, "metadata": metadata or {}}
+
+def _arrow_array(values: Union[np.ndarray, Dictionary]):
+    if isinstance(values, Dictionary):
+        codes = values.narrow_codes()
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0),
+            pa.array(values.values, type=pa.string())
+        )
+    if values.dtype.kind == "M":
+        return pa.array(values.astype("datetime64[us]").view(np.int64), type=pa.timestamp("us", tz="UTC"))
+    if values.dtype.kind == "V":
+        width = values.dtype.itemsize
+        return pa.FixedSizeBinaryArray.from_buffers(
+            pa.binary(width), len(values), [None, pa.py_buffer(np.ascontiguousarray(values).tobytes())]
+        )
+    return pa.array(values)
+
+def encode_columns(media_type: str, columns: Columns, metadata: Optional[Dict] = None) -> bytes:
+    """
+    Encode a table as packed JSON, MessagePack or an Arrow IPC stream.
+    Packed JSON and MessagePack share one layout,
+    {"length", "columns": {name: {"type", "data" | "index_type" + "codes" + "values"}}, "metadata"},
+    with little-endian column bytes (base64 in JSON). Arrow carries the
+    metadata as JSON strings in the schema metadata. Timestamps are
+    microseconds since the Unix epoch.
+    """
+    if media_type == PACKED_JSON:
+        return dumps_json(_describe(columns, metadata, lambda raw: base64.b64encode(raw).decode("ascii")))
+    if media_type == MSGPACK:
+        return msgpack.packb(_describe(columns, metadata, lambda raw: raw), use_bin_type=True)
+    if media_type == ARROW:
+        batch = pa.record_batch([_arrow_array(values) for values in columns.values()], names=list(columns))
+        schema = batch.schema.with_metadata({key: dumps_json(value) for key, value in (metadata or {}).items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+        return sink.getvalue().to_pybytes()
+    raise ValueError(f"Unsupported columnar media type: {media_type}")
+
+def columnar_response(
+    media_type: str,
+    columns: Columns,
+    metadata: Optional[Dict] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    return Response(encode_columns(media_type, columns, metadata), media_type=media_type, headers=headers)
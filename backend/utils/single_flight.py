@@ -0,0 +1,108 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from collections import OrderedDict
+import asyncio
+import hashlib
+import os
+
+from config import SINGLE_FLIGHT_MAX_WAITERS, SINGLE_FLIGHT_TRACKED_KEYS
+
+T = TypeVar("T")
+
+# Keys can hold user input (addresses, coordinates), so stats only show a
+# digest of them, salted per process so they cannot be matched to guesses
+_KEY_SALT = os.urandom(16)
+
+def key_digest(key: Hashable) -> str:
+    return hashlib.blake2b(str(key).encode("utf-8"), digest_size=8, key=_KEY_SALT).hexdigest()
+
+class TooManyWaiters(RuntimeError):
+    """Raised when a key already has the maximum number of callers waiting on it"""
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in
+    flight, later callers with the same key wait for it and get the same
+    result or exception instead of starting their own. Nothing is cached
+    once the call finishes.
+
+    The call runs as its own task, so a caller that is cancelled does not
+    cancel it for the others. At most `max_waiters` callers may wait on one
+    key; beyond that TooManyWaiters is raised. Per-key counters are kept for
+    the `max_tracked_keys` most recently used keys.
+    """
+
+    def __init__(
+        self,
+        max_waiters: int = SINGLE_FLIGHT_MAX_WAITERS,
+        max_tracked_keys: int = SINGLE_FLIGHT_TRACKED_KEYS
+    ):
+        self.max_waiters = max_waiters
+        self.max_tracked_keys = max_tracked_keys
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._metrics: "OrderedDict[Hashable, Dict[str, int]]" = OrderedDict()
+        self.totals = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0, "rejected": 0}
+
+    def _key_metrics(self, key: Hashable) -> Dict[str, int]:
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = {
+                "calls": 0, "executions": 0, "coalesced": 0, "errors": 0, "rejected": 0, "peak_waiters": 0
+            }
+            while len(self._metrics) > self.max_tracked_keys:
+                self._metrics.popitem(last=False)
+        else:
+            self._metrics.move_to_end(key)
+        return metrics
+
+    def _count(self, metrics: Dict[str, int], name: str) -> None:
+        metrics[name] += 1
+        self.totals[name] += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()`, or the identical call already in flight for `key`"""
+        metrics = self._key_metrics(key)
+        self._count(metrics, "calls")
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._finished(key, flight, metrics))
+            self._count(metrics, "executions")
+        elif flight.waiters >= self.max_waiters:
+            self._count(metrics, "rejected")
+            raise TooManyWaiters(f"Too many concurrent requests for the same resource (limit {self.max_waiters})")
+        else:
+            self._count(metrics, "coalesced")
+
+        flight.waiters += 1
+        metrics["peak_waiters"] = max(metrics["peak_waiters"], flight.waiters)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: Hashable, flight: _Flight, metrics: Dict[str, int]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Reading the exception also marks it as retrieved when no caller is left
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self._count(metrics, "errors")
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self, top: Optional[int] = 20) -> Dict[str, Any]:
+        """Get total counters and those of the busiest tracked keys, by key digest"""
+        busiest = sorted(self._metrics.items(), key=lambda item: item[1]["calls"], reverse=True)[:top]
+        return {
+            **self.totals,
+            "in_flight": len(self._flights),
+            "max_waiters": self.max_waiters,
+            "keys": [{"key": key_digest(key), **metrics} for key, metrics in busiest]
+        }